@@ -0,0 +1,48 @@
+""" Run the benchmark suite from the repository root.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --output results.json --baseline baseline.json --threshold 0.1 --thresholds "deep/*=0.2"
+
+It exits with 1 when a benchmark regresses against the baseline.
+"""
+
+import argparse
+import sys
+from benchmarks import suite
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks of the agents, environments and replays.")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare the results with this json file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative regression threshold (default: 0.1)")
+    parser.add_argument("--thresholds", nargs="*", default=[], metavar="PATTERN=THRESHOLD", help="thresholds of the benchmarks matching glob patterns")
+    parser.add_argument("--filter", default="*", help="glob pattern of the benchmark names to run (default: *)")
+    parser.add_argument("--repeats", type=int, default=3, help="number of timed runs, the best one is reported (default: 3)")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads for a smoke test")
+    args = parser.parse_args(argv)
+
+    results = suite.run(suite.default_benchmarks(args.quick), args.repeats, args.filter)
+    if args.output is not None:
+        suite.save(results, args.output)
+
+    if args.baseline is None:
+        return 0
+    thresholds = {}
+    for item in args.thresholds:
+        pattern, threshold = item.rsplit("=", 1)
+        thresholds[pattern] = float(threshold)
+    comparisons = suite.compare(results, suite.load(args.baseline), args.threshold, thresholds)
+
+    print()
+    print(f"{'benchmark':<50} {'baseline':>14} {'current':>14} {'change':>8}")
+    for c in comparisons:
+        marker = "  REGRESSION" if c.is_regression else ""
+        print(f"{c.name:<50} {c.baseline:>14.2f} {c.value:>14.2f} {100 * c.change:>+7.1f}%{marker}")
+    regressions = [c for c in comparisons if c.is_regression]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+from __future__ import annotations
+import fnmatch
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.distributions import Categorical
+import rl
+from rl.environment import CliffWalking, LatencyEnv, WindyGridworld
+from rl.train import Trainer
+
+RESULT_FORMAT_VERSION = 1
+
+class Benchmark(NamedTuple):
+    name: str
+    func: Callable[[], float]   # runs the workload once and returns the number of operations
+    unit: str                   # "ops/sec" (higher is better) or "us/op" (lower is better)
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    value: float
+    unit: str
+    peak_memory_bytes: int
+
+    @property
+    def higher_is_better(self) -> bool:
+        return self.unit == "ops/sec"
+
+def measure(benchmark: Benchmark, repeats: int = 3) -> BenchmarkResult:
+    """ Run the benchmark `repeats` times after a warm-up run and take the best time. The peak memory is measured by one more run under tracemalloc,
+    which only sees the allocations of python and numpy, not the ones of the torch allocator. """
+    # the first run pays for lazy initialization (e.g. torch kernels)
+    benchmark.func()
+    best = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        ops = benchmark.func()
+        elapsed = time.perf_counter() - start
+        rate = ops / elapsed
+        best = rate if best is None else max(best, rate)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    value = best if benchmark.unit == "ops/sec" else 1e6 / best
+    return BenchmarkResult(benchmark.name, value, benchmark.unit, peak)
+
+def tabular_benchmarks(steps: int) -> List[Benchmark]:
+    """ Training steps/sec of the tabular agents with `Trainer`. """
+    benchmarks = []
+    for env_cls in (CliffWalking, WindyGridworld):
+        for agent_cls in (rl.Sarsa, rl.QLearning, rl.ExpectedSarsa, rl.DoubleQLearning):
+            def func(env_cls=env_cls, agent_cls=agent_cls):
+                np.random.seed(0)
+                env = env_cls()
+                agent = agent_cls(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+                result = Trainer(env, agent, max_episode_steps=1000).train(max_steps=steps)
+                return result.total_steps
+            benchmarks.append(Benchmark(f"train/{agent_cls.__name__}/{env_cls.__name__}", func, "ops/sec"))
+    return benchmarks
+
+def replay_benchmarks(capacities: List[int], batch_size: int = 32) -> List[Benchmark]:
+    """ `add()` of a full capacity of transitions and `sample()` of the list-based and the array-based replays. """
+    benchmarks = []
+    transition = rl.Transition(np.zeros(4, dtype=np.float32), 1, np.ones(4, dtype=np.float32), 1.0, False)
+    for capacity in capacities:
+        for replay_cls in (rl.Replay, rl.ArrayReplay):
+            def add(capacity=capacity, replay_cls=replay_cls):
+                replay = replay_cls(capacity)
+                for _ in range(capacity):
+                    replay.add(transition)
+                return capacity
+            benchmarks.append(Benchmark(f"replay/{replay_cls.__name__}/add/{capacity}", add, "ops/sec"))
+
+        replay = rl.Replay(capacity)
+        array_replay = rl.ArrayReplay(capacity)
+        for _ in range(capacity):
+            replay.add(transition)
+            array_replay.add(transition)
+
+        def sample_list(replay=replay):
+            # the list-based replay has no random sampling, sample() copies the list
+            for _ in range(100):
+                replay.sample()
+            return 100
+        def sample_array(replay=array_replay):
+            for _ in range(100):
+                replay.sample(batch_size)
+            return 100
+        benchmarks.append(Benchmark(f"replay/Replay/sample/{capacity}", sample_list, "us/op"))
+        benchmarks.append(Benchmark(f"replay/ArrayReplay/sample/{capacity}", sample_array, "us/op"))
+    return benchmarks
+
+def to_tensor_batch_benchmarks(batch_sizes: List[int]) -> List[Benchmark]:
+    """ `Transition.to_tensor_batch()` of a list of transitions and of `ArrayReplay` columns. """
+    benchmarks = []
+    for batch_size in batch_sizes:
+        transitions = [
+            rl.Transition(np.random.rand(4).astype(np.float32), i % 2, np.random.rand(4).astype(np.float32), 1.0, False)
+            for i in range(batch_size)
+        ]
+        replay = rl.ArrayReplay(batch_size)
+        for transition in transitions:
+            replay.add(transition)
+        columns = replay.sample()
+
+        def from_list(transitions=transitions):
+            for _ in range(10):
+                rl.Transition.to_tensor_batch(transitions)
+            return 10
+        def from_columns(columns=columns):
+            for _ in range(10):
+                rl.Transition.to_tensor_batch(columns)
+            return 10
+        benchmarks.append(Benchmark(f"to_tensor_batch/list/{batch_size}", from_list, "us/op"))
+        benchmarks.append(Benchmark(f"to_tensor_batch/columns/{batch_size}", from_columns, "us/op"))
+    return benchmarks
+
+def deep_benchmarks(updates: int, obs_size: int = 4, action_count: int = 2, hidden_size: int = 64) -> List[Benchmark]:
+    """ CPU latency of a learning update of `DeepSarsa` (32 transitions) and of `Reinforce` (an episode of 200 steps). """
+    def net():
+        torch.manual_seed(0)
+        return nn.Sequential(nn.Linear(obs_size, hidden_size), nn.ReLU(), nn.Linear(hidden_size, action_count))
+
+    states = np.random.rand(256, obs_size).astype(np.float32)
+
+    def deep_sarsa(replay_cls):
+        def func():
+            q_value_net = net()
+            agent = rl.DeepSarsa(q_value_net, torch.optim.Adam(q_value_net.parameters()), action_count, onpolicy_replay=replay_cls(32))
+            # every 32nd update() learns from the replay
+            for t in range(32 * updates + 1):
+                state = states[t % len(states)]
+                agent.update(rl.Transition(state, t % action_count, state, 1.0, False))
+            return updates
+        return func
+
+    def reinforce():
+        policy_net = net()
+        agent = rl.Reinforce(policy_net, torch.optim.Adam(policy_net.parameters()), lambda x: Categorical(logits=x))
+        for _ in range(updates):
+            agent.start_episode()
+            for t in range(200):
+                action = agent.get_action(states[t % len(states)])
+                agent.update(rl.Transition(None, action, None, 1.0, t == 199))
+            agent.end_episode()
+        return updates
+
+    return [
+        Benchmark("deep/DeepSarsa/OnPolicyReplay/update", deep_sarsa(rl.OnPolicyReplay), "us/op"),
+        Benchmark("deep/DeepSarsa/ArrayOnPolicyReplay/update", deep_sarsa(rl.ArrayOnPolicyReplay), "us/op"),
+        Benchmark("deep/Reinforce/episode", reinforce, "us/op")
+    ]
+
+def pipeline_benchmarks(steps: int, step_latency: float = 0.001) -> List[Benchmark]:
+    """ Training steps/sec against an environment with a step latency, sequential and with the updates pipelined behind the steps.
+    `DynaQ` with sequential planning makes an update about as slow as a step, so the pipelined run is up to twice as fast. """
+    benchmarks = []
+    for staleness in (0, 1):
+        def func(staleness=staleness):
+            np.random.seed(0)
+            env = LatencyEnv(WindyGridworld(), step_latency)
+            agent = rl.DynaQ(env.obs_shape, env.action_count, [tuple(env.goal_state)], planning_steps=20, planning_batch_size=1)
+            result = Trainer(env, agent, max_episode_steps=1000, pipeline_staleness=staleness).train(max_steps=steps)
+            return result.total_steps
+        benchmarks.append(Benchmark(f"pipeline/DynaQ/staleness{staleness}", func, "ops/sec"))
+    return benchmarks
+
+def import_benchmarks() -> List[Benchmark]:
+    """ Startup time of a new interpreter which imports `rl` for the tabular agents.
+    It also guards the lazy imports: it raises when torch is imported, so the suite fails instead of reporting a slow startup. """
+    code = (
+        "import sys, rl, rl.environment, rl.train, rl.planning, rl.runtime\n"
+        "rl.QLearning, rl.Sarsa\n"
+        "if 'torch' in sys.modules: sys.exit('torch is imported by the tabular imports of rl.')"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    def func():
+        process = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise RuntimeError(f"import/rl/tabular failed: {process.stderr.strip()}")
+        return 1
+    return [Benchmark("import/rl/tabular", func, "us/op")]
+
+def default_benchmarks(quick: bool = False) -> List[Benchmark]:
+    scale = 0.1 if quick else 1.0
+    return (
+        import_benchmarks() +
+        tabular_benchmarks(int(20000 * scale)) +
+        pipeline_benchmarks(int(1000 * scale)) +
+        replay_benchmarks([1000, 10000] if quick else [1000, 10000, 100000]) +
+        to_tensor_batch_benchmarks([32, 256, 2048]) +
+        deep_benchmarks(max(1, int(50 * scale)))
+    )
+
+def run(benchmarks: List[Benchmark], repeats: int = 3, pattern: str = "*", verbose: bool = True) -> Dict:
+    """ Run the benchmarks whose names match the glob pattern and returns the json-serializable results. """
+    torch.set_num_threads(1)
+    results = {}
+    for benchmark in benchmarks:
+        if not fnmatch.fnmatch(benchmark.name, pattern):
+            continue
+        result = measure(benchmark, repeats)
+        results[result.name] = {"value": result.value, "unit": result.unit, "peak_memory_bytes": result.peak_memory_bytes}
+        if verbose:
+            print(f"{result.name:<50} {result.value:>14.2f} {result.unit:<8} peak {result.peak_memory_bytes / 2**20:>8.2f} MiB", flush=True)
+    return {
+        "format_version": RESULT_FORMAT_VERSION,
+        "time": time.time(),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "torch": torch.__version__
+        },
+        "results": results
+    }
+
+def save(results: Dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        results = json.load(f)
+    if results["format_version"] > RESULT_FORMAT_VERSION:
+        raise ValueError(f"The result format version {results['format_version']} is newer than the supported version {RESULT_FORMAT_VERSION}.")
+    return results
+
+class Comparison(NamedTuple):
+    name: str
+    baseline: float
+    value: float
+    change: float   # relative change, positive is better
+    threshold: float
+
+    @property
+    def is_regression(self) -> bool:
+        return self.change < -self.threshold
+
+def compare(results: Dict, baseline: Dict, threshold: float = 0.1, thresholds: Dict[str, float] = None) -> List[Comparison]:
+    """ Compare the results with the baseline. A benchmark regresses when it's worse than the baseline by more than its threshold.
+
+    Args:
+        results (Dict): results of `run()`
+        baseline (Dict): baseline results
+        threshold (float, optional): default relative threshold. Defaults to 0.1.
+        thresholds (Dict[str, float], optional): thresholds of the benchmarks matching glob patterns, the first match is used. Defaults to None.
+
+    Returns:
+        List[Comparison]: comparisons of the benchmarks in both results
+    """
+
+    thresholds = {} if thresholds is None else thresholds
+    comparisons = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or base["unit"] != result["unit"]:
+            continue
+        change = (result["value"] - base["value"]) / base["value"]
+        if result["unit"] != "ops/sec":
+            change = -change
+        name_threshold = next((t for pattern, t in thresholds.items() if fnmatch.fnmatch(name, pattern)), threshold)
+        comparisons.append(Comparison(name, base["value"], result["value"], change, name_threshold))
+    return comparisons
@@ -5,7 +5,38 @@ from .rl_util import *
 # learning algorithms
 from .agent import *
 from .rl_agent import *
-from .drl_agent import *
 
 # etc
 from . import environment
+from . import train
+from . import planning
+from . import runtime
+
+# the deep learning agents import torch, so they're imported on the first access (e.g. `rl.DeepSarsa`)
+_LAZY_ATTRIBUTES = {
+    "drl_agent": "rl.drl_agent",
+    "Reinforce": "rl.drl_agent",
+    "DeepSarsa": "rl.drl_agent",
+    "DeepSarsaActorLearner": "rl.drl_agent",
+    "SharedParameterBuffer": "rl.drl_agent",
+    "ActorLearnerStats": "rl.drl_agent",
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    module = importlib.import_module(module_name)
+    value = module if name == "drl_agent" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+# `from rl import *` exports the public names as before the lazy imports, including the deep learning agents when torch is installed
+import importlib.util as _importlib_util
+__all__ = [name for name in globals() if not name.startswith("_")]
+if _importlib_util.find_spec("torch") is not None:
+    __all__ += list(_LAZY_ATTRIBUTES)
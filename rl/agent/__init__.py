@@ -1,2 +1,4 @@
 from .agent import *
+from .q_storage import *
 from .tabular_q_agent import *
+from .tabular_q_population import *
@@ -1,6 +1,9 @@
 from abc import *
+from contextlib import contextmanager
 from typing import Any
+import numpy as np
 import rl
+from rl.util.profiler import Profiler, profiled, profile_count
 
 class Agent(metaclass=ABCMeta):
     @abstractmethod
@@ -8,6 +11,10 @@ class Agent(metaclass=ABCMeta):
         """ Returns an action that follows the behavior policy. """
         pass
     
+    def get_actions(self, states) -> np.ndarray:
+        """ Returns actions that follow the behavior policy for a batch of states (e.g. of multiple agents in an environment). """
+        return np.array([self.get_action(state) for state in states])
+    
     def start_episode(self) -> Any:
         """ Call this method before the start of an episode when training. """
         pass
@@ -20,4 +27,54 @@ class Agent(metaclass=ABCMeta):
     def end_episode(self) -> Any:
         """ Call this method after the end of an episode when training. """
         pass
-    
\ No newline at end of file
+    
+    @contextmanager
+    def profile(self, profiler: Profiler = None):
+        """ Enable the profiler and time the methods of this agent and the phases inside it (e.g. `backward`, `to_tabular`) while in the context.
+        `update()` and `update_batch()` also count `transitions`. Only the methods of this agent are wrapped, and only in the context, so there's no cost otherwise.
+
+        Example:
+            with agent.profile() as profiler:
+                trainer.train(max_episodes=100)
+            print(profiler.summary())
+        """
+        
+        profiler = Profiler() if profiler is None else profiler
+        patched = []
+        for name in ("get_action", "get_actions", "start_episode", "update", "update_batch", "end_episode"):
+            method = getattr(self, name, None)
+            if method is None or name in self.__dict__:
+                continue
+            setattr(self, name, _profiled_method(method, name))
+            patched.append(name)
+        try:
+            with profiler:
+                yield profiler
+        finally:
+            for name in patched:
+                delattr(self, name)
+    
+    def state_dict(self) -> dict:
+        """ Returns the learned state of the agent (e.g. q-values, network weights) for a checkpoint. 
+        The values are references, so copy them if the agent keeps training. The state inside an episode isn't included. """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support checkpoints.")
+    
+    def load_state_dict(self, state_dict: dict) -> None:
+        """ Restore the state returned by `state_dict()`. The arrays may be memory-mapped files. """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support checkpoints.")
+    
+
+def _profiled_method(method, name: str):
+    method = profiled(method, name)
+    if name == "update":
+        def update(transition):
+            profile_count("transitions")
+            return method(transition)
+        return update
+    if name == "update_batch":
+        def update_batch(*args, **kwargs):
+            rewards = kwargs["rewards"] if "rewards" in kwargs else args[2]
+            profile_count("transitions", len(rewards))
+            return method(*args, **kwargs)
+        return update_batch
+    return method
@@ -0,0 +1,215 @@
+from __future__ import annotations
+import os
+import tempfile
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+import numpy as np
+
+class QStorage(metaclass=ABCMeta):
+    """ Allocates the q-value tables `(*obs_shape, action_count)` of `TabularQAgent`. """
+
+    @abstractmethod
+    def allocate(self, shape: tuple, name: str):
+        """ Returns a zero-initialized table. `name` tells the tables of an agent apart (e.g. "Q1", "Q2"). """
+        pass
+
+    def flat_view(self, Q, action_count: int):
+        """ `(state_count, action_count)` view sharing the memory of Q. """
+        Q_flat = Q.reshape(-1, action_count)
+        assert np.may_share_memory(Q_flat, Q)
+        return Q_flat
+
+class DenseQStorage(QStorage):
+    """ In-memory numpy array. float32 halves the memory of the default float64. """
+
+    def __init__(self, dtype = np.float64) -> None:
+        self.dtype = np.dtype(dtype)
+
+    def allocate(self, shape: tuple, name: str) -> np.ndarray:
+        return np.zeros(shape, dtype=self.dtype)
+
+class MemmapQStorage(QStorage):
+    """ Disk-backed `.npy` file mapped into memory, so the operating system pages in only the visited states.
+    The table `name` is `directory/name.npy`, which can be opened with `np.load(mmap_mode=...)`. Resetting the agent overwrites it. """
+
+    def __init__(self, directory: str = None, dtype = np.float64) -> None:
+        """
+        Args:
+            directory (str, optional): directory of the files. if it's None, a new temporary directory. Defaults to None.
+            dtype (optional): dtype of the q-values. Defaults to np.float64.
+        """
+        self.directory = tempfile.mkdtemp(prefix="q_storage_") if directory is None else directory
+        self.dtype = np.dtype(dtype)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def allocate(self, shape: tuple, name: str) -> np.memmap:
+        # the new file is sparse on most file systems, so it's zero without writing it
+        return np.lib.format.open_memmap(os.path.join(self.directory, f"{name}.npy"), mode="w+", dtype=self.dtype, shape=shape)
+
+class SparseQStorage(QStorage):
+    """ Hash table which only materializes the rows of the visited states. See `SparseQTable`. """
+
+    def __init__(self, max_states: int = None, dtype = np.float64) -> None:
+        """
+        Args:
+            max_states (int, optional): maximum number of materialized states. The least recently written state is evicted
+                and its q-values go back to 0 when a new state exceeds it. Reads don't count as uses. if it's None, unbounded. Defaults to None.
+            dtype (optional): dtype of the q-values. Defaults to np.float64.
+        """
+        assert max_states is None or max_states > 0
+        self.max_states = max_states
+        self.dtype = np.dtype(dtype)
+
+    def allocate(self, shape: tuple, name: str) -> SparseQTable:
+        return SparseQTable(shape[:-1], shape[-1], self.dtype, self.max_states)
+
+    def flat_view(self, Q: SparseQTable, action_count: int) -> SparseQTable:
+        return Q.flat_view()
+
+class _SparseRows:
+    """ Rows of q-values in a growing array and the slot of each materialized state id in the order of the last write. """
+
+    def __init__(self, action_count: int, dtype: np.dtype, max_states: int) -> None:
+        self.max_states = max_states
+        self.slots: OrderedDict[int, int] = OrderedDict()
+        self.values = np.zeros((16, action_count), dtype=dtype)
+        self.evictions = 0
+
+    def slot(self, state_id: int) -> int:
+        """ Slot of the state, it's materialized if it's not yet. """
+        slots = self.slots
+        slot = slots.get(state_id)
+        if slot is not None:
+            slots.move_to_end(state_id)
+            return slot
+        if self.max_states is not None and len(slots) >= self.max_states:
+            # reuse the slot of the least recently used state
+            _, slot = slots.popitem(last=False)
+            self.values[slot] = 0
+            self.evictions += 1
+        else:
+            slot = len(slots)
+            if slot == len(self.values):
+                values = np.zeros((2 * len(self.values), self.values.shape[1]), dtype=self.values.dtype)
+                values[:slot] = self.values
+                self.values = values
+        slots[state_id] = slot
+        return slot
+
+    def find(self, state_ids: np.ndarray) -> np.ndarray:
+        """ Slots of the states without materializing them, -1 for the missing ones. """
+        get = self.slots.get
+        return np.fromiter((get(i, -1) for i in state_ids.tolist()), dtype=np.int64, count=len(state_ids))
+
+class SparseQTable(np.lib.mixins.NDArrayOperatorsMixin):
+    """
+    Sparse q-value table `(*obs_shape, action_count)` indexed like a numpy array.
+    Reads return copies and the missing states read as 0 without being materialized, so reads never evict a state.
+    Writes, including `np.add.at(Q, index, values)`, materialize the states. Any other numpy operation sees the dense table.
+    Unlike numpy, `Q[s]` isn't a view, so write a single value with `Q[s + (a,)] += x` instead of `Q[s][a] += x`.
+    """
+
+    def __init__(self, obs_shape: tuple, action_count: int, dtype = np.float64, max_states: int = None, rows: _SparseRows = None) -> None:
+        self.obs_shape = tuple(obs_shape)
+        self.action_count = action_count
+        self.shape = self.obs_shape + (action_count,)
+        self.dtype = np.dtype(dtype)
+        self._rows = _SparseRows(action_count, self.dtype, max_states) if rows is None else rows
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def materialized_count(self) -> int:
+        """ Number of materialized states. """
+        return len(self._rows.slots)
+
+    @property
+    def evictions(self) -> int:
+        return self._rows.evictions
+
+    def flat_view(self) -> SparseQTable:
+        """ `(state_count, action_count)` view sharing the rows of this table. """
+        return SparseQTable((int(np.prod(self.obs_shape)),), self.action_count, self.dtype, rows=self._rows)
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.zeros((int(np.prod(self.obs_shape)), self.action_count), dtype=self.dtype)
+        slots = self._rows.slots
+        if len(slots) > 0:
+            dense[list(slots.keys())] = self._rows.values[list(slots.values())]
+        return dense.reshape(self.shape)
+
+    def copy(self) -> np.ndarray:
+        """ Returns the dense copy like `q_vals` of the dense tables. """
+        return self.to_dense()
+
+    def __array__(self, dtype = None, copy = None) -> np.ndarray:
+        dense = self.to_dense()
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        state_ids, action, scalar = self._parse(key)
+        rows = self._rows
+        if scalar:
+            slot = rows.slots.get(state_ids, -1)
+            row = rows.values[slot].copy() if slot >= 0 else np.zeros(self.action_count, dtype=self.dtype)
+            return row if action is None else row[action]
+        flat_ids = state_ids.reshape(-1)
+        slots = rows.find(flat_ids)
+        values = rows.values[np.maximum(slots, 0)]
+        values[slots < 0] = 0
+        if action is None:
+            return values.reshape(state_ids.shape + (self.action_count,))
+        actions = np.broadcast_to(action, state_ids.shape).reshape(-1)
+        return values[np.arange(len(flat_ids)), actions].reshape(state_ids.shape)
+
+    def __setitem__(self, key, value):
+        state_ids, action, scalar = self._parse(key)
+        rows = self._rows
+        if scalar:
+            slot = rows.slot(state_ids)
+            rows.values[slot, slice(None) if action is None else action] = value
+            return
+        slots = self._materialize(state_ids)
+        rows.values[(slots,) if action is None else (slots, action)] = value
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method == "at" and inputs[0] is self:
+            # e.g. np.add.at(Q, index, values) accumulates in the rows
+            _, key, *values = inputs
+            state_ids, action, scalar = self._parse(key)
+            slots = self._materialize(np.asarray(state_ids))
+            ufunc.at(self._rows.values, (slots,) if action is None else (slots, action), *values)
+            return None
+        if any(isinstance(x, SparseQTable) for x in kwargs.get("out", ())):
+            return NotImplemented
+        inputs = tuple(x.to_dense() if isinstance(x, SparseQTable) else x for x in inputs)
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def _materialize(self, state_ids: np.ndarray) -> np.ndarray:
+        slot = self._rows.slot
+        return np.array([slot(i) for i in state_ids.reshape(-1).tolist()], dtype=np.int64).reshape(state_ids.shape)
+
+    def _parse(self, key):
+        """ Split an index into flat state ids, the action index or None and whether it's a single state. """
+        if not isinstance(key, tuple):
+            key = (key,)
+        d = len(self.obs_shape)
+        if len(key) < d or len(key) > d + 1:
+            raise IndexError(f"SparseQTable needs a full state index of {d} dimensions and optionally an action index.")
+        state_key = key[:d]
+        action = key[d] if len(key) > d else None
+        if isinstance(action, slice) and action == slice(None):
+            action = None
+        scalar = all(np.ndim(k) == 0 for k in state_key)
+        if d == 1:
+            state_ids = state_key[0]
+        else:
+            state_ids = np.ravel_multi_index(state_key, self.obs_shape)
+        if scalar:
+            return int(state_ids), action, True
+        return np.asarray(state_ids, dtype=np.int64), action, False
@@ -1,15 +1,21 @@
 from typing import List, Tuple
 from rl.agent import Agent
+from rl.agent.q_storage import QStorage, DenseQStorage
+from rl.rl_util.transition import Transition
+from rl.rl_util.policy import RandomPool, epsilon_greedy_actions, epsilon_greedy_batch
 import numpy as np
 
 class TabularQAgent(Agent):
     def __init__(self, obs_shape: tuple, 
                  action_count: int, 
-                 terminal_states: List[Tuple] = None) -> None:
+                 terminal_states: List[Tuple] = None,
+                 storage: QStorage = None) -> None:
+        self.storage = storage if storage is not None else DenseQStorage()
         self.__obs_shape = obs_shape
         self.__action_count = action_count
         self.__shape = obs_shape + (action_count,)
         self._terminal_states = terminal_states
+        self._random_pool = None
         self.reset()
         
     @property
@@ -24,6 +30,10 @@ class TabularQAgent(Agent):
     def shape(self):
         return self.__shape
     
+    @property
+    def state_count(self) -> int:
+        return int(np.prod(self.__obs_shape))
+    
     @property
     def q_vals(self):
         return self._Q.copy() 
@@ -31,12 +41,21 @@ class TabularQAgent(Agent):
     def reset(self) -> None:
         # Initialize action value q(s,a) for all state-action pairs (arbitrarily)
         self._Q = self.initializer()
+        # (state_count, action_count) view of Q for the flat state index mode
+        self._Q_flat = self._flat_view(self._Q)
         # Q(terminal, :) = 0
         if self._terminal_states is not None:
             self.set_terminal_states(self._terminal_states)
         
-    def initializer(self) -> np.ndarray:
-        return np.zeros(shape=self.__shape)
+    def state_dict(self) -> dict:
+        return {"Q": self._Q}
+    
+    def load_state_dict(self, state_dict: dict) -> None:
+        self._Q = state_dict["Q"]
+        self._Q_flat = self._flat_view(self._Q)
+        
+    def initializer(self, name: str = "Q") -> np.ndarray:
+        return self.storage.allocate(self.__shape, name)
         
     def set_terminal_states(self, terminal_states: List[Tuple]) -> None:
         assert terminal_states is not None
@@ -44,4 +63,69 @@ class TabularQAgent(Agent):
         self._terminal_states = terminal_states
         for s in terminal_states:
             self._Q[s] = 0
-            
\ No newline at end of file
+            
+    def _batch_index(self, states) -> Tuple[np.ndarray, ...]:
+        """ Convert states `(B, *state_dims)` to a tuple of index arrays for fancy indexing. """
+        states = np.asarray(states)
+        return tuple(states.reshape(len(states), -1).T)
+        
+    def to_state_id(self, state):
+        """ Convert a state `(*state_dims)` or states `(B, *state_dims)` to flat state indices.
+        Convert states once at the boundary and use `get_action_id()` and `update_ids()` in the per-step loop. """
+        state = np.asarray(state)
+        return np.ravel_multi_index(tuple(np.moveaxis(state, -1, 0)), self.__obs_shape)
+    
+    def get_actions(self, states) -> np.ndarray:
+        """ Returns epsilon-greedy actions for a batch of states `(B, *state_dims)` with one lookup. Ties of the greedy actions are broken at random. """
+        return epsilon_greedy_batch(self._Q, states, self.epsilon, self._get_random_pool())
+    
+    def greedy_actions(self, chunk_size: int = 65536) -> np.ndarray:
+        """ Returns the greedy action of every state `(*obs_shape)`, ties go to the first action like `np.argmax()`.
+        The states are read in chunks, so sparse and memory-mapped tables aren't densified at once. """
+        state_count = self.state_count
+        actions = np.empty(state_count, dtype=np.min_scalar_type(self.__action_count - 1))
+        for start in range(0, state_count, chunk_size):
+            state_ids = np.arange(start, min(start + chunk_size, state_count))
+            actions[start:start + chunk_size] = np.argmax(self._greedy_q_values(state_ids), axis=-1)
+        return actions.reshape(self.__obs_shape)
+    
+    def _greedy_q_values(self, state_ids: np.ndarray) -> np.ndarray:
+        """ Action values `(B, action_count)` of the flat state indices which the greedy policy maximizes. """
+        return self._Q_flat[state_ids]
+    
+    def get_action_id(self, state_id: int) -> int:
+        """ Returns an action that follows the behavior policy given the flat state index.
+        It falls back to `get_action()` of the state, subclasses override it to skip the conversion. """
+        return self.get_action(self.to_state(state_id))
+    
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        """ Update the agent with a transition of flat state indices.
+        It falls back to `update()` of the states, subclasses override it to skip the conversion. """
+        self.update(Transition(self.to_state(state_id), action, self.to_state(next_state_id), reward, terminated))
+    
+    def to_state(self, state_id: int) -> Tuple[int, ...]:
+        """ Convert a flat state index to a state tuple, the inverse of `to_state_id()`. """
+        return tuple(int(i) for i in np.unravel_index(state_id, self.__obs_shape))
+            
+    def _add_mean_at(self, Q, index: Tuple[np.ndarray, ...], values: np.ndarray) -> None:
+        """ `Q[index] += values` where the values of duplicate indices are averaged instead of summed,
+        so the duplicate (s, a) pairs of a batch don't overshoot their targets. """
+        flat_index = np.ravel_multi_index(index, Q.shape)
+        unique_index, inverse = np.unique(flat_index, return_inverse=True)
+        sums = np.bincount(inverse, weights=values, minlength=len(unique_index))
+        counts = np.bincount(inverse, minlength=len(unique_index))
+        np.add.at(Q, np.unravel_index(unique_index, Q.shape), sums / counts)
+            
+    def _epsilon_greedy_batch(self, q_values: np.ndarray) -> np.ndarray:
+        """ Epsilon-greedy actions of action values `(B, action_count)`. """
+        return epsilon_greedy_actions(q_values, self.epsilon, self._get_random_pool())
+    
+    def _get_random_pool(self) -> RandomPool:
+        if self._random_pool is None:
+            # seeded from the global random state, so `rl.util.seed()` makes the batched actions reproducible
+            self._random_pool = RandomPool(np.random.default_rng(np.random.randint(2**32)))
+        return self._random_pool
+            
+    def _flat_view(self, Q: np.ndarray) -> np.ndarray:
+        """ `(state_count, action_count)` view sharing the memory of Q. """
+        return self.storage.flat_view(Q, self.__action_count)
@@ -0,0 +1,132 @@
+from typing import List, Tuple
+from abc import abstractmethod
+import numpy as np
+from rl.agent import Agent
+from rl.rl_util import Transition
+
+class TabularQPopulation(Agent):
+    """
+    K independent tabular learners whose q-values are stored as one `(K, *obs_shape, action_count)` array.
+    The learner `k` interacts with the instance `k` of a K-wide vectorized environment (e.g. `rl.environment.VectorCliffWalking(K)`),
+    so the states, actions, rewards and terminated of every call are batched `(K, ...)`.
+    Each learner follows the same update rule as the scalar agent. The learner `k` draws its random numbers from its own stream `rngs[k]`,
+    which is spawned from `np.random.SeedSequence(seed)`, so a learner's random numbers don't depend on the other learners or the population size.
+    The streams are read in blocks of `random_block_size` numbers to keep a step vectorized.
+    """
+
+    random_block_size = 64
+
+    def __init__(self, population_size: int,
+                 obs_shape: tuple,
+                 action_count: int,
+                 terminal_states: List[Tuple] = None,
+                 epsilon = 0.1,
+                 alpha = 0.1,
+                 gamma = 0.9,
+                 seed = None) -> None:
+        self.__population_size = population_size
+        self.__obs_shape = obs_shape
+        self.__action_count = action_count
+        self.__shape = (population_size,) + obs_shape + (action_count,)
+        self._terminal_states = terminal_states
+        self._learners = np.arange(population_size)
+        self.epsilon = epsilon
+        self.alpha = alpha
+        self.gamma = gamma
+        self.rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(population_size)]
+        # (n, K) random numbers not used yet, the column k is from rngs[k]
+        self._random_block = np.empty((0, population_size))
+        self.reset()
+
+    @property
+    def population_size(self) -> int:
+        return self.__population_size
+
+    @property
+    def obs_shape(self):
+        return self.__obs_shape
+
+    @property
+    def action_count(self):
+        return self.__action_count
+
+    @property
+    def shape(self):
+        return self.__shape
+
+    @property
+    def q_vals(self):
+        return self._Q.copy()
+
+    def reset(self) -> None:
+        self._Q = self.initializer()
+        if self._terminal_states is not None:
+            self.set_terminal_states(self._terminal_states)
+
+    def state_dict(self) -> dict:
+        return {"Q": self._Q, **self._random_state_dict()}
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        self._Q = state_dict["Q"]
+        self._load_random_state_dict(state_dict)
+
+    def initializer(self) -> np.ndarray:
+        return np.zeros(shape=self.__shape)
+
+    def set_terminal_states(self, terminal_states: List[Tuple]) -> None:
+        assert terminal_states is not None
+
+        self._terminal_states = terminal_states
+        for s in terminal_states:
+            self._Q[(slice(None),) + tuple(s)] = 0
+
+    def get_action(self, states) -> np.ndarray:
+        return self.get_actions(states)
+
+    def get_actions(self, states) -> np.ndarray:
+        """ Returns `(K,)` epsilon-greedy actions of all the learners given their states `(K, *state_dims)`. """
+        return self._epsilon_greedy(self._Q[self._index(states)])
+
+    def update(self, transition: Transition) -> None:
+        """ Update all the learners with a transition whose fields are batched `(K, ...)`. """
+        self.update_batch(
+            transition.current_state,
+            transition.current_action,
+            transition.reward,
+            transition.next_state,
+            transition.terminated
+        )
+
+    @abstractmethod
+    def update_batch(self, states, actions, rewards, next_states, terminated) -> None:
+        """ Update all the learners. The learner `k` is updated with the transition `k`. """
+        pass
+
+    def _index(self, states) -> Tuple[np.ndarray, ...]:
+        """ (learner, *state) index arrays. """
+        states = np.asarray(states)
+        return (self._learners,) + tuple(states.reshape(self.__population_size, -1).T)
+
+    def _epsilon_greedy(self, q_values: np.ndarray) -> np.ndarray:
+        greedy_actions = np.argmax(q_values, axis=-1)
+        p = self._random(2)
+        explore = p[0] <= self.epsilon
+        random_actions = np.minimum((p[1] * self.__action_count).astype(np.int64), self.__action_count - 1)
+        return np.where(explore, random_actions, greedy_actions)
+
+    def _random(self, count: int) -> np.ndarray:
+        """ `(count, K)` uniform random numbers in [0, 1). The column `k` is the next numbers of the stream of the learner `k`. """
+        if count > len(self._random_block):
+            block = np.stack([rng.random(max(count, self.random_block_size)) for rng in self.rngs], axis=1)
+            self._random_block = np.concatenate((self._random_block, block))
+        values = self._random_block[:count]
+        self._random_block = self._random_block[count:]
+        return values
+
+    def _random_state_dict(self) -> dict:
+        return {"rngs": [rng.bit_generator.state for rng in self.rngs], "random_block": self._random_block.copy()}
+
+    def _load_random_state_dict(self, state_dict: dict) -> None:
+        for rng, state in zip(self.rngs, state_dict["rngs"]):
+            rng.bit_generator.state = state
+        self._random_block = np.array(state_dict["random_block"])
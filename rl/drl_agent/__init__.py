@@ -1,2 +1,3 @@
 from .reinforce import *
 from .deep_sarsa import *
+from .deep_sarsa_actor_learner import *
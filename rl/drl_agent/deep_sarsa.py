@@ -4,7 +4,7 @@ import torch.nn as nn
 import torch.optim as optim
 import numpy as np
 from rl import Transition, Agent, epsilon_greedy_dnn, OnPolicyReplay
-from rl.util import Decay, NoDecay
+from rl.util import Decay, NoDecay, profile_phase, profile_count
 
 class DeepSarsa(Agent):
     def __init__(self,
@@ -33,27 +33,32 @@ class DeepSarsa(Agent):
             # sample from the onpolicy replay
             prev_transitions = self.onpolicy_replay.sample()
             # for the batch learning
-            current_states, current_actions, next_states, rewards, terminated_arr = (
-                Transition.to_tensor_batch(prev_transitions, self.device)
-            )
-            # get a next action from the next transition
-            next_actions = torch.cat(
-                [current_actions[1:], 
-                 transition.to_tensor(self.device).current_action.unsqueeze(0)]
-            )
+            with profile_phase("to_tensor_batch"):
+                current_states, current_actions, next_states, rewards, terminated_arr = (
+                    Transition.to_tensor_batch(prev_transitions, self.device)
+                )
+                # get a next action from the next transition
+                next_actions = torch.cat(
+                    [current_actions[1:], 
+                     transition.to_tensor(self.device).current_action.unsqueeze(0)]
+                )
             # compute td loss
-            loss = self.compute_td_loss(
-                current_states,
-                current_actions,
-                next_states,
-                next_actions,
-                rewards,
-                terminated_arr
-            )
+            with profile_phase("compute_td_loss"):
+                loss = self.compute_td_loss(
+                    current_states,
+                    current_actions,
+                    next_states,
+                    next_actions,
+                    rewards,
+                    terminated_arr
+                )
             # backpropagation
-            self.optimizer.zero_grad()
-            loss.backward()
-            self.optimizer.step()
+            with profile_phase("backward"):
+                self.optimizer.zero_grad()
+                loss.backward()
+            with profile_phase("optimizer_step"):
+                self.optimizer.step()
+            profile_count("updates")
             self.step += 1
             # set epsilon
             self.epsilon = self.epsilon_decay.step()
@@ -62,12 +67,41 @@ class DeepSarsa(Agent):
         self.onpolicy_replay.add(transition)
             
     def get_action(self, state: torch.Tensor) -> Any:
-        return epsilon_greedy_dnn(
-            self.q_value_net,
-            torch.FloatTensor(state, device=self.device),
-            self.action_count,
-            self.epsilon
-        )
+        with profile_phase("epsilon_greedy_dnn"):
+            return epsilon_greedy_dnn(
+                self.q_value_net,
+                torch.FloatTensor(state, device=self.device),
+                self.action_count,
+                self.epsilon
+            )
+    
+    def get_actions(self, states) -> np.ndarray:
+        """ Returns epsilon-greedy actions for a batch of states with one forward propagation. Each state explores independently. """
+        states = torch.as_tensor(np.asarray(states), dtype=torch.float32, device=self.device)
+        batch_size = states.shape[0]
+        with torch.no_grad():
+            greedy_actions = torch.argmax(self.q_value_net(states), dim=1).cpu().numpy()
+        explore = np.random.rand(batch_size) <= self.epsilon
+        random_actions = np.random.randint(self.action_count, size=batch_size)
+        return np.where(explore, random_actions, greedy_actions)
+            
+    def state_dict(self) -> dict:
+        return {
+            "q_value_net": self.q_value_net.state_dict(),
+            "optimizer": self.optimizer.state_dict(),
+            "onpolicy_replay": self.onpolicy_replay.state_dict(),
+            "epsilon_decay_step": self.epsilon_decay.current_step,
+            "epsilon": self.epsilon,
+            "step": self.step
+        }
+    
+    def load_state_dict(self, state_dict: dict) -> None:
+        self.q_value_net.load_state_dict(state_dict["q_value_net"])
+        self.optimizer.load_state_dict(state_dict["optimizer"])
+        self.onpolicy_replay.load_state_dict(state_dict["onpolicy_replay"])
+        self.epsilon_decay.current_step = state_dict["epsilon_decay_step"]
+        self.epsilon = state_dict["epsilon"]
+        self.step = state_dict["step"]
             
     def compute_td_loss(self, 
                         current_states: torch.Tensor, 
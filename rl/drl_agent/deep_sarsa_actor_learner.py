@@ -0,0 +1,266 @@
+from __future__ import annotations
+import queue
+from typing import Any, Callable, List, NamedTuple
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+import torch.multiprocessing as mp
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+from rl import epsilon_greedy_dnn
+from rl.drl_agent.deep_sarsa import DeepSarsa
+from rl.util import Decay, NoDecay
+from rl.environment import reset_env, make_step_function
+
+class SharedParameterBuffer:
+    """ Network parameters in a flat shared-memory tensor with a version counter. The learner publishes, the actors pull. """
+
+    def __init__(self, net: nn.Module, context = mp) -> None:
+        self._buffer = parameters_to_vector(net.parameters()).detach().cpu().clone().share_memory_()
+        self._version = context.Value("q", 0)
+
+    @property
+    def version(self) -> int:
+        return self._version.value
+
+    def publish(self, net: nn.Module) -> int:
+        """ Copy the parameters of the network into the buffer and returns the new version. """
+        with self._version.get_lock():
+            self._buffer.copy_(parameters_to_vector(net.parameters()).detach())
+            self._version.value += 1
+            return self._version.value
+
+    def pull(self, net: nn.Module, version: int) -> int:
+        """ Copy the buffer into the network if it's newer than the version and returns the version of the network. """
+        with self._version.get_lock():
+            if self._version.value == version:
+                return version
+            parameters = self._buffer.clone()
+            version = self._version.value
+        vector_to_parameters(parameters, net.parameters())
+        return version
+
+class ActorLearnerStats(NamedTuple):
+    updates: int
+    steps: int
+    episode_returns: np.ndarray
+    policy_lags: np.ndarray
+
+    @property
+    def mean_policy_lag(self) -> float:
+        return float(self.policy_lags.mean()) if len(self.policy_lags) > 0 else 0.0
+
+    @property
+    def max_policy_lag(self) -> int:
+        return int(self.policy_lags.max()) if len(self.policy_lags) > 0 else 0
+
+class DeepSarsaActorLearner:
+    """
+    Asynchronous actor-learner mode of `DeepSarsa`.
+    Actor processes run their own environment copies with local copies of the q-value network and push on-policy segments through a shared-memory queue.
+    The calling process is the learner. It applies one Sarsa update per segment and publishes its weights to `SharedParameterBuffer` every `publish_interval` updates.
+    The policy lag of a segment is the number of weight versions the learner is ahead of the weights the actor used.
+
+    `env_fn` and `q_value_net_fn` are sent to the actor processes, so they must be picklable with the multiprocessing start method.
+    """
+
+    def __init__(self,
+                 env_fn: Callable[[], Any],
+                 q_value_net_fn: Callable[[], nn.Module],
+                 optimizer_fn: Callable[[Any], optim.Optimizer],
+                 action_count: int,
+                 num_actors: int = None,
+                 segment_length: int = 32,
+                 loss_func = nn.MSELoss(),
+                 epsilon_decay: Decay = NoDecay(0.1),
+                 gamma = 0.99,
+                 publish_interval: int = 1,
+                 queue_size: int = None,
+                 seed: int = 0,
+                 context = None,
+                 device: torch.device = None) -> None:
+        """
+        Args:
+            env_fn (Callable[[], Any]): creates an environment of an actor
+            q_value_net_fn (Callable[[], nn.Module]): creates a q-value network
+            optimizer_fn (Callable[[Any], optim.Optimizer]): creates the optimizer of the learner from the network parameters
+            action_count (int): action count
+            num_actors (int, optional): number of actor processes. if it's None, the number of cores minus one. Defaults to None.
+            segment_length (int, optional): number of transitions of a segment. Defaults to 32.
+            loss_func (optional): td loss. Defaults to nn.MSELoss().
+            epsilon_decay (Decay, optional): exploration schedule of every actor, stepped once per segment. Defaults to NoDecay(0.1).
+            gamma (float, optional): discount factor. Defaults to 0.99.
+            publish_interval (int, optional): publish the weights every this number of updates. Defaults to 1.
+            queue_size (int, optional): maximum number of segments in the queue. if it's None, 2 per actor. Defaults to None.
+            seed (int, optional): the actor `i` is seeded with `seed + i`. Defaults to 0.
+            context (optional): multiprocessing context. if it's None, the default context of `torch.multiprocessing`. Defaults to None.
+            device (torch.device, optional): device of the learner. Defaults to None.
+        """
+
+        self.env_fn = env_fn
+        self.q_value_net_fn = q_value_net_fn
+        self.action_count = action_count
+        self.num_actors = num_actors if num_actors is not None else max(1, mp.cpu_count() - 1)
+        self.segment_length = segment_length
+        self.epsilon_decay = epsilon_decay
+        self.publish_interval = publish_interval
+        self.queue_size = queue_size if queue_size is not None else 2 * self.num_actors
+        self.seed = seed
+        self.context = context if context is not None else mp.get_context()
+        self.device = device
+
+        self.q_value_net = q_value_net_fn().to(device=device)
+        self.optimizer = optimizer_fn(self.q_value_net.parameters())
+        # only compute_td_loss() of the learner is used
+        self.learner = DeepSarsa(self.q_value_net, self.optimizer, action_count, loss_func, epsilon_decay=NoDecay(0.0), gamma=gamma, device=device)
+        self.parameters = SharedParameterBuffer(self.q_value_net, self.context)
+        self.parameters.publish(self.q_value_net)
+
+    def train(self, max_updates: int) -> ActorLearnerStats:
+        """ Start the actors, learn from their segments for the number of updates and stop them. """
+        segment_queue = self.context.Queue(self.queue_size)
+        stop_event = self.context.Event()
+        actors = [
+            self.context.Process(
+                target=_run_actor,
+                args=(
+                    self.env_fn,
+                    self.q_value_net_fn,
+                    self.action_count,
+                    self.parameters,
+                    segment_queue,
+                    stop_event,
+                    self.segment_length,
+                    self.epsilon_decay,
+                    self.seed + i
+                ),
+                daemon=True
+            )
+            for i in range(self.num_actors)
+        ]
+        for actor in actors:
+            actor.start()
+
+        updates = 0
+        steps = 0
+        episode_returns: List[float] = []
+        policy_lags: List[int] = []
+        try:
+            while updates < max_updates:
+                version, segment, returns = segment_queue.get()
+                policy_lags.append(self.parameters.version - version)
+                episode_returns.extend(returns)
+                self._learn(segment)
+                updates += 1
+                steps += len(segment[0])
+                if updates % self.publish_interval == 0:
+                    self.parameters.publish(self.q_value_net)
+        finally:
+            stop_event.set()
+            # unblock the actors waiting on the full queue
+            while any(actor.is_alive() for actor in actors):
+                try:
+                    segment_queue.get(timeout=0.1)
+                except (queue.Empty, OSError, EOFError):
+                    # the segments of exited actors can't be received anymore
+                    pass
+            for actor in actors:
+                actor.join()
+
+        return ActorLearnerStats(updates, steps, np.array(episode_returns), np.array(policy_lags))
+
+    def get_action(self, state: np.ndarray, epsilon: float = 0.0) -> Any:
+        """ Returns actions of the learner network given batched states. """
+        return epsilon_greedy_dnn(
+            self.q_value_net,
+            torch.as_tensor(state, dtype=torch.float32, device=self.device),
+            self.action_count,
+            epsilon
+        )
+
+    def _learn(self, segment):
+        current_states, current_actions, next_states, next_actions, rewards, terminated_arr = (
+            tensor.to(device=self.device) for tensor in segment
+        )
+        loss = self.learner.compute_td_loss(
+            current_states,
+            current_actions,
+            next_states,
+            next_actions,
+            rewards,
+            terminated_arr
+        )
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+
+def _run_actor(env_fn,
+               q_value_net_fn,
+               action_count: int,
+               parameters: SharedParameterBuffer,
+               segment_queue,
+               stop_event,
+               segment_length: int,
+               epsilon_decay: Decay,
+               seed: int):
+    torch.set_num_threads(1)
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+
+    env = env_fn()
+    step = make_step_function(env)
+    net = q_value_net_fn()
+    version = parameters.pull(net, -1)
+    epsilon = epsilon_decay.step()
+
+    def select(state) -> int:
+        x = torch.as_tensor(np.asarray(state)[np.newaxis], dtype=torch.float32)
+        return int(epsilon_greedy_dnn(net, x, action_count, epsilon)[0])
+
+    state = reset_env(env)
+    action = select(state)
+    episode_return = 0.0
+    while not stop_event.is_set():
+        current_states, current_actions, next_states, next_actions, rewards, terminated_arr = [], [], [], [], [], []
+        returns = []
+        segment_version = version
+        for _ in range(segment_length):
+            next_state, reward, terminated, done = step(action)
+            episode_return += reward
+            # the next action follows the current policy, it's masked out when terminated
+            next_action = 0 if terminated else select(next_state)
+            current_states.append(state)
+            current_actions.append(action)
+            next_states.append(next_state)
+            next_actions.append(next_action)
+            rewards.append(reward)
+            terminated_arr.append(terminated)
+            if done:
+                returns.append(episode_return)
+                episode_return = 0.0
+                state = reset_env(env)
+                action = select(state)
+            else:
+                state, action = next_state, next_action
+
+        # tensors sent through the torch queue are moved to shared memory instead of being pickled
+        segment = (
+            torch.as_tensor(np.array(current_states), dtype=torch.float32),
+            torch.as_tensor(current_actions),
+            torch.as_tensor(np.array(next_states), dtype=torch.float32),
+            torch.as_tensor(next_actions),
+            torch.as_tensor(rewards, dtype=torch.float32),
+            torch.as_tensor(terminated_arr).int()
+        )
+        while not stop_event.is_set():
+            try:
+                segment_queue.put((segment_version, segment, returns), timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+        epsilon = epsilon_decay.step()
+        version = parameters.pull(net, version)
+
+    # don't wait for the queued segments to be received when exiting
+    segment_queue.cancel_join_thread()
@@ -4,7 +4,9 @@ import torch
 import torch.nn as nn
 from torch.distributions import Distribution
 from torch.optim import Optimizer
+from torch.nn.utils.rnn import pad_sequence
 from typing import Callable
+from rl.util import profile_phase, profile_count
 
 class Reinforce(rl.Agent):
     def __init__(self,
@@ -12,17 +14,26 @@ class Reinforce(rl.Agent):
                  optimizer: Optimizer,
                  dist_generator: Callable[[torch.Tensor], Distribution],
                  gamma = 0.99,
-                 device: torch.device = None) -> None:
+                 device: torch.device = None,
+                 batch_episodes: int = 1) -> None:
+        """
+        Args:
+            batch_episodes (int, optional): number of episodes of an update. The episodes are padded to the longest one
+                and trained with one masked loss averaged over the episodes. The agents of `update_batch()` count as separate episodes. Defaults to 1.
+        """
         
         self.policy_net = policy_net
         self.optimizer = optimizer
         self.dist_generator = dist_generator
         self.device = device
         self.gamma = gamma
+        self.batch_episodes = batch_episodes
+        self._episodes = [] # (rewards, action log probs) of episodes waiting for the update
         self.current_action_log_prob = None
         self.action_log_probs = []
         self.rewards = []
         self.__loss = 0.0
+        self._reset_batch()
         
     def reset(self) -> None:
         return super().reset()
@@ -31,7 +42,15 @@ class Reinforce(rl.Agent):
         self.current_action_log_prob = None
         self.action_log_probs = []
         self.rewards = []
-        self.__loss = 0.0
+        self._reset_batch()
+        
+    def _reset_batch(self):
+        # per-agent data of get_actions() and update_batch()
+        self.current_action_log_probs = None
+        self.batch_action_log_probs = []
+        self.batch_rewards = []
+        self.batch_alive = []
+        self._alive = None
         
     def update(self, transition: rl.Transition):
         if self.current_action_log_prob is None:
@@ -41,29 +60,74 @@ class Reinforce(rl.Agent):
         self.action_log_probs.append(self.current_action_log_prob)
         self.current_action_log_prob = None
         
+    def update_batch(self, states, actions, rewards, next_states, terminated):
+        """ Collect the rewards of all the agents of `get_actions()`. An agent is ignored after it's terminated until the next episode. """
+        if self.current_action_log_probs is None:
+            raise Exception("You need to call get_actions() method before call it.")
+        if self._alive is None:
+            self._alive = np.ones(len(self.current_action_log_probs), dtype=np.bool_)
+        # collect data
+        self.batch_rewards.append(np.asarray(rewards, dtype=np.float32))
+        self.batch_action_log_probs.append(self.current_action_log_probs)
+        self.batch_alive.append(self._alive.copy())
+        self._alive &= ~np.asarray(terminated, dtype=np.bool_)
+        self.current_action_log_probs = None
+        
     def end_episode(self):
-        # terminal time step
-        T = len(self.rewards)
-        returns = np.empty(T, dtype=np.float32)
-        current_return = 0.0
-        # compute returns for all time steps in the episode
-        for t in reversed(range(T)):
-            current_return = self.rewards[t] + self.gamma * current_return
-            returns[t] = current_return
+        if len(self.batch_rewards) > 0:
+            # every agent of update_batch() is an episode
+            alive = np.stack(self.batch_alive)
+            rewards = np.stack(self.batch_rewards)
+            log_probs = torch.stack(self.batch_action_log_probs)
+            for i, T in enumerate(alive.sum(axis=0)):
+                self._episodes.append((rewards[:T, i], log_probs[:T, i]))
+            self._reset_batch()
+        elif len(self.rewards) > 0:
+            self._episodes.append((np.asarray(self.rewards, dtype=np.float32), torch.stack(self.action_log_probs)))
+        
+        if len(self._episodes) >= self.batch_episodes:
+            self._learn()
+            
+    def _learn(self):
+        episodes = self._episodes
+        self._episodes = []
+        M = len(episodes)
+        # pad the episodes to (M, T)
+        lengths = np.array([len(rewards) for rewards, _ in episodes])
+        mask = np.arange(lengths.max()) < lengths[:, np.newaxis]
+        rewards = np.zeros(mask.shape, dtype=np.float32)
+        rewards[mask] = np.concatenate([rewards for rewards, _ in episodes])
+        log_probs = pad_sequence([log_probs.reshape(-1) for _, log_probs in episodes], batch_first=True).to(device=self.device)
+        # compute returns for all time steps of all the episodes
+        with profile_phase("discounted_returns"):
+            returns = rl.discounted_returns(rewards, self.gamma)
+        # compute baseline across the batch
+        baseline = returns[mask].mean()
         # convert to tensor
-        returns = torch.tensor(returns).to(device=self.device)
-        log_probs = torch.stack(self.action_log_probs).to(device=self.device)
-        # compute baseline
-        baseline = returns.mean()
+        advantages = torch.from_numpy(((returns - baseline) * mask).astype(np.float32)).to(device=self.device)
         # compute loss
-        loss = -(returns - baseline) * log_probs
-        loss = torch.sum(loss)
+        loss = -torch.sum(advantages * log_probs) / M
         # back propagation
-        self.optimizer.zero_grad()
-        loss.backward()
-        self.optimizer.step()
+        with profile_phase("backward"):
+            self.optimizer.zero_grad()
+            loss.backward()
+        with profile_phase("optimizer_step"):
+            self.optimizer.step()
+        profile_count("updates")
         self.__loss = loss.cpu().detach().item()
         
+    def state_dict(self) -> dict:
+        # the episodes waiting for the update hold computation graphs, so they aren't saved
+        return {
+            "policy_net": self.policy_net.state_dict(),
+            "optimizer": self.optimizer.state_dict()
+        }
+        
+    def load_state_dict(self, state_dict: dict) -> None:
+        self.policy_net.load_state_dict(state_dict["policy_net"])
+        self.optimizer.load_state_dict(state_dict["optimizer"])
+        self._episodes = []
+        
     @property
     def loss(self) -> np.ndarray:
         return self.__loss
@@ -79,3 +143,16 @@ class Reinforce(rl.Agent):
         # store for training
         self.current_action_log_prob = pd.log_prob(action)
         return action.cpu().detach().item()
+    
+    def get_actions(self, states: np.ndarray) -> np.ndarray:
+        """ Returns actions of all the agents with one forward propagation. Their log-probabilities are stored per agent for `update_batch()`. """
+        x = torch.as_tensor(np.asarray(states), device=self.device, dtype=torch.float32)
+        # foward propagation
+        pdparam = self.policy_net(x)
+        # generate policy distributions
+        pd = self.dist_generator(pdparam)
+        # sample actions from the policy distributions
+        actions = pd.sample()
+        # store for training
+        self.current_action_log_probs = pd.log_prob(actions)
+        return actions.cpu().detach().numpy()
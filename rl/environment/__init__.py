@@ -1,2 +1,8 @@
+from .env_util import *
+from .tabular_environment import *
 from .windy_gridworld import *
 from .cliff_walking import *
+from .vector_windy_gridworld import *
+from .vector_cliff_walking import *
+from .subproc_vector_env import *
+from .latency_env import *
@@ -0,0 +1,33 @@
+from typing import Any, Callable, NamedTuple, Tuple
+import numpy as np
+
+class VectorStep(NamedTuple):
+    """ Result of `step()` of the vectorized environments. """
+    next_states: np.ndarray     # (num_envs, *obs_dims), before the auto-reset
+    rewards: np.ndarray         # (num_envs,)
+    terminated: np.ndarray      # (num_envs,)
+    truncated: np.ndarray       # (num_envs,) e.g. by a time limit of a gym environment
+    states: np.ndarray          # (num_envs, *obs_dims) current states of the next step, after the auto-reset
+
+def reset_env(env):
+    """ Reset an environment of the rl or gym api and return the start state. """
+    state = env.reset()
+    # gym returns (state, info) since its new reset api
+    if isinstance(state, tuple) and len(state) == 2 and isinstance(state[1], dict):
+        state = state[0]
+    return state
+
+def make_step_function(env) -> Callable[[Any], Tuple[Any, float, bool, bool]]:
+    """ Returns a function `step(action) -> (next_state, reward, terminated, done)` for both the rl and gym step api.
+    `done` is True when the episode is terminated or truncated. """
+    env_step = env.step
+
+    def step(action):
+        result = env_step(action)
+        if len(result) == 3:
+            next_state, reward, terminated = result
+            return next_state, reward, terminated, terminated
+        next_state, reward, terminated, truncated = result[:4]
+        return next_state, reward, terminated, terminated or truncated
+
+    return step
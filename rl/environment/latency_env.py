@@ -0,0 +1,45 @@
+from __future__ import annotations
+import time
+import numpy as np
+
+class LatencyEnv:
+    """
+    Local stand-in for a slow or remote environment (e.g. a Unity ML-Agents simulator). It wraps an environment and sleeps
+    before every `step()` and `reset()`. Sleeping releases the GIL like waiting for a remote simulator,
+    so it can test and benchmark `Trainer(pipeline_staleness=...)` without Unity. The other attributes are the ones of the wrapped environment.
+    """
+
+    def __init__(self, env, step_latency: float = 0.001, reset_latency: float = 0.0, jitter: float = 0.0, seed: int = None) -> None:
+        """
+        Args:
+            env: wrapped environment, scalar or vectorized
+            step_latency (float, optional): seconds of every step. Defaults to 0.001.
+            reset_latency (float, optional): seconds of every reset. Defaults to 0.0.
+            jitter (float, optional): up to this many seconds are added to every latency uniformly at random. Defaults to 0.0.
+            seed (int, optional): seed of the jitter, which doesn't use the global random state of the agents. Defaults to None.
+        """
+        self.env = env
+        self.step_latency = step_latency
+        self.reset_latency = reset_latency
+        self.jitter = jitter
+        self._rng = np.random.default_rng(seed)
+
+    def reset(self):
+        self._sleep(self.reset_latency)
+        return self.env.reset()
+
+    def step(self, action):
+        self._sleep(self.step_latency)
+        return self.env.step(action)
+
+    def __getattr__(self, name: str):
+        # only called for the attributes which aren't found, e.g. obs_shape, num_envs, states
+        if name == "env":
+            raise AttributeError(name)
+        return getattr(self.env, name)
+
+    def _sleep(self, latency: float):
+        if self.jitter > 0:
+            latency += self._rng.uniform(0.0, self.jitter)
+        if latency > 0:
+            time.sleep(latency)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+import multiprocessing as mp
+import traceback
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Tuple
+import numpy as np
+from rl.environment.env_util import VectorStep, reset_env, make_step_function
+
+class SubprocVectorEnv:
+    """
+    N copies of an environment stepped at once in worker processes, with the interface of the in-process vector environments (e.g. `VectorCliffWalking`).
+    Each worker runs a contiguous slice of the copies. A step writes the actions into shared memory and sends one command per worker,
+    then the workers write the next states, rewards and terminated flags of their copies into preallocated `multiprocessing.shared_memory` arrays,
+    so nothing but the short commands is pickled.
+
+    The environments have the rl api `reset() -> state`, `step(action) -> (next_state, reward, terminated)` or the gym api.
+    A copy is reset by its worker when it's terminated or truncated (e.g. by the time limit of a gym environment),
+    so `states` of the `step()` result is the current states of the next step.
+    `env_fn` is sent to the worker processes, so it must be picklable with the multiprocessing start method.
+    """
+
+    def __init__(self,
+                 env_fn: Callable[[], Any],
+                 num_envs: int,
+                 num_workers: int = None,
+                 action_shape: tuple = (),
+                 action_dtype = np.int64,
+                 seed: int = 0,
+                 context = None) -> None:
+        """
+        Args:
+            env_fn (Callable[[], Any]): creates an environment copy
+            num_envs (int): number of environment copies
+            num_workers (int, optional): number of worker processes. if it's None, `min(num_envs, cpu count)`. Defaults to None.
+            action_shape (tuple, optional): shape of an action. Defaults to () for discrete actions.
+            action_dtype (optional): dtype of the actions. Defaults to np.int64.
+            seed (int, optional): numpy of the worker `i` is seeded with `seed + i`. Defaults to 0.
+            context (optional): multiprocessing context. if it's None, the default context. Defaults to None.
+        """
+
+        assert num_envs > 0
+        self.num_envs = num_envs
+        self.num_workers = min(num_envs, num_workers if num_workers is not None else mp.cpu_count())
+        self.context = context if context is not None else mp.get_context()
+        self._closed = True
+
+        # copy the attributes of the environment and get the observation layout from a probe copy
+        env = env_fn()
+        for name in ("obs_shape", "action_count", "start_state", "goal_state", "observation_space", "action_space"):
+            if hasattr(env, name):
+                setattr(self, name, getattr(env, name))
+        state = np.asarray(reset_env(env))
+        if hasattr(env, "close"):
+            env.close()
+
+        layout = _layout({
+            "actions": ((num_envs,) + tuple(action_shape), np.dtype(action_dtype)),
+            "states": ((num_envs,) + state.shape, state.dtype),
+            "next_states": ((num_envs,) + state.shape, state.dtype),
+            "rewards": ((num_envs,), np.dtype(np.float64)),
+            "terminated": ((num_envs,), np.dtype(np.bool_)),
+            "truncated": ((num_envs,), np.dtype(np.bool_))
+        })
+        size = max(offset + int(np.prod(shape)) * dtype.itemsize for shape, dtype, offset in layout.values())
+        self._remotes = []
+        self._processes = []
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._closed = False
+        try:
+            self._buffers = _buffers(self._shm, layout)
+            self._actions = self._buffers["actions"]
+
+            bounds = np.linspace(0, num_envs, self.num_workers + 1).astype(np.int64)
+            for i in range(self.num_workers):
+                remote, worker_remote = self.context.Pipe()
+                self._remotes.append(remote)
+                process = self.context.Process(
+                    target=_run_worker,
+                    args=(worker_remote, env_fn, int(bounds[i]), int(bounds[i + 1]), self._shm.name, layout, seed + i),
+                    daemon=True
+                )
+                try:
+                    process.start()
+                finally:
+                    worker_remote.close()
+                self._processes.append(process)
+
+            self.reset()
+        except BaseException:
+            # stop the started workers and unlink the shared memory, nothing else would release it
+            self.close()
+            raise
+
+    def reset(self) -> np.ndarray:
+        """ Reset all the copies.
+
+        Returns:
+            np.ndarray: start states `(num_envs, *obs_dims)`
+        """
+
+        self._command("reset")
+        return self._buffers["states"].copy()
+
+    def step(self, actions: np.ndarray) -> VectorStep:
+        """ Move all the copies to next step. Terminated or truncated copies are reset, so `states` of the result is the current states of the next step.
+
+        Args:
+            actions (np.ndarray): `(num_envs, *action_shape)` actions
+
+        Returns:
+            VectorStep: next states `(num_envs, *obs_dims)`, rewards `(num_envs,)`, terminated `(num_envs,)`, truncated `(num_envs,)`
+                and the current states of the next step `(num_envs, *obs_dims)`
+        """
+
+        self._actions[:] = actions
+        self._command("step")
+        buffers = self._buffers
+        return VectorStep(*(buffers[name].copy() for name in ("next_states", "rewards", "terminated", "truncated", "states")))
+
+    def close(self) -> None:
+        """ Stop the workers and release the shared memory. """
+        if self._closed:
+            return
+        self._closed = True
+        for remote in self._remotes:
+            try:
+                remote.send("close")
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for remote in self._remotes:
+            remote.close()
+        # the arrays must be released before the shared memory is closed
+        self._buffers = self._actions = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> SubprocVectorEnv:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __del__(self):
+        self.close()
+
+    def _command(self, command: str):
+        # all the workers run the command at once
+        try:
+            for remote in self._remotes:
+                remote.send(command)
+            errors = [error for error in (remote.recv() for remote in self._remotes) if error is not None]
+        except (EOFError, OSError):
+            raise RuntimeError("A worker of SubprocVectorEnv exited.") from None
+        if errors:
+            raise RuntimeError(f"A worker of SubprocVectorEnv failed:\n{errors[0]}")
+
+def _layout(arrays: Dict[str, Tuple[tuple, np.dtype]]) -> Dict[str, Tuple[tuple, np.dtype, int]]:
+    """ `(shape, dtype, byte offset)` of the arrays in one shared memory block, each one aligned to 64 bytes. """
+    layout = {}
+    offset = 0
+    for name, (shape, dtype) in arrays.items():
+        layout[name] = (shape, dtype, offset)
+        offset += -(-int(np.prod(shape)) * dtype.itemsize // 64) * 64
+    return layout
+
+def _buffers(shm: shared_memory.SharedMemory, layout) -> Dict[str, np.ndarray]:
+    return {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for name, (shape, dtype, offset) in layout.items()}
+
+def _run_worker(remote, env_fn, start: int, end: int, shm_name: str, layout, seed: int):
+    np.random.seed(seed)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffers = _buffers(shm, layout)
+    actions, states, next_states = buffers["actions"], buffers["states"], buffers["next_states"]
+    rewards, terminated, truncated = buffers["rewards"], buffers["terminated"], buffers["truncated"]
+    scalar_actions = actions.ndim == 1
+    try:
+        envs = [env_fn() for _ in range(start, end)]
+        steps = [make_step_function(env) for env in envs]
+        while True:
+            command = remote.recv()
+            try:
+                if command == "step":
+                    for i, (env, step) in enumerate(zip(envs, steps), start):
+                        action = actions[i].item() if scalar_actions else actions[i]
+                        next_state, reward, terminated[i], done = step(action)
+                        next_states[i] = next_state
+                        rewards[i] = reward
+                        truncated[i] = done and not terminated[i]
+                        # auto-reset
+                        states[i] = reset_env(env) if done else next_state
+                elif command == "reset":
+                    for i, env in enumerate(envs, start):
+                        states[i] = reset_env(env)
+                        truncated[i] = False
+                elif command == "close":
+                    break
+                remote.send(None)
+            except Exception:
+                remote.send(traceback.format_exc())
+        for env in envs:
+            if hasattr(env, "close"):
+                env.close()
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del actions, states, next_states, rewards, terminated, truncated, buffers
+        shm.close()
+        remote.close()
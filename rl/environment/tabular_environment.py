@@ -0,0 +1,70 @@
+from __future__ import annotations
+from typing import NamedTuple, Tuple
+import numpy as np
+
+class TransitionTable(NamedTuple):
+    """ Dense dynamics of a deterministic environment over flat state indices. All the tables are `(state_count, action_count)`. """
+    next_state: np.ndarray
+    reward: np.ndarray
+    terminated: np.ndarray
+
+class TabularEnvironment:
+    """
+    Mixin for small deterministic grid environments which have `obs_shape`, `action_count`, `state` and `step()`.
+    A state `(row, column)` is mapped to the flat state index `row * obs_shape[1] + column`.
+    """
+
+    _transition_table: TransitionTable = None
+
+    @property
+    def state_count(self) -> int:
+        return int(np.prod(self.obs_shape))
+
+    @property
+    def transition_table(self) -> TransitionTable:
+        """ Dense transition, reward and termination tables. It's built once on the first access. """
+        if self._transition_table is None:
+            self._transition_table = self._build_transition_table()
+        return self._transition_table
+
+    def to_state_id(self, state) -> np.ndarray:
+        """ Convert a state `(2,)` or states `(N, 2)` to flat state indices. """
+        state = np.asarray(state)
+        return np.ravel_multi_index(tuple(np.moveaxis(state, -1, 0)), self.obs_shape)
+
+    def to_state(self, state_id) -> np.ndarray:
+        """ Convert a flat state index or indices `(N,)` to states `(2,)` or `(N, 2)`. """
+        return np.stack(np.unravel_index(state_id, self.obs_shape), axis=-1).astype(np.int32)
+
+    def step_id(self, state_id, action) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Table-driven step. It doesn't change the environment state and also works for arrays of state indices and actions.
+
+        Args:
+            state_id (int | np.ndarray): flat state index
+            action (int | np.ndarray): action
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: next flat state index, reward, terminated
+        """
+
+        table = self.transition_table
+        return table.next_state[state_id, action], table.reward[state_id, action], table.terminated[state_id, action]
+
+    def _build_transition_table(self) -> TransitionTable:
+        # run step() once for every state-action pair so the table matches step() exactly
+        shape = (self.state_count, self.action_count)
+        next_state = np.empty(shape, dtype=np.int64)
+        reward = np.empty(shape, dtype=np.float64)
+        terminated = np.empty(shape, dtype=np.bool_)
+
+        prev_state = self.state
+        for s in range(self.state_count):
+            for a in range(self.action_count):
+                self.state = self.to_state(s)
+                s_next, r, t = self.step(a)
+                next_state[s, a] = self.to_state_id(s_next)
+                reward[s, a] = r
+                terminated[s, a] = t
+        self.state = prev_state
+
+        return TransitionTable(next_state, reward, terminated)
@@ -0,0 +1,67 @@
+import numpy as np
+from rl.environment.env_util import VectorStep
+from rl.environment.cliff_walking import CliffWalking
+
+class VectorCliffWalking:
+    """ N independent Cliff Walking instances stepped at once. """
+
+    def __init__(self, num_envs: int) -> None:
+        assert num_envs > 0
+
+        env = CliffWalking()
+        self.num_envs = num_envs
+        self.obs_shape = env.obs_shape
+        self.action_count = env.action_count
+        self.start_state = env.start_state
+        self.goal_state = env.goal_state
+        # action -> (row, column) delta, same table as the scalar environment
+        self._moves = np.array([env.convert_to_move(a) for a in range(self.action_count)], dtype=np.int32)
+        self._upper = np.array(self.obs_shape, dtype=np.int32) - 1
+
+        self.reset()
+
+    def reset(self) -> np.ndarray:
+        """ Reset all the instances.
+
+        Returns:
+            np.ndarray: start states `(num_envs, 2)`
+        """
+
+        self.states = np.tile(self.start_state, (self.num_envs, 1))
+        return self.states.copy()
+
+    def step(self, actions: np.ndarray) -> VectorStep:
+        """ Move all the instances to next step. Terminated instances are reset to the start state,
+        so `states` of the result is the current states of the next step.
+
+        Args:
+            actions (np.ndarray): `(num_envs,)` actions, 0: up, 1: right: 2: down, 3: left
+
+        Returns:
+            VectorStep: next states `(num_envs, 2)`, rewards `(num_envs,)`, terminated `(num_envs,)`, truncated `(num_envs,)` which is always False
+                and the current states of the next step `(num_envs, 2)`
+        """
+
+        actions = np.asarray(actions)
+        assert np.all((actions >= 0) & (actions < self.action_count))
+
+        states = self.states
+        states += self._moves[actions]
+        np.clip(states, 0, self._upper, out=states)
+
+        rows = states[:, 0]
+        cols = states[:, 1]
+        falling_off = (rows == 3) & (cols >= 1) & (cols <= 10)
+        terminated = (rows == self.goal_state[0]) & (cols == self.goal_state[1])
+
+        rewards = np.full(self.num_envs, -1.0)
+        rewards[falling_off] = -100.0
+        rewards[terminated] = 0.0
+        # falling off the cliff sends the instance back to the start without terminating it
+        states[falling_off] = self.start_state
+
+        next_states = states.copy()
+        # auto-reset
+        states[terminated] = self.start_state
+
+        return VectorStep(next_states, rewards, terminated, np.zeros(self.num_envs, dtype=np.bool_), states.copy())
@@ -0,0 +1,61 @@
+import numpy as np
+from rl.environment.env_util import VectorStep
+from rl.environment.windy_gridworld import WindyGridworld
+
+class VectorWindyGridworld:
+    """ N independent Windy Gridworld instances stepped at once. """
+
+    def __init__(self, num_envs: int) -> None:
+        assert num_envs > 0
+
+        env = WindyGridworld()
+        self.num_envs = num_envs
+        self.obs_shape = env.obs_shape
+        self.action_count = env.action_count
+        self.wind = env.wind
+        self.start_state = env.start_state
+        self.goal_state = env.goal_state
+        # action -> (row, column) delta, same table as the scalar environment
+        self._moves = np.array([env.convert_to_move(a) for a in range(self.action_count)], dtype=np.int32)
+        self._upper = np.array(self.obs_shape, dtype=np.int32) - 1
+
+        self.reset()
+
+    def reset(self) -> np.ndarray:
+        """ Reset all the instances.
+
+        Returns:
+            np.ndarray: start states `(num_envs, 2)`
+        """
+
+        self.states = np.tile(self.start_state, (self.num_envs, 1))
+        return self.states.copy()
+
+    def step(self, actions: np.ndarray) -> VectorStep:
+        """ Move all the instances to next step. Terminated instances are reset to the start state,
+        so `states` of the result is the current states of the next step.
+
+        Args:
+            actions (np.ndarray): `(num_envs,)` actions, 0: up, 1: right, 2: down, 3: left
+
+        Returns:
+            VectorStep: next states `(num_envs, 2)`, rewards `(num_envs,)`, terminated `(num_envs,)`, truncated `(num_envs,)` which is always False
+                and the current states of the next step `(num_envs, 2)`
+        """
+
+        actions = np.asarray(actions)
+        assert np.all((actions >= 0) & (actions < self.action_count))
+
+        states = self.states
+        # the wind of the current state is applied with the move
+        states += self._moves[actions] + self.wind[states[:, 0], states[:, 1]]
+        np.clip(states, 0, self._upper, out=states)
+
+        terminated = (states[:, 0] == self.goal_state[0]) & (states[:, 1] == self.goal_state[1])
+        rewards = np.where(terminated, 0.0, -1.0)
+
+        next_states = states.copy()
+        # auto-reset
+        states[terminated] = self.start_state
+
+        return VectorStep(next_states, rewards, terminated, np.zeros(self.num_envs, dtype=np.bool_), states.copy())
@@ -1,7 +1,8 @@
 from typing import Tuple
 import numpy as np
+from rl.environment.tabular_environment import TabularEnvironment
 
-class WindyGridworld:
+class WindyGridworld(TabularEnvironment):
     def __init__(self) -> None:
         self.obs_shape = (7, 10)
         self.action_count = 4
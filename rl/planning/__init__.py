@@ -0,0 +1 @@
+from .dynamic_programming import *
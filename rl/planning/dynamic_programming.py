@@ -0,0 +1,166 @@
+from __future__ import annotations
+from typing import List, NamedTuple, Tuple
+import numpy as np
+
+class PlanningResult(NamedTuple):
+    q_vals: np.ndarray      # (*obs_shape, action_count) like TabularQAgent.q_vals
+    values: np.ndarray      # (*obs_shape)
+    policy: np.ndarray      # (*obs_shape) greedy actions
+    iterations: int         # number of sweeps
+    converged: bool
+
+def value_iteration(env,
+                    gamma: float = 1.0,
+                    theta: float = 1e-10,
+                    max_iterations: int = 100000,
+                    terminal_states: List[Tuple] = None) -> PlanningResult:
+    """ Optimal q-values by value iteration. Every sweep is `Q = R + gamma * (1 - T) * max_a Q[s']` over the whole table.
+
+    Args:
+        env: environment with `transition_table` (e.g. `rl.environment.CliffWalking`)
+        gamma (float, optional): discount factor. Defaults to 1.0.
+        theta (float, optional): it stops when the maximum change of a sweep is less than theta. Defaults to 1e-10.
+        max_iterations (int, optional): maximum number of sweeps. Defaults to 100000.
+        terminal_states (List[Tuple], optional): states whose q-values are 0 like `TabularQAgent`. if it's None, the goal state of the environment. Defaults to None.
+
+    Returns:
+        PlanningResult: optimal q-values, state values and greedy policy
+    """
+
+    next_state, reward, not_terminated = _tables(env)
+    Q = np.zeros(reward.shape)
+    converged = False
+    iterations = 0
+    while iterations < max_iterations:
+        V = Q.max(axis=1)
+        new_Q = reward + gamma * not_terminated * V[next_state]
+        delta = np.abs(new_Q - Q).max()
+        Q = new_Q
+        iterations += 1
+        if delta < theta:
+            converged = True
+            break
+    return _result(env, Q, iterations, converged, terminal_states)
+
+def policy_evaluation(env,
+                      policy: np.ndarray,
+                      gamma: float = 1.0,
+                      theta: float = 1e-10,
+                      max_iterations: int = 100000,
+                      terminal_states: List[Tuple] = None) -> PlanningResult:
+    """ Q-values of a policy by iterative policy evaluation. Every sweep is `Q = R + gamma * (1 - T) * sum_a pi(a|s') Q[s', a]` over the whole table.
+
+    Args:
+        env: environment with `transition_table`
+        policy (np.ndarray): action probabilities `(*obs_shape, action_count)` (e.g. `policy_from_q()`) or deterministic actions `(*obs_shape)`
+        gamma (float, optional): discount factor. Defaults to 1.0.
+        theta (float, optional): it stops when the maximum change of a sweep is less than theta. Defaults to 1e-10.
+        max_iterations (int, optional): maximum number of sweeps. An improper policy never converges when gamma is 1. Defaults to 100000.
+        terminal_states (List[Tuple], optional): states whose q-values are 0. if it's None, the goal state of the environment. Defaults to None.
+
+    Returns:
+        PlanningResult: q-values and state values of the policy, `policy` is its greedy policy
+    """
+
+    next_state, reward, not_terminated = _tables(env)
+    probs = _policy_probs(policy, reward.shape)
+    Q = np.zeros(reward.shape)
+    Q, iterations, converged = _evaluate(Q, probs, next_state, reward, not_terminated, gamma, theta, max_iterations)
+    result = _result(env, Q, iterations, converged, terminal_states)
+    # the values of the evaluated policy, not of its greedy policy
+    values = (result.q_vals * probs.reshape(result.q_vals.shape)).sum(axis=-1)
+    return result._replace(values=values)
+
+def policy_iteration(env,
+                     gamma: float = 1.0,
+                     theta: float = 1e-10,
+                     max_iterations: int = 1000,
+                     max_evaluation_iterations: int = 1000,
+                     terminal_states: List[Tuple] = None) -> PlanningResult:
+    """ Optimal q-values by policy iteration. Each evaluation is truncated at `max_evaluation_iterations` sweeps and warm-started from the previous q-values,
+    so improper policies (e.g. walking into a wall forever when gamma is 1) are improved away instead of being evaluated forever.
+
+    Args:
+        env: environment with `transition_table`
+        gamma (float, optional): discount factor. Defaults to 1.0.
+        theta (float, optional): tolerance of the policy evaluations. Defaults to 1e-10.
+        max_iterations (int, optional): maximum number of policy improvements. Defaults to 1000.
+        max_evaluation_iterations (int, optional): maximum number of sweeps of an evaluation. Defaults to 1000.
+        terminal_states (List[Tuple], optional): states whose q-values are 0. if it's None, the goal state of the environment. Defaults to None.
+
+    Returns:
+        PlanningResult: optimal q-values, state values and greedy policy, `iterations` is the number of policy improvements
+    """
+
+    next_state, reward, not_terminated = _tables(env)
+    state_count, action_count = reward.shape
+    states = np.arange(state_count)
+    policy = np.zeros(state_count, dtype=np.int64)
+    Q = np.zeros(reward.shape)
+    converged = False
+    iterations = 0
+    while iterations < max_iterations:
+        probs = np.zeros(reward.shape)
+        probs[states, policy] = 1.0
+        Q, _, evaluated = _evaluate(Q, probs, next_state, reward, not_terminated, gamma, theta, max_evaluation_iterations)
+        iterations += 1
+        # greedy improvement, keep the current action on ties so that it doesn't oscillate
+        greedy = Q.argmax(axis=1)
+        keep = Q[states, policy] >= Q[states, greedy] - theta
+        new_policy = np.where(keep, policy, greedy)
+        if evaluated and np.array_equal(new_policy, policy):
+            converged = True
+            break
+        policy = new_policy
+    return _result(env, Q, iterations, converged, terminal_states)
+
+def policy_from_q(q_vals: np.ndarray, epsilon: float = 0.0) -> np.ndarray:
+    """ Action probabilities `(*obs_shape, action_count)` of the epsilon-greedy policy of q-values. Ties go to the first action like `np.argmax()`. """
+    q_vals = np.asarray(q_vals)
+    action_count = q_vals.shape[-1]
+    probs = np.full(q_vals.shape, epsilon / action_count)
+    greedy = q_vals.argmax(axis=-1)
+    np.put_along_axis(probs, greedy[..., np.newaxis], 1.0 - epsilon + epsilon / action_count, axis=-1)
+    return probs
+
+def greedy_return(env, q_vals: np.ndarray, gamma: float = 1.0, max_iterations: int = 100000) -> float:
+    """ Expected return of the greedy policy of learned q-values from the start state of the environment. Compare it with `value_iteration()` to score a table. """
+    result = policy_evaluation(env, np.asarray(q_vals).argmax(axis=-1), gamma, max_iterations=max_iterations)
+    return float(result.values[tuple(env.start_state)])
+
+def _tables(env) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    table = env.transition_table
+    return table.next_state, table.reward, 1.0 - table.terminated
+
+def _policy_probs(policy: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    policy = np.asarray(policy)
+    state_count, action_count = shape
+    if policy.size == state_count:
+        probs = np.zeros(shape)
+        probs[np.arange(state_count), policy.reshape(-1).astype(np.int64)] = 1.0
+        return probs
+    return policy.reshape(shape).astype(np.float64)
+
+def _evaluate(Q, probs, next_state, reward, not_terminated, gamma, theta, max_iterations):
+    converged = False
+    iterations = 0
+    while iterations < max_iterations:
+        V = (Q * probs).sum(axis=1)
+        new_Q = reward + gamma * not_terminated * V[next_state]
+        delta = np.abs(new_Q - Q).max()
+        Q = new_Q
+        iterations += 1
+        if delta < theta:
+            converged = True
+            break
+    return Q, iterations, converged
+
+def _result(env, Q: np.ndarray, iterations: int, converged: bool, terminal_states: List[Tuple]) -> PlanningResult:
+    obs_shape = tuple(env.obs_shape)
+    q_vals = Q.reshape(obs_shape + (Q.shape[1],)).copy()
+    if terminal_states is None and hasattr(env, "goal_state"):
+        terminal_states = [tuple(env.goal_state)]
+    # Q(terminal, :) = 0 like TabularQAgent.set_terminal_states()
+    for s in terminal_states or []:
+        q_vals[tuple(s)] = 0
+    return PlanningResult(q_vals, q_vals.max(axis=-1), q_vals.argmax(axis=-1), iterations, converged)
@@ -2,3 +2,10 @@ from .sarsa import *
 from .q_learning import *
 from .expected_sarsa import *
 from .double_q_learning import *
+from .tabular_model import *
+from .dyna_q import *
+from .prioritized_sweeping import *
+from .eligibility_traces import *
+from .sarsa_lambda import *
+from .q_lambda import *
+from .population import *
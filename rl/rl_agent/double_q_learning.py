@@ -1,6 +1,6 @@
 from typing import List, Tuple
 import numpy as np
-from rl import TabularQAgent, Transition, epsilon_greedy
+from rl import TabularQAgent, QStorage, Transition, epsilon_greedy
 
 class DoubleQLearning(TabularQAgent):
     def __init__(self, obs_shape: tuple,
@@ -8,15 +8,18 @@ class DoubleQLearning(TabularQAgent):
                  terminal_states: List[tuple] = None,
                  epsilon = 0.1,
                  alpha = 0.1,
-                 gamma = 0.9) -> None:
-        super().__init__(obs_shape, action_count, terminal_states)
+                 gamma = 0.9,
+                 storage: QStorage = None) -> None:
+        super().__init__(obs_shape, action_count, terminal_states, storage)
         self.epsilon = epsilon
         self.alpha = alpha
         self.gamma = gamma
         
     def reset(self) -> None:
-        self._Q1 = self.initializer()
-        self._Q2 = self.initializer()
+        self._Q1 = self.initializer("Q1")
+        self._Q2 = self.initializer("Q2")
+        self._Q1_flat = self._flat_view(self._Q1)
+        self._Q2_flat = self._flat_view(self._Q2)
         if self._terminal_states is not None:
             self.set_terminal_states(self._terminal_states)
             
@@ -30,6 +33,15 @@ class DoubleQLearning(TabularQAgent):
     @property
     def q_vals(self):
         return self._Q1.copy()
+    
+    def state_dict(self) -> dict:
+        return {"Q1": self._Q1, "Q2": self._Q2}
+    
+    def load_state_dict(self, state_dict: dict) -> None:
+        self._Q1 = state_dict["Q1"]
+        self._Q2 = state_dict["Q2"]
+        self._Q1_flat = self._flat_view(self._Q1)
+        self._Q2_flat = self._flat_view(self._Q2)
         
     def update(self, transition: Transition) -> None:
         Q1 = self._Q1
@@ -47,7 +59,7 @@ class DoubleQLearning(TabularQAgent):
                 Q1[transition.current_state][transition.current_action]
             )
             # update Q1
-            Q1[transition.current_state][transition.current_action] += self.alpha * td_error
+            Q1[transition.current_state + (transition.current_action,)] += self.alpha * td_error
     
         else: # update Q2
             # get greedy action for Q2 given next state
@@ -59,7 +71,83 @@ class DoubleQLearning(TabularQAgent):
                 Q2[transition.current_state][transition.current_action]
             )
             # update Q2
-            Q2[transition.current_state][transition.current_action] += self.alpha * td_error
+            Q2[transition.current_state + (transition.current_action,)] += self.alpha * td_error
+            
+    def update_batch(self, states, actions, rewards, next_states, terminated, sequential: bool = False) -> None:
+        """ Update the agent with a batch of transitions.
+
+        Args:
+            states (ArrayLike): current states `(B, *state_dims)`
+            actions (ArrayLike): current actions `(B,)`
+            rewards (ArrayLike): rewards `(B,)`
+            next_states (ArrayLike): next states `(B, *state_dims)`
+            terminated (ArrayLike): terminated `(B,)`
+            sequential (bool, optional): if it's True, the transitions are applied one by one in order, which is the same as calling `update()` for each of them.
+                Otherwise, all td errors are computed from the q-values before the batch and the td errors of duplicate (s, a) pairs are averaged, so a pair moves once toward its mean target. Defaults to False.
+        """
+        
+        if sequential:
+            for transition in zip(states, actions, next_states, rewards, terminated):
+                self.update(Transition(*transition))
+            return
+        
+        Q1 = self._Q1
+        Q2 = self._Q2
+        current_sa = self._batch_index(states) + (np.asarray(actions),)
+        next_states = self._batch_index(next_states)
+        rewards = np.asarray(rewards)
+        not_terminated = 1.0 - np.asarray(terminated, dtype=np.float64)
+        # the same random stream as calling update() for each transition
+        update_q1 = np.random.rand(len(rewards)) < 0.5
+        
+        updates = []
+        for Q, Q_target, mask in ((Q1, Q2, update_q1), (Q2, Q1, ~update_q1)):
+            sa = tuple(index[mask] for index in current_sa)
+            s_next = tuple(index[mask] for index in next_states)
+            # get greedy actions for Q given next states
+            greedy_actions = np.argmax(Q[s_next], axis=-1)
+            # compute td errors with the other q-values
+            td_errors = (
+                rewards[mask] +
+                self.gamma * not_terminated[mask] * Q_target[s_next + (greedy_actions,)] -
+                Q[sa]
+            )
+            updates.append((Q, sa, self.alpha * td_errors))
+            
+        # apply after computing both td errors, duplicate (s, a) pairs are averaged
+        for Q, sa, delta in updates:
+            self._add_mean_at(Q, sa, delta)
+        
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        Q1 = self._Q1_flat
+        Q2 = self._Q2_flat
+        
+        if np.random.rand() < 0.5: # update Q1 with Q2
+            Q, Q_target = Q1, Q2
+        else: # update Q2 with Q1
+            Q, Q_target = Q2, Q1
+        # get greedy action for Q given next state
+        greedy_action = np.argmax(Q[next_state_id])
+        # compute td error
+        td_error = reward + self.gamma * (1 - terminated) * Q_target[next_state_id, greedy_action] - Q[state_id, action]
+        # update Q
+        Q[state_id, action] += self.alpha * td_error
         
     def get_action(self, state) -> int:
-        return epsilon_greedy(self._Q1 + self._Q2, tuple(state), self.action_count, self.epsilon)
+        # only sum the q-values of the state
+        state = tuple(state)
+        return epsilon_greedy(self._Q1[state] + self._Q2[state], (), self.action_count, self.epsilon)
+    
+    def get_actions(self, states) -> np.ndarray:
+        index = self._batch_index(states)
+        return self._epsilon_greedy_batch(self._Q1[index] + self._Q2[index])
+    
+    def _greedy_q_values(self, state_ids: np.ndarray) -> np.ndarray:
+        return self._Q1_flat[state_ids] + self._Q2_flat[state_ids]
+    
+    def get_action_id(self, state_id: int) -> int:
+        # same as epsilon_greedy() but only sums the q-values of the state
+        if np.random.rand() > self.epsilon:
+            return np.argmax(self._Q1_flat[state_id] + self._Q2_flat[state_id])
+        else:
+            return np.random.randint(self.action_count)
@@ -0,0 +1,91 @@
+from typing import List, Tuple
+import numpy as np
+from rl import QStorage, Transition
+from rl.rl_agent.q_learning import QLearning
+from rl.rl_agent.tabular_model import TabularModel
+
+class DynaQ(QLearning):
+    """
+    Dyna-Q. Every real transition updates the q-values with Q-learning and the model, then `planning_steps` simulated transitions
+    of previously observed (state, action) pairs are replayed from the model.
+    The planning updates run in vectorized batches of `planning_batch_size`: the td errors of a batch are computed from the q-values before it
+    and a pair sampled k times in a batch moves by `1 - (1 - alpha)^k` of its td error, as k sequential updates toward the same target would.
+    The default `planning_batch_size = None` plans all the steps of an update in one batch, `planning_batch_size = 1` is the sequential planning loop of Sutton and Barto.
+    """
+
+    def __init__(self, obs_shape: tuple,
+                 action_count: int,
+                 terminal_states: List[Tuple] = None,
+                 epsilon = 0.1,
+                 alpha = 0.1,
+                 gamma = 0.9,
+                 planning_steps: int = 5,
+                 planning_batch_size: int = None,
+                 storage: QStorage = None) -> None:
+        super().__init__(obs_shape, action_count, terminal_states, epsilon, alpha, gamma, storage)
+        self.planning_steps = planning_steps
+        self.planning_batch_size = planning_batch_size
+
+    def reset(self) -> None:
+        super().reset()
+        self.model = TabularModel(self.state_count, self.action_count)
+
+    def update(self, transition: Transition) -> None:
+        transition = transition.to_tabular()
+        self.update_ids(
+            int(self.to_state_id(transition.current_state)),
+            transition.current_action,
+            transition.reward,
+            int(self.to_state_id(transition.next_state)),
+            transition.terminated
+        )
+
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        # direct reinforcement learning
+        super().update_ids(state_id, action, reward, next_state_id, terminated)
+        # model learning
+        self.model.add(state_id * self.action_count + action, next_state_id, reward, terminated)
+        # planning
+        self.plan(self.planning_steps)
+
+    def update_batch(self, states, actions, rewards, next_states, terminated, sequential: bool = False) -> None:
+        """ Update the agent with a batch of transitions like `QLearning.update_batch()`, then plan `planning_steps` per transition. """
+        if sequential:
+            for transition in zip(states, actions, next_states, rewards, terminated):
+                self.update(Transition(*transition))
+            return
+
+        super().update_batch(states, actions, rewards, next_states, terminated)
+        actions = np.asarray(actions, dtype=np.int64)
+        self.model.add_batch(
+            self.to_state_id(states) * self.action_count + actions,
+            self.to_state_id(next_states),
+            np.asarray(rewards, dtype=np.float64),
+            np.asarray(terminated, dtype=np.bool_)
+        )
+        self.plan(self.planning_steps * len(actions))
+
+    def plan(self, steps: int) -> None:
+        """ Apply Q-learning updates of `steps` pairs sampled uniformly from the model. """
+        model = self.model
+        if model.count == 0 or steps <= 0:
+            return
+        Q = self._Q_flat
+        batch_size = steps if self.planning_batch_size is None else self.planning_batch_size
+        for start in range(0, steps, batch_size):
+            pairs, counts = np.unique(model.sample(min(batch_size, steps - start)), return_counts=True)
+            states, actions = np.divmod(pairs, self.action_count)
+            # compute td errors of the simulated transitions
+            target_q = Q[model.next_state[pairs]].max(axis=-1)
+            td_errors = model.reward[pairs] + self.gamma * (1.0 - model.terminated[pairs]) * target_q - Q[states, actions]
+            # update q-values, a step doesn't overshoot the target however many times the pair is sampled
+            np.add.at(Q, (states, actions), (1.0 - (1.0 - self.alpha) ** counts) * td_errors)
+
+    def state_dict(self) -> dict:
+        state_dict = super().state_dict()
+        state_dict["model"] = self.model.state_dict()
+        return state_dict
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        super().load_state_dict(state_dict)
+        self.model.load_state_dict(state_dict["model"])
@@ -0,0 +1,77 @@
+import numpy as np
+
+class EligibilityTraces:
+    """
+    Eligibility traces of only the active (state, action) pairs, whose traces are at least `cutoff`.
+    The pairs are the flat indices `state_id * action_count + action` kept in a compact array with their traces,
+    so decaying the traces and applying a td error cost O(active pairs) instead of O(|S||A|).
+    With the trace decay `gamma * lambda`, a pair stays active for about `log(cutoff) / log(gamma * lambda)` steps after its last visit.
+    """
+
+    def __init__(self, action_count: int, cutoff: float = 1e-4, replacing: bool = False, capacity: int = 64) -> None:
+        """
+        Args:
+            action_count (int): number of actions
+            cutoff (float, optional): traces below it are dropped from the active set. Defaults to 1e-4.
+            replacing (bool, optional): if it's True, a visit sets the trace to 1. Otherwise, a visit adds 1 (accumulating traces). Defaults to False.
+            capacity (int, optional): initial capacity of the active set, it grows as needed. Defaults to 64.
+        """
+        self.action_count = action_count
+        self.cutoff = cutoff
+        self.replacing = replacing
+        self._pairs = np.empty(capacity, dtype=np.int64)
+        self._traces = np.empty(capacity)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def pairs(self) -> np.ndarray:
+        """ Flat (state, action) indices of the active pairs. """
+        return self._pairs[:self._size]
+
+    @property
+    def traces(self) -> np.ndarray:
+        """ Traces of the active pairs. """
+        return self._traces[:self._size]
+
+    def visit(self, state_id: int, action: int) -> None:
+        """ Increase (or replace) the trace of the visited pair. """
+        pair = state_id * self.action_count + action
+        index = np.flatnonzero(self.pairs == pair)
+        if len(index) > 0:
+            if self.replacing:
+                self._traces[index[0]] = 1.0
+            else:
+                self._traces[index[0]] += 1.0
+            return
+        if self._size == len(self._pairs):
+            self._pairs = np.concatenate((self._pairs, np.empty_like(self._pairs)))
+            self._traces = np.concatenate((self._traces, np.empty_like(self._traces)))
+        self._pairs[self._size] = pair
+        self._traces[self._size] = 1.0
+        self._size += 1
+
+    def apply(self, Q: np.ndarray, step_size: float) -> None:
+        """ `Q[s, a] += step_size * e(s, a)` for the active pairs of the `(state_count, action_count)` q-values. """
+        if self._size == 0:
+            return
+        states, actions = np.divmod(self.pairs, self.action_count)
+        # the active pairs are unique
+        np.add.at(Q, (states, actions), step_size * self.traces)
+
+    def decay(self, factor: float) -> None:
+        """ Multiply the traces by the factor and drop the ones below the cutoff. """
+        size = self._size
+        traces = self._traces[:size]
+        traces *= factor
+        keep = traces >= self.cutoff
+        kept = int(np.count_nonzero(keep))
+        if kept < size:
+            self._pairs[:kept] = self._pairs[:size][keep]
+            self._traces[:kept] = traces[keep]
+            self._size = kept
+
+    def clear(self) -> None:
+        self._size = 0
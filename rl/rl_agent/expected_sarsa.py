@@ -1,5 +1,5 @@
 from typing import List
-from rl import TabularQAgent, Transition, epsilon_greedy, epsilon_greedy_distribution
+from rl import TabularQAgent, QStorage, Transition, epsilon_greedy, epsilon_greedy_expected_value
 import numpy as np
 
 class ExpectedSarsa(TabularQAgent):
@@ -9,8 +9,9 @@ class ExpectedSarsa(TabularQAgent):
                  terminal_states: List[tuple] = None,
                  epsilon = 0.1,
                  alpha = 0.1,
-                 gamma = 0.9) -> None:
-        super().__init__(obs_shape, action_count, terminal_states)
+                 gamma = 0.9,
+                 storage: QStorage = None) -> None:
+        super().__init__(obs_shape, action_count, terminal_states, storage)
         self.epsilon = epsilon
         self.alpha = alpha
         self.gamma = gamma
@@ -19,14 +20,54 @@ class ExpectedSarsa(TabularQAgent):
         Q = self._Q
         transition = transition.to_tabular()
         
-        # get epsilon-greedy policy distribution which is the behavior policy.
-        policy_distribution = epsilon_greedy_distribution(Q, transition.next_state, self.action_count, self.epsilon)
-        # compute expected q
-        expected_q = np.average(self.Q[transition.next_state], weights=policy_distribution)
+        # compute expected q under the epsilon-greedy policy which is the behavior policy.
+        expected_q = epsilon_greedy_expected_value(Q[transition.next_state], self.epsilon)
         # compute td error
-        td_error = transition.reward + self.gamma * (1 - transition.terminated) * expected_q - self.Q[transition.current_state][transition.current_action]
+        td_error = transition.reward + self.gamma * (1 - transition.terminated) * expected_q - Q[transition.current_state][transition.current_action]
         # update q-values
-        self.Q[transition.current_state][transition.current_action] += self.alpha * td_error
+        Q[transition.current_state + (transition.current_action,)] += self.alpha * td_error
+        
+    def update_batch(self, states, actions, rewards, next_states, terminated, sequential: bool = False) -> None:
+        """ Update the agent with a batch of transitions.
+
+        Args:
+            states (ArrayLike): current states `(B, *state_dims)`
+            actions (ArrayLike): current actions `(B,)`
+            rewards (ArrayLike): rewards `(B,)`
+            next_states (ArrayLike): next states `(B, *state_dims)`
+            terminated (ArrayLike): terminated `(B,)`
+            sequential (bool, optional): if it's True, the transitions are applied one by one in order, which is the same as calling `update()` for each of them.
+                Otherwise, all td errors are computed from the q-values before the batch and the td errors of duplicate (s, a) pairs are averaged, so a pair moves once toward its mean target. Defaults to False.
+        """
+        
+        if sequential:
+            for transition in zip(states, actions, next_states, rewards, terminated):
+                self.update(Transition(*transition))
+            return
+        
+        Q = self._Q
+        current_sa = self._batch_index(states) + (np.asarray(actions),)
+        next_states = self._batch_index(next_states)
+        not_terminated = 1.0 - np.asarray(terminated, dtype=np.float64)
+        
+        # compute expected q under the epsilon-greedy policy for all next states
+        expected_q = epsilon_greedy_expected_value(Q[next_states], self.epsilon)
+        # compute td errors
+        td_errors = np.asarray(rewards) + self.gamma * not_terminated * expected_q - Q[current_sa]
+        # update q-values, duplicate (s, a) pairs are averaged
+        self._add_mean_at(Q, current_sa, self.alpha * td_errors)
+        
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        Q = self._Q_flat
+        # compute expected q under the epsilon-greedy policy which is the behavior policy.
+        expected_q = epsilon_greedy_expected_value(Q[next_state_id], self.epsilon)
+        # compute td error
+        td_error = reward + self.gamma * (1 - terminated) * expected_q - Q[state_id, action]
+        # update q-value
+        Q[state_id, action] += self.alpha * td_error
     
     def get_action(self, state) -> int:
-        return epsilon_greedy(self.Q, tuple(state), self.action_count, self.epsilon)
\ No newline at end of file
+        return epsilon_greedy(self._Q, tuple(state), self.action_count, self.epsilon)
+    
+    def get_action_id(self, state_id: int) -> int:
+        return epsilon_greedy(self._Q_flat, state_id, self.action_count, self.epsilon)
\ No newline at end of file
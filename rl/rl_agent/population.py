@@ -0,0 +1,122 @@
+from typing import List, Tuple
+import numpy as np
+from rl import TabularQPopulation, epsilon_greedy_expected_value
+
+class SarsaPopulation(TabularQPopulation):
+    """ K independent Sarsa learners. Each learner delays its update until its next transition like `Sarsa`. """
+
+    def start_episode(self):
+        self._has_cur = np.zeros(self.population_size, dtype=np.bool_)
+        self._cur = None
+
+    def reset(self) -> None:
+        super().reset()
+        self.start_episode()
+
+    def update_batch(self, states, actions, rewards, next_states, terminated) -> None:
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        next_states = np.asarray(next_states)
+        terminated = np.asarray(terminated)
+
+        # the learners without the current transition use the new one like Sarsa.update()
+        if self._cur is None:
+            self._cur = (states.copy(), actions.copy(), rewards.copy(), next_states.copy())
+        else:
+            first = ~self._has_cur
+            for cur, new in zip(self._cur, (states, actions, rewards, next_states)):
+                cur[first] = new[first]
+        cur_states, cur_actions, cur_rewards, cur_next_states = self._cur
+
+        Q = self._Q
+        current_sa = self._index(cur_states) + (cur_actions,)
+        # the next action is the current action of the next transition
+        next_q = Q[self._index(cur_next_states) + (actions,)]
+        # compute td errors
+        td_errors = cur_rewards + self.gamma * (1 - terminated) * next_q - Q[current_sa]
+        # update q-values, every learner updates exactly one pair
+        Q[current_sa] += self.alpha * td_errors
+
+        # update the current transitions, the terminated learners start new episodes
+        self._cur = (states.copy(), actions.copy(), rewards.copy(), next_states.copy())
+        self._has_cur = ~terminated.astype(np.bool_)
+
+class QLearningPopulation(TabularQPopulation):
+    """ K independent Q-learning learners. """
+
+    def update_batch(self, states, actions, rewards, next_states, terminated) -> None:
+        Q = self._Q
+        current_sa = self._index(states) + (np.asarray(actions),)
+        # get maximum q-values in next states
+        target_q = np.max(Q[self._index(next_states)], axis=-1)
+        # compute td errors
+        td_errors = np.asarray(rewards) + self.gamma * (1 - np.asarray(terminated)) * target_q - Q[current_sa]
+        # update q-values
+        Q[current_sa] += self.alpha * td_errors
+
+class ExpectedSarsaPopulation(TabularQPopulation):
+    """ K independent on-policy Expected Sarsa learners. """
+
+    def update_batch(self, states, actions, rewards, next_states, terminated) -> None:
+        Q = self._Q
+        current_sa = self._index(states) + (np.asarray(actions),)
+        # compute expected q under the epsilon-greedy policies which are the behavior policies
+        expected_q = epsilon_greedy_expected_value(Q[self._index(next_states)], self.epsilon)
+        # compute td errors
+        td_errors = np.asarray(rewards) + self.gamma * (1 - np.asarray(terminated)) * expected_q - Q[current_sa]
+        # update q-values
+        Q[current_sa] += self.alpha * td_errors
+
+class DoubleQLearningPopulation(TabularQPopulation):
+    """ K independent Double Q-learning learners. """
+
+    def reset(self) -> None:
+        self._Q1 = self.initializer()
+        self._Q2 = self.initializer()
+        if self._terminal_states is not None:
+            self.set_terminal_states(self._terminal_states)
+
+    def set_terminal_states(self, terminal_states: List[Tuple]) -> None:
+        assert terminal_states is not None
+
+        self._terminal_states = terminal_states
+        for s in terminal_states:
+            self._Q1[(slice(None),) + tuple(s)] = 0
+            self._Q2[(slice(None),) + tuple(s)] = 0
+
+    @property
+    def q_vals(self):
+        return self._Q1.copy()
+
+    def state_dict(self) -> dict:
+        return {"Q1": self._Q1, "Q2": self._Q2, **self._random_state_dict()}
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        self._Q1 = state_dict["Q1"]
+        self._Q2 = state_dict["Q2"]
+        self._load_random_state_dict(state_dict)
+
+    def get_actions(self, states) -> np.ndarray:
+        index = self._index(states)
+        return self._epsilon_greedy(self._Q1[index] + self._Q2[index])
+
+    def update_batch(self, states, actions, rewards, next_states, terminated) -> None:
+        current_sa = self._index(states) + (np.asarray(actions),)
+        next_index = self._index(next_states)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        not_terminated = 1 - np.asarray(terminated)
+        # each learner flips its own coin
+        update_q1 = self._random(1)[0] < 0.5
+
+        # Q is Q1 for the learners updating Q1, otherwise Q2
+        Q = np.where(update_q1[:, np.newaxis], self._Q1[next_index], self._Q2[next_index])
+        Q_target = np.where(update_q1[:, np.newaxis], self._Q2[next_index], self._Q1[next_index])
+        # get greedy actions for Q given next states
+        greedy_actions = np.argmax(Q, axis=-1)
+        target_q = Q_target[self._learners, greedy_actions]
+        # compute td errors and update
+        for table, mask in ((self._Q1, update_q1), (self._Q2, ~update_q1)):
+            sa = tuple(index[mask] for index in current_sa)
+            td_errors = rewards[mask] + self.gamma * not_terminated[mask] * target_q[mask] - table[sa]
+            table[sa] += self.alpha * td_errors
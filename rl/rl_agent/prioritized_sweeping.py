@@ -0,0 +1,133 @@
+import heapq
+from typing import List, Tuple
+import numpy as np
+from rl import QStorage, Transition
+from rl.rl_agent.q_learning import QLearning
+from rl.rl_agent.tabular_model import TabularModel
+
+class PrioritizedSweeping(QLearning):
+    """
+    Prioritized sweeping for deterministic environments. (state, action) pairs are updated in the order of the magnitude of their td errors.
+    A real transition updates the model and is queued with its priority, then up to `planning_steps + 1` pairs are popped and updated,
+    so the top of the queue (usually the real pair) is updated even when `planning_steps` is 0. `update_batch()` queues the whole batch before sweeping.
+    After a pair is updated, the priorities of its predecessors from the model are computed at once and the ones above `theta` are queued.
+    The queue is a binary heap with lazy deletion, a pair is queued once with its highest priority.
+    """
+
+    def __init__(self, obs_shape: tuple,
+                 action_count: int,
+                 terminal_states: List[Tuple] = None,
+                 epsilon = 0.1,
+                 alpha = 0.1,
+                 gamma = 0.9,
+                 planning_steps: int = 5,
+                 theta: float = 1e-4,
+                 storage: QStorage = None) -> None:
+        super().__init__(obs_shape, action_count, terminal_states, epsilon, alpha, gamma, storage)
+        self.planning_steps = planning_steps
+        self.theta = theta
+
+    def reset(self) -> None:
+        super().reset()
+        self.model = TabularModel(self.state_count, self.action_count)
+        self._reset_queue()
+
+    def _reset_queue(self):
+        self._queue = []
+        # priority of each queued pair, 0 if it's not queued
+        self._priorities = np.zeros(self.state_count * self.action_count)
+
+    def update(self, transition: Transition) -> None:
+        transition = transition.to_tabular()
+        self.update_ids(
+            int(self.to_state_id(transition.current_state)),
+            transition.current_action,
+            transition.reward,
+            int(self.to_state_id(transition.next_state)),
+            transition.terminated
+        )
+
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        pair = state_id * self.action_count + action
+        self.model.add(pair, next_state_id, reward, terminated)
+        self._push(np.array([pair]), np.abs(self._td_errors(np.array([pair]))))
+        self._sweep(self.planning_steps + 1)
+
+    def update_batch(self, states, actions, rewards, next_states, terminated, sequential: bool = False) -> None:
+        """ Update the agent with a batch of transitions.
+
+        Args:
+            states (ArrayLike): current states `(B, *state_dims)`
+            actions (ArrayLike): current actions `(B,)`
+            rewards (ArrayLike): rewards `(B,)`
+            next_states (ArrayLike): next states `(B, *state_dims)`
+            terminated (ArrayLike): terminated `(B,)`
+            sequential (bool, optional): if it's True, the transitions are applied one by one in order, which is the same as calling `update()` for each of them.
+                Otherwise, the whole batch is added to the model and queued first, then up to `(planning_steps + 1) * B` pairs are popped and updated. Defaults to False.
+        """
+
+        state_ids = self.to_state_id(states)
+        actions = np.asarray(actions, dtype=np.int64)
+        next_state_ids = self.to_state_id(next_states)
+        if sequential:
+            for transition in zip(state_ids.tolist(), actions.tolist(), np.asarray(rewards).tolist(), next_state_ids.tolist(), np.asarray(terminated).tolist()):
+                self.update_ids(*transition)
+            return
+
+        pairs = state_ids * self.action_count + actions
+        self.model.add_batch(pairs, next_state_ids, np.asarray(rewards, dtype=np.float64), np.asarray(terminated, dtype=np.bool_))
+        # the td errors are computed after the model has the last outcome of duplicate pairs
+        pairs = np.unique(pairs)
+        self._push(pairs, np.abs(self._td_errors(pairs)))
+        self._sweep((self.planning_steps + 1) * len(actions))
+
+    def state_dict(self) -> dict:
+        state_dict = super().state_dict()
+        state_dict["model"] = self.model.state_dict()
+        return state_dict
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        # the queue isn't saved, it's rebuilt by the next transitions
+        super().load_state_dict(state_dict)
+        self.model.load_state_dict(state_dict["model"])
+        self._reset_queue()
+
+    def _sweep(self, steps: int):
+        """ Pops and updates up to `steps` pairs of the highest priorities. """
+        Q = self._Q_flat
+        for _ in range(steps):
+            pair = self._pop()
+            if pair < 0:
+                break
+            state_id, action = divmod(pair, self.action_count)
+            # update q-value with the model
+            Q[state_id, action] += self.alpha * self._td_errors(np.array([pair]))[0]
+            # queue the predecessors whose td errors changed
+            predecessors = self.model.predecessors(state_id)
+            if len(predecessors) > 0:
+                self._push(predecessors, np.abs(self._td_errors(predecessors)))
+
+    def _td_errors(self, pairs: np.ndarray) -> np.ndarray:
+        model = self.model
+        Q = self._Q_flat
+        states, actions = np.divmod(pairs, self.action_count)
+        target_q = Q[model.next_state[pairs]].max(axis=-1)
+        return model.reward[pairs] + self.gamma * (1.0 - model.terminated[pairs]) * target_q - Q[states, actions]
+
+    def _push(self, pairs: np.ndarray, priorities: np.ndarray):
+        # only the pairs above the threshold whose priorities increase are pushed, the old entries become stale
+        mask = (priorities > self.theta) & (priorities > self._priorities[pairs])
+        for pair, priority in zip(pairs[mask].tolist(), priorities[mask].tolist()):
+            self._priorities[pair] = priority
+            heapq.heappush(self._queue, (-priority, pair))
+
+    def _pop(self) -> int:
+        """ Pops the pair of the highest priority or returns -1 if the queue is empty. """
+        queue = self._queue
+        while queue:
+            negative_priority, pair = heapq.heappop(queue)
+            # skip the stale entries
+            if self._priorities[pair] == -negative_priority:
+                self._priorities[pair] = 0.0
+                return pair
+        return -1
@@ -0,0 +1,62 @@
+from typing import List, Tuple
+from rl import TabularQAgent, QStorage, Transition, epsilon_greedy
+from rl.rl_agent.eligibility_traces import EligibilityTraces
+
+class QLambda(TabularQAgent):
+    """
+    Watkins's Q(lambda) with eligibility traces of only the active (state, action) pairs (see `EligibilityTraces`).
+    The traces are cut when an exploratory (non-greedy) action is taken, since the later rewards don't follow the greedy policy.
+    """
+
+    def __init__(self, obs_shape: tuple,
+                 action_count: int,
+                 terminal_states: List[Tuple] = None,
+                 epsilon = 0.1,
+                 alpha = 0.1,
+                 gamma = 0.9,
+                 lambda_ = 0.9,
+                 trace_cutoff: float = 1e-4,
+                 replacing_traces: bool = False,
+                 storage: QStorage = None) -> None:
+        super().__init__(obs_shape, action_count, terminal_states, storage)
+        self.epsilon = epsilon
+        self.alpha = alpha
+        self.gamma = gamma
+        self.lambda_ = lambda_
+        self.traces = EligibilityTraces(action_count, trace_cutoff, replacing_traces)
+
+    def start_episode(self):
+        self.traces.clear()
+
+    def update(self, transition: Transition):
+        transition = transition.to_tabular()
+        self.update_ids(
+            int(self.to_state_id(transition.current_state)),
+            transition.current_action,
+            transition.reward,
+            int(self.to_state_id(transition.next_state)),
+            transition.terminated
+        )
+
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        Q = self._Q_flat
+        traces = self.traces
+
+        # cut the traces after an exploratory action
+        if Q[state_id, action] < Q[state_id].max():
+            traces.clear()
+        # compute td error
+        td_error = reward + self.gamma * (1 - terminated) * Q[next_state_id].max() - Q[state_id, action]
+        # update q-values of the active pairs
+        traces.visit(state_id, action)
+        traces.apply(Q, self.alpha * td_error)
+        if terminated:
+            traces.clear()
+        else:
+            traces.decay(self.gamma * self.lambda_)
+
+    def get_action(self, state) -> int:
+        return epsilon_greedy(self._Q, tuple(state), self.action_count, self.epsilon)
+
+    def get_action_id(self, state_id: int) -> int:
+        return epsilon_greedy(self._Q_flat, state_id, self.action_count, self.epsilon)
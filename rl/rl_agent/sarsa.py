@@ -1,5 +1,5 @@
 from typing import List, Tuple
-from rl import TabularQAgent, Transition, epsilon_greedy
+from rl import TabularQAgent, QStorage, Transition, epsilon_greedy
 
 class Sarsa(TabularQAgent):
     def __init__(self, obs_shape: tuple, 
@@ -7,15 +7,18 @@ class Sarsa(TabularQAgent):
                  terminal_states: List[Tuple] = None, 
                  epsilon = 0.1,
                  alpha = 0.1,
-                 gamma = 0.9) -> None:
-        super().__init__(obs_shape, action_count, terminal_states)
+                 gamma = 0.9,
+                 storage: QStorage = None) -> None:
+        super().__init__(obs_shape, action_count, terminal_states, storage)
         self.epsilon = epsilon
         self.alpha = alpha
         self.gamma = gamma  
         self.cur_transition = None # current transition to update q values for it
+        self._cur_ids = None # current transition of flat state indices for update_ids()
         
     def start_episode(self):
         self.cur_transition = None
+        self._cur_ids = None
     
     def update(self, transition: Transition):
         # if you don't have a next action, skip the update rule until the next update call
@@ -35,11 +38,34 @@ class Sarsa(TabularQAgent):
             Q[self.cur_transition.current_state][self.cur_transition.current_action]
         )
         # update q-value
-        Q[self.cur_transition.current_state][self.cur_transition.current_action] += self.alpha * td_error
+        Q[self.cur_transition.current_state + (self.cur_transition.current_action,)] += self.alpha * td_error
         
         # update the current transition
         self.cur_transition = transition
         
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        # the same rule as update() with flat state indices
+        if self._cur_ids is None:
+            self._cur_ids = (state_id, action, reward, next_state_id)
+        
+        Q = self._Q_flat
+        cur_state_id, cur_action, cur_reward, cur_next_state_id = self._cur_ids
+        
+        # the next action is the current action of the next transition
+        td_error = (
+            cur_reward + 
+            self.gamma * (1 - terminated) * Q[cur_next_state_id, action] - 
+            Q[cur_state_id, cur_action]
+        )
+        # update q-value
+        Q[cur_state_id, cur_action] += self.alpha * td_error
+        
+        # update the current transition
+        self._cur_ids = (state_id, action, reward, next_state_id)
+        
     def get_action(self, state) -> int:
         return epsilon_greedy(self._Q, tuple(state), self.action_count, self.epsilon)
+    
+    def get_action_id(self, state_id: int) -> int:
+        return epsilon_greedy(self._Q_flat, state_id, self.action_count, self.epsilon)
     
\ No newline at end of file
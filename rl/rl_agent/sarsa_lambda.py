@@ -0,0 +1,73 @@
+from typing import List, Tuple
+from rl import TabularQAgent, QStorage, Transition, epsilon_greedy
+from rl.rl_agent.eligibility_traces import EligibilityTraces
+
+class SarsaLambda(TabularQAgent):
+    """
+    Sarsa(lambda) with eligibility traces of only the active (state, action) pairs (see `EligibilityTraces`),
+    so the cost of a step is bounded by the number of recently visited pairs, not by the size of the table.
+    Like `Sarsa`, the update of a transition waits for the next action.
+    """
+
+    def __init__(self, obs_shape: tuple,
+                 action_count: int,
+                 terminal_states: List[Tuple] = None,
+                 epsilon = 0.1,
+                 alpha = 0.1,
+                 gamma = 0.9,
+                 lambda_ = 0.9,
+                 trace_cutoff: float = 1e-4,
+                 replacing_traces: bool = False,
+                 storage: QStorage = None) -> None:
+        super().__init__(obs_shape, action_count, terminal_states, storage)
+        self.epsilon = epsilon
+        self.alpha = alpha
+        self.gamma = gamma
+        self.lambda_ = lambda_
+        self.traces = EligibilityTraces(action_count, trace_cutoff, replacing_traces)
+        self._cur_ids = None # current transition of flat state indices waiting for the next action
+
+    def start_episode(self):
+        self.traces.clear()
+        self._cur_ids = None
+
+    def update(self, transition: Transition):
+        transition = transition.to_tabular()
+        self.update_ids(
+            int(self.to_state_id(transition.current_state)),
+            transition.current_action,
+            transition.reward,
+            int(self.to_state_id(transition.next_state)),
+            transition.terminated
+        )
+
+    def update_ids(self, state_id: int, action: int, reward: float, next_state_id: int, terminated: bool) -> None:
+        Q = self._Q_flat
+
+        # the next action of the current transition is the action of this transition
+        if self._cur_ids is not None:
+            cur_state_id, cur_action, cur_reward, cur_next_state_id = self._cur_ids
+            td_error = cur_reward + self.gamma * Q[cur_next_state_id, action] - Q[cur_state_id, cur_action]
+            self.__backup(cur_state_id, cur_action, td_error)
+
+        if terminated:
+            # there's no next action, so update it now and end the traces
+            td_error = reward - Q[state_id, action]
+            self.__backup(state_id, action, td_error)
+            self.traces.clear()
+            self._cur_ids = None
+        else:
+            self._cur_ids = (state_id, action, reward, next_state_id)
+
+    def get_action(self, state) -> int:
+        return epsilon_greedy(self._Q, tuple(state), self.action_count, self.epsilon)
+
+    def get_action_id(self, state_id: int) -> int:
+        return epsilon_greedy(self._Q_flat, state_id, self.action_count, self.epsilon)
+
+    def __backup(self, state_id: int, action: int, td_error: float):
+        traces = self.traces
+        traces.visit(state_id, action)
+        # update q-values of the active pairs
+        traces.apply(self._Q_flat, self.alpha * td_error)
+        traces.decay(self.gamma * self.lambda_)
@@ -0,0 +1,94 @@
+import numpy as np
+
+class TabularModel:
+    """
+    Deterministic model of the last observed outcome of every (state, action) pair for planning agents.
+    The pairs are the flat indices `state_id * action_count + action` and every field is a preallocated `(state_count * action_count,)` array.
+    The predecessors of each state, the pairs whose modeled next state is it, are kept in doubly linked lists stored in arrays.
+    """
+
+    def __init__(self, state_count: int, action_count: int) -> None:
+        self.state_count = state_count
+        self.action_count = action_count
+        pair_count = state_count * action_count
+        self.next_state = np.full(pair_count, -1, dtype=np.int64)
+        self.reward = np.zeros(pair_count)
+        self.terminated = np.zeros(pair_count, dtype=np.bool_)
+        # observed pairs in the order they're first seen, for uniform sampling
+        self.observed = np.empty(pair_count, dtype=np.int64)
+        self.count = 0
+        # linked lists of the predecessors
+        self._pred_head = np.full(state_count, -1, dtype=np.int64)
+        self._pred_next = np.full(pair_count, -1, dtype=np.int64)
+        self._pred_prev = np.full(pair_count, -1, dtype=np.int64)
+
+    def add(self, pair: int, next_state: int, reward: float, terminated: bool) -> None:
+        """ Set the outcome of the pair. """
+        prev_next_state = self.next_state[pair]
+        if prev_next_state < 0:
+            self.observed[self.count] = pair
+            self.count += 1
+        if prev_next_state != next_state:
+            if prev_next_state >= 0:
+                self._unlink(pair, prev_next_state)
+            self._link(pair, next_state)
+        self.next_state[pair] = next_state
+        self.reward[pair] = reward
+        self.terminated[pair] = terminated
+
+    def add_batch(self, pairs: np.ndarray, next_states: np.ndarray, rewards: np.ndarray, terminated: np.ndarray) -> None:
+        """ Set the outcomes of the pairs. The later one wins for duplicate pairs. """
+        for pair, next_state, reward, t in zip(pairs.tolist(), next_states.tolist(), rewards.tolist(), terminated.tolist()):
+            self.add(pair, next_state, reward, t)
+
+    def sample(self, n: int) -> np.ndarray:
+        """ `n` observed pairs sampled uniformly at random. """
+        return self.observed[np.random.randint(self.count, size=n)]
+
+    def predecessors(self, state_id: int) -> np.ndarray:
+        """ Pairs whose modeled next state is the state. """
+        pairs = []
+        pair = self._pred_head[state_id]
+        while pair >= 0:
+            pairs.append(pair)
+            pair = self._pred_next[pair]
+        return np.array(pairs, dtype=np.int64)
+
+    def state_dict(self) -> dict:
+        return {
+            "next_state": self.next_state,
+            "reward": self.reward,
+            "terminated": self.terminated,
+            "observed": self.observed,
+            "count": self.count,
+            "pred_head": self._pred_head,
+            "pred_next": self._pred_next,
+            "pred_prev": self._pred_prev
+        }
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        self.next_state = np.array(state_dict["next_state"])
+        self.reward = np.array(state_dict["reward"])
+        self.terminated = np.array(state_dict["terminated"])
+        self.observed = np.array(state_dict["observed"])
+        self.count = state_dict["count"]
+        self._pred_head = np.array(state_dict["pred_head"])
+        self._pred_next = np.array(state_dict["pred_next"])
+        self._pred_prev = np.array(state_dict["pred_prev"])
+
+    def _link(self, pair: int, state_id: int):
+        head = self._pred_head[state_id]
+        self._pred_next[pair] = head
+        self._pred_prev[pair] = -1
+        if head >= 0:
+            self._pred_prev[head] = pair
+        self._pred_head[state_id] = pair
+
+    def _unlink(self, pair: int, state_id: int):
+        prev_pair, next_pair = self._pred_prev[pair], self._pred_next[pair]
+        if prev_pair >= 0:
+            self._pred_next[prev_pair] = next_pair
+        else:
+            self._pred_head[state_id] = next_pair
+        if next_pair >= 0:
+            self._pred_prev[next_pair] = prev_pair
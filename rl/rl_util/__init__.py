@@ -2,3 +2,7 @@ from .transition import *
 from .policy import *
 from .replay import *
 from .onpolicy_replay import *
+from .array_replay import *
+from .segment_tree import *
+from .prioritized_replay import *
+from .returns import *
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import numpy as np
+from rl.rl_util import Transition, Replay
+
+class ArrayReplay(Replay):
+    """
+    Replay backed by preallocated numpy columns with a circular write index.
+    The columns are allocated on the first `add()` from the shapes and dtypes of that transition.
+    `sample()` returns a `Transition` whose fields are batched columns, which `Transition.to_tensor_batch()` converts without per-transition work.
+    """
+
+    def __init__(self, max_count: int) -> None:
+        assert max_count > 0
+        super().__init__(max_count)
+        self._columns: Transition = None
+        self._write_index = 0
+        self._size = 0
+
+    def reset(self):
+        """ Reset the replay. The columns are kept allocated. """
+        self._write_index = 0
+        self._size = 0
+
+    def add(self, transition: Transition):
+        """ Add a transition. The oldest one is overwritten when the replay is full. """
+        if self._columns is None:
+            self._columns = self._allocate(transition)
+        i = self._write_index
+        for column, value in zip(self._columns, transition):
+            column[i] = value
+        self._write_index = (i + 1) % self.max_count
+        if self._size < self.max_count:
+            self._size += 1
+
+    def sample(self, batch_size: int = None) -> Transition:
+        """ Sample from the replay.
+
+        Args:
+            batch_size (int, optional): if it's None, all the transitions are returned in the order they were added.
+                They are views of the columns when they're contiguous, so they're only valid until the next `add()`.
+                Otherwise, `batch_size` transitions are gathered uniformly at random. Defaults to None.
+
+        Returns:
+            Transition: batched columns `(batch_size, ...)`
+        """
+
+        if batch_size is not None:
+            indices = np.random.randint(self._size, size=batch_size)
+            return self.gather(indices)
+        if self._size < self.max_count or self._write_index == 0:
+            return Transition(*(column[:self._size] for column in self._columns))
+        # wrapped around, so gather from the oldest one
+        indices = (np.arange(self._size) + self._write_index) % self.max_count
+        return self.gather(indices)
+
+    def gather(self, indices: np.ndarray) -> Transition:
+        """ Gather the transitions at the storage indices. """
+        return Transition(*(column[indices] for column in self._columns))
+
+    def state_dict(self) -> dict:
+        """ Returns the contents of the replay for a checkpoint. The columns are references. """
+        columns = None if self._columns is None else self._columns._asdict()
+        return {"columns": columns, "write_index": self._write_index, "size": self._size}
+
+    def load_state_dict(self, state_dict: dict):
+        """ Restore the contents returned by `state_dict()`. """
+        columns = state_dict["columns"]
+        # copy the columns because they're overwritten in place
+        self._columns = None if columns is None else Transition(*(np.array(columns[field]) for field in Transition._fields))
+        self._write_index = state_dict["write_index"]
+        self._size = state_dict["size"]
+
+    @property
+    def count(self) -> int:
+        return self._size
+
+    def _allocate(self, transition: Transition) -> Transition:
+        columns = []
+        for field, value in zip(Transition._fields, transition):
+            value = np.asarray(value)
+            dtype = value.dtype
+            if field == "reward":
+                dtype = np.float32
+            elif field == "terminated":
+                dtype = np.bool_
+            columns.append(np.empty((self.max_count,) + value.shape, dtype=dtype))
+        return Transition(*columns)
+
+class ArrayOnPolicyReplay(ArrayReplay):
+    def __init__(self, max_count: int) -> None:
+        super().__init__(max_count)
+
+    def sample(self) -> Transition:
+        """ Sample from the replay and reset one. The returned columns are only valid until the next `add()`. """
+        temp = super().sample()
+        self.reset()
+        return temp
@@ -1,7 +1,10 @@
-from typing import Tuple
+from __future__ import annotations
+from typing import TYPE_CHECKING, Tuple
 import numpy as np
-import torch
-import torch.nn as nn
+
+if TYPE_CHECKING:
+    import torch
+    import torch.nn as nn
 
 def epsilon_greedy(q_values, state: Tuple, action_count: int, epsilon = 0.1) -> int:
     p = np.random.rand()
@@ -12,6 +15,7 @@ def epsilon_greedy(q_values, state: Tuple, action_count: int, epsilon = 0.1) ->
     
 def epsilon_greedy_dnn(q_value_net: nn.Module, state: torch.Tensor, action_count: int, epsilon=0.1):
     """ Get an action from epsilon greedy policy using dnn. """
+    import torch
     if np.random.rand() > epsilon:
         with torch.no_grad():
             q_values = q_value_net(state)
@@ -32,4 +36,62 @@ def epsilon_greedy_distribution(q_values,
     policy_distribution = np.zeros(action_count)
     policy_distribution[greedy_action] = greed_action_prob # greedy action
     policy_distribution[np.arange(action_count) != greedy_action] = non_greedy_action_prob # non greedy action
-    return policy_distribution
\ No newline at end of file
+    return policy_distribution
+
+
+class RandomPool:
+    """ Uniform random numbers in [0, 1) pre-drawn in bulk from a `np.random.Generator` and served in slices. """
+
+    def __init__(self, rng: np.random.Generator = None, size: int = 65536) -> None:
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.size = size
+        self._pool = self.rng.random(size)
+        self._index = 0
+        
+    def random(self, n: int) -> np.ndarray:
+        """ Returns `n` uniform random numbers. They're a copy, because the pool is refilled in place. """
+        if n > self.size:
+            return self.rng.random(n)
+        if self._index + n > self.size:
+            self.rng.random(out=self._pool)
+            self._index = 0
+        values = self._pool[self._index:self._index + n].copy()
+        self._index += n
+        return values
+    
+def greedy_actions(q_values: np.ndarray, pool: RandomPool) -> np.ndarray:
+    """ Greedy actions of action values `(B, action_count)`. Ties are broken uniformly at random. """
+    batch_size, action_count = q_values.shape
+    ties = q_values == q_values.max(axis=-1, keepdims=True)
+    # the tied action with the largest random key wins
+    keys = pool.random(batch_size * action_count).reshape(batch_size, action_count)
+    return np.argmax(np.where(ties, keys, -1.0), axis=-1)
+    
+def epsilon_greedy_actions(q_values: np.ndarray, epsilon: float, pool: RandomPool) -> np.ndarray:
+    """ Epsilon-greedy actions of action values `(B, action_count)`. """
+    batch_size, action_count = q_values.shape
+    p = pool.random(2 * batch_size)
+    random_actions = np.minimum((p[batch_size:] * action_count).astype(np.int64), action_count - 1)
+    return np.where(p[:batch_size] > epsilon, greedy_actions(q_values, pool), random_actions)
+    
+def epsilon_greedy_batch(q_values, states: np.ndarray, epsilon: float, pool: RandomPool) -> np.ndarray:
+    """ Epsilon-greedy actions for many states at once.
+
+    Args:
+        q_values (np.ndarray): action values `(*obs_shape, action_count)` or `(state_count, action_count)`
+        states (np.ndarray): states `(B, *state_dims)` or flat state indices `(B,)`
+        epsilon (float): exploration probability
+        pool (RandomPool): random numbers
+
+    Returns:
+        np.ndarray: actions `(B,)`
+    """
+    states = np.asarray(states)
+    if states.ndim > 1:
+        states = tuple(states.reshape(len(states), -1).T)
+    return epsilon_greedy_actions(q_values[states], epsilon, pool)
+
+def epsilon_greedy_expected_value(q_values: np.ndarray, epsilon: float) -> np.ndarray:
+    """ Expected action value under the epsilon-greedy policy in closed form, `(1 - epsilon) * max_a q + epsilon * mean_a q`.
+    It's computed along the last axis of `q_values` without building the policy distribution. """
+    return (1.0 - epsilon) * np.max(q_values, axis=-1) + epsilon * np.mean(q_values, axis=-1)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+from typing import Tuple
+import numpy as np
+from rl.rl_util import Transition, ArrayReplay
+from rl.rl_util.segment_tree import SumTree, MinTree
+
+class PrioritizedReplay(ArrayReplay):
+    """
+    Proportional prioritized experience replay. The transition `i` is sampled with the probability `p_i^alpha / sum_k p_k^alpha`.
+    Priorities are stored in a sum-tree and a min-tree, so sampling, the min-priority query and priority updates are all O(log n).
+    """
+
+    def __init__(self, max_count: int, alpha: float = 0.6, beta: float = 0.4, epsilon: float = 1e-6) -> None:
+        super().__init__(max_count)
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self._sum_tree = SumTree(max_count)
+        self._min_tree = MinTree(max_count)
+        self._max_priority = 1.0
+
+    def reset(self):
+        """ Reset the replay. """
+        super().reset()
+        self._sum_tree.reset()
+        self._min_tree.reset()
+        self._max_priority = 1.0
+
+    def state_dict(self) -> dict:
+        state_dict = super().state_dict()
+        state_dict["sum_tree"] = self._sum_tree._tree
+        state_dict["min_tree"] = self._min_tree._tree
+        state_dict["max_priority"] = self._max_priority
+        return state_dict
+
+    def load_state_dict(self, state_dict: dict):
+        super().load_state_dict(state_dict)
+        self._sum_tree._tree[:] = state_dict["sum_tree"]
+        self._min_tree._tree[:] = state_dict["min_tree"]
+        self._max_priority = state_dict["max_priority"]
+
+    def add(self, transition: Transition):
+        """ Add a transition with the maximum priority seen so far. """
+        index = self._write_index
+        super().add(transition)
+        priority = self._max_priority ** self.alpha
+        self._sum_tree.update(index, priority)
+        self._min_tree.update(index, priority)
+
+    def sample(self, batch_size: int, beta: float = None) -> Tuple[Transition, np.ndarray, np.ndarray]:
+        """ Sample transitions proportionally to their priorities with stratified sampling.
+
+        Args:
+            batch_size (int): number of transitions
+            beta (float, optional): importance-sampling exponent. if it's None, `self.beta` is used. Defaults to None.
+
+        Returns:
+            Tuple[Transition, np.ndarray, np.ndarray]: batched transitions, importance-sampling weights `(batch_size,)`, storage indices `(batch_size,)` for `update_priorities()`
+        """
+
+        assert not self.is_empty
+        if beta is None:
+            beta = self.beta
+
+        total = self._sum_tree.total
+        # one uniform sample from each of batch_size equal segments
+        segment = total / batch_size
+        prefix_sums = (np.arange(batch_size) + np.random.rand(batch_size)) * segment
+        indices = np.minimum(self._sum_tree.find_prefix_sum_index(prefix_sums), self.count - 1)
+
+        # importance-sampling weights normalized by the maximum weight
+        probs = self._sum_tree[indices] / total
+        min_prob = self._min_tree.min / total
+        weights = (probs / min_prob) ** -beta
+
+        return self.gather(indices), weights.astype(np.float32), indices
+
+    def update_priorities(self, indices: np.ndarray, priorities: np.ndarray):
+        """ Write back new priorities (e.g. absolute td errors) of the sampled transitions. """
+        priorities = np.abs(np.asarray(priorities, dtype=np.float64)) + self.epsilon
+        self._max_priority = max(self._max_priority, float(priorities.max()))
+        priorities = priorities ** self.alpha
+        self._sum_tree.update(indices, priorities)
+        self._min_tree.update(indices, priorities)
@@ -23,6 +23,15 @@ class Replay:
         """ Sample from the replay. """
         return self._transitions.copy()
     
+    def state_dict(self) -> dict:
+        """ Returns the contents of the replay for a checkpoint. """
+        return {"transitions": list(self._transitions), "count": self.__count}
+    
+    def load_state_dict(self, state_dict: dict):
+        """ Restore the contents returned by `state_dict()`. """
+        self._transitions = list(state_dict["transitions"])
+        self.__count = state_dict["count"]
+    
     @property
     def count(self) -> int:
         return self.__count
@@ -0,0 +1,34 @@
+import numpy as np
+
+def discounted_returns(rewards: np.ndarray, gamma: float) -> np.ndarray:
+    """ Returns the discounted returns `G_t = r_t + gamma * G_{t+1}` along the last axis with a vectorized reverse cumulative sum.
+    Padded episodes `(M, T)` work as long as the rewards after the end of an episode are 0.
+
+    Args:
+        rewards (np.ndarray): rewards `(..., T)`
+        gamma (float): discount factor in [0, 1]
+
+    Returns:
+        np.ndarray: float64 returns `(..., T)`
+    """
+
+    rewards = np.asarray(rewards, dtype=np.float64)
+    T = rewards.shape[-1]
+    if gamma == 0.0:
+        return rewards.copy()
+    if gamma == 1.0:
+        return np.flip(np.cumsum(np.flip(rewards, -1), -1), -1)
+
+    # G_t = gamma^-t * sum_{k >= t} gamma^k r_k
+    # it's computed in chunks which keep gamma^-t in the float range and carry the return after each chunk
+    chunk_size = max(1, int(np.log(1e-150) / np.log(gamma)))
+    returns = np.empty_like(rewards)
+    next_returns = np.zeros(rewards.shape[:-1])
+    for end in range(T, 0, -chunk_size):
+        start = max(0, end - chunk_size)
+        powers = gamma ** np.arange(end - start)
+        chunk_returns = np.flip(np.cumsum(np.flip(rewards[..., start:end] * powers, -1), -1), -1) / powers
+        chunk_returns += next_returns[..., np.newaxis] * (gamma ** (end - start) / powers)
+        returns[..., start:end] = chunk_returns
+        next_returns = chunk_returns[..., 0]
+    return returns
@@ -0,0 +1,76 @@
+import numpy as np
+
+class SegmentTree:
+    """
+    Array-based segment tree over `capacity` leaves. The node `i` has the children `2i` and `2i + 1`, the root is the node 1.
+    All the operations take arrays of leaf indices and run level by level, so a batch costs O(batch_size * log n) numpy work.
+    """
+
+    def __init__(self, capacity: int, operation: np.ufunc, neutral_value: float) -> None:
+        assert capacity > 0
+        # round up to a power of 2 so that every leaf has the same depth
+        self.__leaf_count = 1 << (capacity - 1).bit_length()
+        self.__capacity = capacity
+        self.__operation = operation
+        self.__neutral_value = neutral_value
+        self._tree = np.full(2 * self.__leaf_count, neutral_value, dtype=np.float64)
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def leaf_count(self) -> int:
+        return self.__leaf_count
+
+    def reset(self):
+        """ Set all the leaves to the neutral value. """
+        self._tree.fill(self.__neutral_value)
+
+    def __getitem__(self, indices):
+        return self._tree[np.asarray(indices) + self.__leaf_count]
+
+    def update(self, indices, values):
+        """ Set the leaves at the indices to the values and update their ancestors. """
+        nodes = np.asarray(indices, dtype=np.int64).reshape(-1) + self.__leaf_count
+        if len(nodes) == 0:
+            return
+        self._tree[nodes] = values
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self._tree[nodes] = self.__operation(self._tree[2 * nodes], self._tree[2 * nodes + 1])
+            nodes = np.unique(nodes // 2)
+
+    def reduce(self) -> float:
+        """ Reduce all the leaves with the operation. """
+        return self._tree[1]
+
+class SumTree(SegmentTree):
+    def __init__(self, capacity: int) -> None:
+        super().__init__(capacity, np.add, 0.0)
+
+    @property
+    def total(self) -> float:
+        return self.reduce()
+
+    def find_prefix_sum_index(self, prefix_sums) -> np.ndarray:
+        """ Find the smallest leaf indices `i` such that the sum of the leaves `[0, i]` is greater than or equal to the prefix sums. """
+        prefix_sums = np.array(prefix_sums, dtype=np.float64).reshape(-1)
+        nodes = np.ones(len(prefix_sums), dtype=np.int64)
+        tree = self._tree
+        while len(nodes) > 0 and nodes[0] < self.leaf_count:
+            left = 2 * nodes
+            left_sums = tree[left]
+            go_right = prefix_sums > left_sums
+            prefix_sums -= np.where(go_right, left_sums, 0.0)
+            nodes = left + go_right
+        # floating point error can go past the last used leaf
+        return np.minimum(nodes - self.leaf_count, self.capacity - 1)
+
+class MinTree(SegmentTree):
+    def __init__(self, capacity: int) -> None:
+        super().__init__(capacity, np.minimum, np.inf)
+
+    @property
+    def min(self) -> float:
+        return self.reduce()
@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import Any, List, NamedTuple
+from typing import TYPE_CHECKING, Any, List, NamedTuple
 import numpy as np
-import torch
+from rl.util.profiler import profile_phase
+
+if TYPE_CHECKING:
+    import torch
 
 class Transition(NamedTuple):
     current_state: Any
@@ -11,13 +14,14 @@ class Transition(NamedTuple):
     terminated: bool
     
     def to_tabular(self):
-        transition = Transition(
-            tuple(self.current_state),
-            int(self.current_action),
-            tuple(self.next_state),
-            self.reward,
-            self.terminated
-        )
+        with profile_phase("to_tabular"):
+            transition = Transition(
+                tuple(self.current_state),
+                int(self.current_action),
+                tuple(self.next_state),
+                self.reward,
+                self.terminated
+            )
         return transition
     
     def to_numpy(self):
@@ -31,6 +35,7 @@ class Transition(NamedTuple):
         return transition
     
     def to_tensor(self, device: torch.device = None, requires_grad: bool = False):
+        import torch
         transition = Transition(
             torch.tensor(self.current_state, device=device, requires_grad=requires_grad),
             torch.tensor(self.current_action, device=device, requires_grad=requires_grad),
@@ -41,7 +46,12 @@ class Transition(NamedTuple):
         return transition
     
     @staticmethod
-    def to_tensor_batch(transitions: list[Transition], device: torch.device = None, requires_grad: bool = False):
+    def to_tensor_batch(transitions: list[Transition] | Transition, device: torch.device = None, requires_grad: bool = False):
+        """ Convert transitions to batched tensors. `transitions` is either a list of transitions or a transition of batched columns (e.g. sampled from `ArrayReplay`). """
+        if isinstance(transitions, Transition):
+            return Transition._columns_to_tensor_batch(transitions, device, requires_grad)
+        import torch
+        
         current_states = []
         current_actions = []
         next_states = []
@@ -61,4 +71,18 @@ class Transition(NamedTuple):
         rewards = torch.tensor(rewards, device=device, requires_grad=requires_grad)
         terminated_arr = torch.tensor(terminated_arr, device=device, requires_grad=requires_grad).int()
         
-        return current_states, current_actions, next_states, rewards, terminated_arr
\ No newline at end of file
+        return current_states, current_actions, next_states, rewards, terminated_arr
+    
+    @staticmethod
+    def _columns_to_tensor_batch(columns: Transition, device: torch.device = None, requires_grad: bool = False):
+        import torch
+        # torch.from_numpy() shares the memory of the columns
+        current_states, current_actions, next_states, rewards, terminated_arr = (
+            torch.from_numpy(np.ascontiguousarray(column)).to(device=device) for column in columns
+        )
+        if requires_grad:
+            current_states.requires_grad_()
+            next_states.requires_grad_()
+            rewards.requires_grad_()
+        
+        return current_states, current_actions, next_states, rewards, terminated_arr.int()
@@ -0,0 +1 @@
+from .frozen_policy import *
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import json
+import os
+import numpy as np
+
+POLICY_FORMAT_VERSION = 1
+
+class TabularPolicy:
+    """
+    Frozen greedy policy of a tabular agent, an integer action lookup array `(*obs_shape)`.
+    An action is one array read, so it doesn't need `rl` or torch to serve actions.
+    """
+
+    def __init__(self, actions: np.ndarray) -> None:
+        self.actions = actions
+        self.obs_shape = actions.shape
+        self._flat_actions = actions.reshape(-1)
+        # row-major strides of the states, `states @ strides` is the flat state index
+        self._strides = np.array([int(np.prod(self.obs_shape[i + 1:])) for i in range(len(self.obs_shape))], dtype=np.int64)
+
+    def act(self, state) -> int:
+        """ Returns the greedy action of a state `(*state_dims)`. """
+        return int(self.actions[tuple(state)])
+
+    def act_batch(self, states) -> np.ndarray:
+        """ Returns the greedy actions of states `(B, *state_dims)`. """
+        return self._flat_actions[np.asarray(states, dtype=np.int64) @ self._strides]
+
+    def act_ids(self, state_ids) -> np.ndarray:
+        """ Returns the greedy actions of flat state indices. """
+        return self._flat_actions[state_ids]
+
+class TorchScriptPolicy:
+    """ Frozen greedy policy of a TorchScript network, the action is the argmax of the network output. """
+
+    def __init__(self, module, device = None) -> None:
+        import torch
+        self._torch = torch
+        self.module = module
+        self.device = device
+
+    def act(self, state) -> int:
+        """ Returns the greedy action of a state `(*state_dims)`. """
+        return int(self.act_batch(np.asarray(state)[np.newaxis])[0])
+
+    def act_batch(self, states) -> np.ndarray:
+        """ Returns the greedy actions of states `(B, *state_dims)` with one forward propagation. """
+        torch = self._torch
+        with torch.inference_mode():
+            states = torch.as_tensor(np.asarray(states, dtype=np.float32), device=self.device)
+            return self.module(states).argmax(dim=-1).cpu().numpy()
+
+def load_policy(path: str, mmap_mode: str = None, device = None):
+    """ Load a policy exported by `rl.train.export_policy()`. torch is imported only for TorchScript policies.
+
+    Args:
+        path (str): exported policy directory
+        mmap_mode (str, optional): `np.load()` mode of the action array of a tabular policy. Defaults to None, which reads it into memory.
+        device (optional): device of a TorchScript policy. Defaults to None, which is the cpu.
+
+    Returns:
+        TabularPolicy | TorchScriptPolicy: policy
+    """
+
+    manifest = read_policy_manifest(path)
+    if manifest["kind"] == "tabular":
+        return TabularPolicy(np.load(os.path.join(path, manifest["file"]), mmap_mode=mmap_mode))
+    if manifest["kind"] == "torchscript":
+        import torch
+        module = torch.jit.load(os.path.join(path, manifest["file"]), map_location=device)
+        return TorchScriptPolicy(module, device)
+    raise ValueError(f"Unknown policy kind {manifest['kind']}.")
+
+def read_policy_manifest(path: str) -> dict:
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] > POLICY_FORMAT_VERSION:
+        raise ValueError(f"The policy format version {manifest['format_version']} is newer than the supported version {POLICY_FORMAT_VERSION}.")
+    return manifest
@@ -0,0 +1,4 @@
+from .trainer import *
+from .sweep import *
+from .checkpoint import *
+from .export import *
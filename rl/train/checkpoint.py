@@ -0,0 +1,248 @@
+from __future__ import annotations
+import copy
+import json
+import os
+import pickle
+import random
+import shutil
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import rl
+from rl.train.trainer import Callback
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+class Checkpointer:
+    """
+    Saves and restores `state_dict()` of agents in a directory. A checkpoint is a directory with a versioned `manifest.json`:
+
+    * the numpy arrays of the state (e.g. q-values, replay columns) are `.npy` files, which are loaded with `np.load(mmap_mode=...)`
+      so that even huge q-tables are ready almost instantly and only the touched pages are read
+    * the other values (e.g. torch state dicts, schedule steps) are saved with `torch.save()` when torch is imported, otherwise pickled
+
+    The state is copied when `save()` is called and the files are written by a background thread, so training continues while it's written.
+    A checkpoint is written into a temporary directory and renamed when it's complete, then `latest.json` points to it,
+    so a crash while writing never leaves a broken latest checkpoint. Saving a step again writes a new directory and deletes the old one after `latest.json` is switched.
+    """
+
+    def __init__(self, directory: str, keep_last: int = 3, save_random_state: bool = True) -> None:
+        """
+        Args:
+            directory (str): checkpoint directory
+            keep_last (int, optional): number of checkpoints to keep. if it's 0, all of them are kept. Defaults to 3.
+            save_random_state (bool, optional): save the random states of numpy, random and torch which the agents use. Defaults to True.
+        """
+
+        self.directory = directory
+        self.keep_last = keep_last
+        self.save_random_state = save_random_state
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: List[Future] = []
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, agent: rl.Agent, step: int, metadata: Dict[str, Any] = None, block: bool = False) -> Future:
+        """ Save a checkpoint of the agent.
+
+        Args:
+            agent (rl.Agent): agent
+            step (int): checkpoint number, e.g. the number of episodes or steps
+            metadata (Dict[str, Any], optional): json-serializable values written in the manifest. Defaults to None.
+            block (bool, optional): wait until the checkpoint is written. Defaults to False.
+
+        Returns:
+            Future: future of the checkpoint path
+        """
+
+        # copy the state now, the agent keeps changing while it's written
+        arrays, objects = _flatten(agent.state_dict())
+        arrays = {key: np.array(value) for key, value in arrays.items()}
+        objects = copy.deepcopy(objects)
+        random_state = _get_random_state() if self.save_random_state else None
+        manifest = {
+            "format_version": CHECKPOINT_FORMAT_VERSION,
+            "step": step,
+            "time": time.time(),
+            "agent": f"{type(agent).__module__}.{type(agent).__qualname__}",
+            "metadata": {} if metadata is None else metadata
+        }
+
+        self._pending = [f for f in self._pending if not f.done()]
+        future = self._executor.submit(self._write, arrays, objects, random_state, manifest)
+        self._pending.append(future)
+        if block:
+            future.result()
+        return future
+
+    def wait(self) -> None:
+        """ Wait for the pending writes. An exception of a failed write is raised here. """
+        pending = self._pending
+        self._pending = []
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        self.wait()
+        self._executor.shutdown()
+
+    @property
+    def latest(self) -> str:
+        """ Path of the latest checkpoint or None. """
+        try:
+            with open(os.path.join(self.directory, "latest.json")) as f:
+                return os.path.join(self.directory, json.load(f)["checkpoint"])
+        except FileNotFoundError:
+            return None
+
+    def checkpoints(self) -> List[str]:
+        """ Paths of the complete checkpoints in ascending order. """
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("checkpoint_") and os.path.isfile(os.path.join(self.directory, name, "manifest.json"))
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def load(self, agent: rl.Agent, path: str = None, mmap_mode: str = "c", map_location = None, restore_random_state: bool = True) -> Dict[str, Any]:
+        """ Restore the agent from a checkpoint.
+
+        Args:
+            agent (rl.Agent): agent created with the same arguments as the saved one
+            path (str, optional): checkpoint path. if it's None, the latest checkpoint. Defaults to None.
+            mmap_mode (str, optional): `np.load()` mode of the arrays. "c" is copy-on-write, so training doesn't modify the files.
+                "r+" writes through to the files, None reads them into memory. Defaults to "c".
+            map_location (optional): `torch.load()` map location. Defaults to None.
+            restore_random_state (bool, optional): restore the saved random states. Defaults to True.
+
+        Returns:
+            Dict[str, Any]: manifest of the checkpoint
+        """
+
+        self.wait()
+        if path is None:
+            path = self.latest
+            if path is None:
+                raise FileNotFoundError(f"There's no checkpoint in {self.directory}.")
+        return load_checkpoint(agent, path, mmap_mode, map_location, restore_random_state)
+
+    def _write(self, arrays, objects, random_state, manifest) -> str:
+        step_name = f"checkpoint_{manifest['step']:010d}"
+        # a step saved again gets a new directory, the old one stays the latest until the new one is complete
+        stale_names = [name for name in os.listdir(self.directory) if name == step_name or name.startswith(step_name + ".")]
+        name = step_name if len(stale_names) == 0 else f"{step_name}.{time.time_ns()}"
+        path = os.path.join(self.directory, name)
+        temp_path = os.path.join(self.directory, f".{name}.tmp")
+        if os.path.exists(temp_path):
+            shutil.rmtree(temp_path)
+        os.makedirs(temp_path)
+
+        manifest["arrays"] = {}
+        for key, value in arrays.items():
+            file_name = key.replace("/", ".") + ".npy"
+            np.save(os.path.join(temp_path, file_name), value)
+            manifest["arrays"][key] = file_name
+        manifest["objects"] = _save_objects(temp_path, {"state": objects, "random_state": random_state})
+        _write_json(os.path.join(temp_path, "manifest.json"), manifest)
+
+        os.replace(temp_path, path)
+        _write_json(os.path.join(self.directory, "latest.json"), {"format_version": CHECKPOINT_FORMAT_VERSION, "checkpoint": name})
+        for stale_name in stale_names:
+            shutil.rmtree(os.path.join(self.directory, stale_name), ignore_errors=True)
+
+        if self.keep_last > 0:
+            for old_path in self.checkpoints()[:-self.keep_last]:
+                shutil.rmtree(old_path, ignore_errors=True)
+        return path
+
+def load_checkpoint(agent: rl.Agent, path: str, mmap_mode: str = "c", map_location = None, restore_random_state: bool = True) -> Dict[str, Any]:
+    """ Restore the agent from the checkpoint directory written by `Checkpointer` and returns its manifest. """
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] > CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"The checkpoint format version {manifest['format_version']} is newer than the supported version {CHECKPOINT_FORMAT_VERSION}.")
+
+    arrays = {key: np.load(os.path.join(path, file_name), mmap_mode=mmap_mode) for key, file_name in manifest["arrays"].items()}
+    objects = _load_objects(path, manifest["objects"], map_location)
+    agent.load_state_dict(_unflatten(arrays, objects["state"]))
+    if restore_random_state and objects["random_state"] is not None:
+        _set_random_state(objects["random_state"])
+    return manifest
+
+class CheckpointCallback(Callback):
+    """ Save a checkpoint every `interval` episodes. Call `checkpointer.wait()` before the process exits to finish the writes. """
+
+    def __init__(self, checkpointer: Checkpointer, interval: int) -> None:
+        self.checkpointer = checkpointer
+        self.interval = interval
+
+    def on_episode_end(self, trainer, episode: int, total_reward: float, length: int) -> None:
+        if (episode + 1) % self.interval == 0:
+            self.checkpointer.save(trainer.agent, episode + 1, {"total_steps": int(trainer.total_steps)})
+
+def _flatten(state_dict: dict, prefix: str = "") -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """ Split a nested state dict into arrays and the other values with `/` separated keys.
+    Only plain dicts with string keys are nested, so torch state dicts are kept as values. """
+    arrays = {}
+    objects = {}
+    for key, value in state_dict.items():
+        path = prefix + key
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            arrays[path] = value
+        elif type(value) is dict and len(value) > 0 and all(isinstance(k, str) and "/" not in k for k in value):
+            sub_arrays, sub_objects = _flatten(value, path + "/")
+            arrays.update(sub_arrays)
+            objects.update(sub_objects)
+        else:
+            objects[path] = value
+    return arrays, objects
+
+def _unflatten(arrays: Dict[str, Any], objects: Dict[str, Any]) -> dict:
+    state_dict = {}
+    for path, value in list(arrays.items()) + list(objects.items()):
+        *parents, key = path.split("/")
+        node = state_dict
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return state_dict
+
+def _save_objects(path: str, objects: Dict[str, Any]) -> Dict[str, str]:
+    # torch.save() handles the tensors of the state dicts, it's only used when torch is already imported
+    if "torch" in sys.modules:
+        sys.modules["torch"].save(objects, os.path.join(path, "objects.pt"))
+        return {"file": "objects.pt", "serializer": "torch"}
+    with open(os.path.join(path, "objects.pkl"), "wb") as f:
+        pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return {"file": "objects.pkl", "serializer": "pickle"}
+
+def _load_objects(path: str, objects_info: Dict[str, str], map_location) -> Dict[str, Any]:
+    file_path = os.path.join(path, objects_info["file"])
+    if objects_info["serializer"] == "torch":
+        import torch
+        try:
+            return torch.load(file_path, map_location=map_location, weights_only=False)
+        except TypeError:
+            # old torch doesn't have weights_only
+            return torch.load(file_path, map_location=map_location)
+    with open(file_path, "rb") as f:
+        return pickle.load(f)
+
+def _write_json(path: str, value: Dict[str, Any]):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(value, f, indent=2)
+    os.replace(temp_path, path)
+
+def _get_random_state() -> Dict[str, Any]:
+    random_state = {"numpy": np.random.get_state(), "random": random.getstate()}
+    if "torch" in sys.modules:
+        random_state["torch"] = sys.modules["torch"].get_rng_state()
+    return random_state
+
+def _set_random_state(random_state: Dict[str, Any]):
+    np.random.set_state(random_state["numpy"])
+    random.setstate(random_state["random"])
+    if "torch" in random_state:
+        import torch
+        torch.set_rng_state(random_state["torch"])
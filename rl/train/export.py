@@ -0,0 +1,62 @@
+from __future__ import annotations
+import copy
+import json
+import os
+import shutil
+import numpy as np
+import rl
+from rl.runtime import POLICY_FORMAT_VERSION
+
+def export_policy(agent: rl.Agent, path: str, example_input = None) -> str:
+    """ Export the greedy policy of a trained agent to a directory which `rl.runtime.load_policy()` loads for inference.
+
+    * `TabularQAgent` (e.g. `QLearning`, `DoubleQLearning`): the greedy action of every state as the smallest unsigned integer array, `actions.npy`
+    * `DeepSarsa` and `Reinforce`: the TorchScript network in eval mode, `module.pt`. The greedy action is the argmax of its output,
+      so the policy network of `Reinforce` must output the logits or probabilities of a categorical distribution.
+
+    Args:
+        agent (rl.Agent): trained agent
+        path (str): export directory, it's replaced if it exists
+        example_input (optional): input batch to trace the network with `torch.jit.trace()` when it can't be compiled by `torch.jit.script()`. Defaults to None.
+
+    Returns:
+        str: export directory
+    """
+
+    manifest = {
+        "format_version": POLICY_FORMAT_VERSION,
+        "agent": f"{type(agent).__module__}.{type(agent).__qualname__}"
+    }
+    temp_path = path.rstrip(os.sep) + ".tmp"
+    if os.path.exists(temp_path):
+        shutil.rmtree(temp_path)
+    os.makedirs(temp_path)
+
+    if isinstance(agent, rl.TabularQAgent):
+        actions = agent.greedy_actions()
+        np.save(os.path.join(temp_path, "actions.npy"), actions)
+        manifest.update(kind="tabular", file="actions.npy", obs_shape=list(agent.obs_shape), action_count=agent.action_count)
+    elif isinstance(agent, (rl.DeepSarsa, rl.Reinforce)):
+        net = agent.q_value_net if isinstance(agent, rl.DeepSarsa) else agent.policy_net
+        _script(net, example_input).save(os.path.join(temp_path, "module.pt"))
+        manifest.update(kind="torchscript", file="module.pt")
+    else:
+        shutil.rmtree(temp_path)
+        raise TypeError(f"{type(agent).__name__} can't be exported.")
+
+    with open(os.path.join(temp_path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(temp_path, path)
+    return path
+
+def _script(net, example_input):
+    import torch
+    # export a cpu copy in eval mode, the agent keeps training its network
+    net = copy.deepcopy(net).cpu().eval()
+    if example_input is None:
+        module = torch.jit.script(net)
+    else:
+        module = torch.jit.trace(net, torch.as_tensor(np.asarray(example_input), dtype=torch.float32))
+    return torch.jit.freeze(module)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import math
+import random
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+import numpy as np
+import rl
+from rl.train.trainer import Trainer
+
+class Trial(NamedTuple):
+    agent_cls: type
+    params: Dict[str, Any]
+    seed: int
+
+class SweepResult(NamedTuple):
+    trials: List[Trial]
+    config_indices: np.ndarray
+    curves: np.ndarray
+    episodes: np.ndarray
+
+    def mean_curves(self) -> np.ndarray:
+        """ Returns the learning curves `(config_count, max_episodes)` averaged over the seeds. Episodes not trained are NaN. """
+        config_count = self.config_indices.max() + 1
+        with warnings.catch_warnings():
+            # all-NaN columns of eliminated configurations
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.stack([np.nanmean(self.curves[self.config_indices == c], axis=0) for c in range(config_count)])
+
+def tabular_agent_fn(env, agent_cls: type, params: Dict[str, Any]) -> rl.Agent:
+    """ Create a `TabularQAgent` subclass for a grid environment. The goal state is the terminal state. """
+    terminal_states = [tuple(env.goal_state)] if hasattr(env, "goal_state") else None
+    return agent_cls(env.obs_shape, env.action_count, terminal_states, **params)
+
+class SweepRunner:
+    """
+    Runs (agent class, hyperparameters, seed) trials over a process pool.
+
+    Every trial has an independent random stream `np.random.SeedSequence(root_seed, spawn_key=(config_index, seed_index))`,
+    which seeds the global random states of the worker process before the trial runs, so the results don't depend on the scheduling.
+    `env_fn` and `agent_fn` are sent to the worker processes, so they must be picklable (e.g. module-level functions or classes).
+    """
+
+    def __init__(self,
+                 env_fn: Callable[[], Any],
+                 configs: List[Tuple[type, Dict[str, Any]]],
+                 num_seeds: int = 1,
+                 root_seed: int = 0,
+                 max_workers: int = None,
+                 agent_fn: Callable[[Any, type, Dict[str, Any]], rl.Agent] = tabular_agent_fn,
+                 max_episode_steps: int = None) -> None:
+        """
+        Args:
+            env_fn (Callable[[], Any]): creates an environment (e.g. `rl.environment.CliffWalking`)
+            configs (List[Tuple[type, Dict[str, Any]]]): (agent class, hyperparameters) pairs
+            num_seeds (int, optional): number of seeds of each configuration. Defaults to 1.
+            root_seed (int, optional): root of the seed streams. Defaults to 0.
+            max_workers (int, optional): number of worker processes. if it's None, the number of cores. Defaults to None.
+            agent_fn (Callable[[Any, type, Dict[str, Any]], rl.Agent], optional): creates an agent from the environment, the class and the hyperparameters. Defaults to tabular_agent_fn.
+            max_episode_steps (int, optional): an episode is cut after this number of steps. Defaults to None.
+        """
+
+        self.env_fn = env_fn
+        self.configs = list(configs)
+        self.num_seeds = num_seeds
+        self.root_seed = root_seed
+        self.max_workers = max_workers
+        self.agent_fn = agent_fn
+        self.max_episode_steps = max_episode_steps
+
+    @property
+    def trials(self) -> List[Trial]:
+        return [Trial(cls, params, seed) for cls, params in self.configs for seed in range(self.num_seeds)]
+
+    def seed_sequence(self, config_index: int, seed_index: int) -> np.random.SeedSequence:
+        """ Returns the random stream of a trial. """
+        return np.random.SeedSequence(self.root_seed, spawn_key=(config_index, seed_index))
+
+    def run(self, episodes: int) -> SweepResult:
+        """ Train every trial for the number of episodes. """
+        trials = self.trials
+        with ProcessPoolExecutor(self.max_workers) as executor:
+            curves, _ = self._run_trials(executor, trials, [episodes] * len(trials), [None] * len(trials), range(len(trials)))
+        return self._result(trials, curves)
+
+    def successive_halving(self, min_episodes: int, max_episodes: int, eta: int = 3, score_window: int = 10) -> SweepResult:
+        """ Successive halving over the configurations.
+        All configurations are trained for `min_episodes`, then only the best `1 / eta` of them continue until their total episodes are multiplied by `eta`,
+        and so on until one configuration is left or `max_episodes` is reached. Survivors resume from their agents and the numpy, random and torch random states.
+
+        Args:
+            min_episodes (int): episodes of the first rung
+            max_episodes (int): maximum total episodes of a trial
+            eta (int, optional): reduction factor. Defaults to 3.
+            score_window (int, optional): a configuration is scored by the mean reward of its last episodes averaged over the seeds. Defaults to 10.
+
+        Returns:
+            SweepResult: sweep result, the curves of eliminated trials are NaN after the elimination
+        """
+
+        assert eta >= 2
+        trials = self.trials
+        curves = [np.empty(0) for _ in trials]
+        states = [None] * len(trials)
+        alive_configs = list(range(len(self.configs)))
+        budget = min_episodes
+        trained = 0
+
+        with ProcessPoolExecutor(self.max_workers) as executor:
+            while True:
+                budget = min(budget, max_episodes)
+                alive = [i for i in range(len(trials)) if i // self.num_seeds in alive_configs]
+                new_curves, new_states = self._run_trials(
+                    executor,
+                    [trials[i] for i in alive],
+                    [budget - trained] * len(alive),
+                    [states[i] for i in alive],
+                    alive
+                )
+                for i, curve, state in zip(alive, new_curves, new_states):
+                    curves[i] = np.concatenate([curves[i], curve])
+                    states[i] = state
+                trained = budget
+
+                if len(alive_configs) <= 1 or budget >= max_episodes:
+                    break
+                # keep the best configurations
+                scores = [np.mean([curves[c * self.num_seeds + s][-score_window:].mean() for s in range(self.num_seeds)]) for c in alive_configs]
+                keep_count = max(1, math.ceil(len(alive_configs) / eta))
+                order = np.argsort(scores)[::-1]
+                alive_configs = sorted(alive_configs[i] for i in order[:keep_count])
+                budget *= eta
+
+        return self._result(trials, curves)
+
+    def _run_trials(self, executor: ProcessPoolExecutor, trials: List[Trial], episodes: List[int], states: List[Any], trial_indices: List[int]):
+        futures = [
+            executor.submit(
+                _run_trial,
+                self.env_fn,
+                self.agent_fn,
+                trial,
+                self.seed_sequence(trial_index // self.num_seeds, trial.seed),
+                trial_episodes,
+                self.max_episode_steps,
+                state
+            )
+            for trial, trial_episodes, state, trial_index in zip(trials, episodes, states, trial_indices)
+        ]
+        results = [future.result() for future in futures]
+        return [r[0] for r in results], [r[1] for r in results]
+
+    def _result(self, trials: List[Trial], curves: List[np.ndarray]) -> SweepResult:
+        episodes = np.array([len(c) for c in curves])
+        padded = np.full((len(trials), episodes.max()), np.nan)
+        for i, curve in enumerate(curves):
+            padded[i, :len(curve)] = curve
+        config_indices = np.arange(len(trials)) // self.num_seeds
+        return SweepResult(trials, config_indices, padded, episodes)
+
+def _seed_worker(seed_sequence: np.random.SeedSequence):
+    np.random.seed(seed_sequence.generate_state(4))
+    random.seed(int(seed_sequence.generate_state(1, dtype=np.uint64)[0]))
+    # only seed torch when it's already used, not to import it for tabular trials. agent_fn of deep trials can call rl.util.seed_torch()
+    if "torch" in sys.modules:
+        rl.util.seed_torch(int(seed_sequence.generate_state(1, dtype=np.uint64)[0] >> np.uint64(1)))
+
+def _get_random_states() -> Dict[str, Any]:
+    # torch is only used by the trials which have already imported it
+    torch = sys.modules.get("torch")
+    return {
+        "numpy": np.random.get_state(),
+        "random": random.getstate(),
+        "torch": None if torch is None else torch.get_rng_state()
+    }
+
+def _set_random_states(random_states: Dict[str, Any]):
+    np.random.set_state(random_states["numpy"])
+    random.setstate(random_states["random"])
+    if random_states["torch"] is not None:
+        import torch
+        torch.set_rng_state(random_states["torch"])
+
+def _run_trial(env_fn, agent_fn, trial: Trial, seed_sequence, episodes: int, max_episode_steps: int, state):
+    """ Train a trial in a worker process. `state` is `(agent, random states)` to resume or None to start. """
+    env = env_fn()
+    if state is None:
+        _seed_worker(seed_sequence)
+        agent = agent_fn(env, trial.agent_cls, trial.params)
+    else:
+        agent, random_states = state
+        _set_random_states(random_states)
+    result = Trainer(env, agent, max_episode_steps).train(max_episodes=episodes)
+    return result.episode_rewards, (agent, _get_random_states())
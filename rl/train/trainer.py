@@ -0,0 +1,356 @@
+from __future__ import annotations
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Tuple
+import numpy as np
+import rl
+from rl.environment import reset_env, make_step_function
+from rl.util.profiler import active_profiler, profiled, profile_phase
+
+class Callback:
+    """ Base class of training callbacks. Override only the methods you need, the trainer skips the others. """
+
+    def on_step(self, trainer: Trainer, transition: rl.Transition) -> None:
+        """ Called after every `update()`, or after every environment step when the updates are pipelined. For vectorized environments, the transition fields are batched. """
+        pass
+
+    def on_episode_end(self, trainer: Trainer, episode: int, total_reward: float, length: int) -> None:
+        """ Called after every finished episode. """
+        pass
+
+    def on_evaluation(self, trainer: Trainer, episode: int, rewards: np.ndarray) -> None:
+        """ Called after every periodic evaluation. """
+        pass
+
+class MetricsCallback(Callback):
+    """ Keeps streaming statistics of the episode rewards and optionally appends every episode to a `rl.util.MetricLogger`. """
+
+    def __init__(self, window: int = 100, logger: rl.util.MetricLogger = None) -> None:
+        self.logger = logger
+        self.reward_mean = rl.util.RollingMean(window)
+        self.reward_stats = rl.util.RunningStats()
+        self.length_mean = rl.util.RollingMean(window)
+
+    def on_episode_end(self, trainer: Trainer, episode: int, total_reward: float, length: int) -> None:
+        self.reward_mean.update(total_reward)
+        self.reward_stats.update(total_reward)
+        self.length_mean.update(length)
+        if self.logger is not None:
+            self.logger.log(
+                episode=episode,
+                total_steps=trainer.total_steps,
+                reward=total_reward,
+                length=length,
+                reward_mean=self.reward_mean.value
+            )
+
+class TrainResult(NamedTuple):
+    episode_rewards: np.ndarray
+    episode_lengths: np.ndarray
+    total_steps: int
+    total_episodes: int
+    elapsed_time: float
+    evaluations: List[Tuple[int, np.ndarray]]
+
+    @property
+    def steps_per_sec(self) -> float:
+        return self.total_steps / self.elapsed_time if self.elapsed_time > 0 else 0.0
+
+    @property
+    def episodes_per_sec(self) -> float:
+        return self.total_episodes / self.elapsed_time if self.elapsed_time > 0 else 0.0
+
+class Trainer:
+    """
+    Drives an `rl.Agent` against an environment with the usual loop:
+    `start_episode()`, then `get_action()`, `env.step()`, `update()` until the episode ends, then `end_episode()`.
+
+    The environment has `reset() -> state` and `step(action) -> (next_state, reward, terminated)`.
+    The gym API `step(action) -> (next_state, reward, terminated, truncated, info)` is also supported.
+    If the environment has `num_envs` (e.g. `rl.environment.VectorCliffWalking`), all the instances are stepped at once
+    and the agent must have `update_batch()`. `get_actions()` is used when the agent has it.
+    A vectorized environment has `reset() -> states` and `step(actions) -> rl.environment.VectorStep`,
+    and it resets the terminated or truncated instances itself, so the next actions are chosen for `VectorStep.states`.
+
+    With `pipeline_staleness > 0`, `env.step()` runs in a worker thread and the updates of the previous steps run while the environment computes the next one,
+    which hides the latency of slow or remote environments (e.g. Unity ML-Agents). The updates are applied in order,
+    but an action may be chosen before the updates of the last `pipeline_staleness` transitions. All the updates are applied at the end of an episode.
+    """
+
+    def __init__(self,
+                 env,
+                 agent: rl.Agent,
+                 max_episode_steps: int = None,
+                 callbacks: List[Callback] = None,
+                 eval_env = None,
+                 eval_interval: int = 0,
+                 eval_episodes: int = 10,
+                 eval_epsilon: float = None,
+                 pipeline_staleness: int = 0) -> None:
+        """
+        Args:
+            env: training environment
+            agent (rl.Agent): agent
+            max_episode_steps (int, optional): an episode is cut after this number of steps. It's not supported for vectorized environments. Defaults to None.
+            callbacks (List[Callback], optional): training callbacks. Defaults to None.
+            eval_env (optional): evaluation environment. if it's None, `env` is used. Defaults to None.
+            eval_interval (int, optional): evaluate every this number of episodes. if it's 0, no evaluation. Defaults to 0.
+            eval_episodes (int, optional): number of episodes of an evaluation. Defaults to 10.
+            eval_epsilon (float, optional): if it's not None, `agent.epsilon` is temporarily set to it while evaluating. Defaults to None.
+            pipeline_staleness (int, optional): maximum number of transitions whose updates are still pending when an action is chosen.
+                if it's 0, the environment steps and the updates run one after the other. Defaults to 0.
+        """
+
+        self.env = env
+        self.agent = agent
+        self.max_episode_steps = max_episode_steps
+        self.callbacks = [] if callbacks is None else list(callbacks)
+        self.eval_env = eval_env
+        self.eval_interval = eval_interval
+        self.eval_episodes = eval_episodes
+        self.eval_epsilon = eval_epsilon
+        self.pipeline_staleness = pipeline_staleness
+        self.total_steps = 0
+        self.total_episodes = 0
+
+    @property
+    def is_vectorized(self) -> bool:
+        return hasattr(self.env, "num_envs")
+
+    def train(self, max_steps: int = None, max_episodes: int = None) -> TrainResult:
+        """ Train the agent until one of the budgets runs out.
+
+        Args:
+            max_steps (int, optional): environment step budget. For vectorized environments, every instance step counts. Defaults to None.
+            max_episodes (int, optional): episode budget. Defaults to None.
+
+        An episode cut by the `max_steps` budget isn't finished, so it's neither recorded nor passed to the callbacks and the evaluation.
+
+        Returns:
+            TrainResult: training result
+        """
+
+        assert max_steps is not None or max_episodes is not None, "You need to set at least one budget."
+        self.total_steps = 0
+        self.total_episodes = 0
+        max_steps = np.inf if max_steps is None else max_steps
+        max_episodes = np.inf if max_episodes is None else max_episodes
+
+        start_time = time.perf_counter()
+        self._pipeline = _Pipeline(self.pipeline_staleness) if self.pipeline_staleness > 0 else None
+        try:
+            if self.is_vectorized:
+                episode_rewards, episode_lengths, evaluations = self._train_vector(max_steps, max_episodes)
+            else:
+                episode_rewards, episode_lengths, evaluations = self._train(max_steps, max_episodes)
+        finally:
+            if self._pipeline is not None:
+                self._pipeline.close()
+        elapsed_time = time.perf_counter() - start_time
+
+        return TrainResult(
+            np.array(episode_rewards),
+            np.array(episode_lengths),
+            self.total_steps,
+            self.total_episodes,
+            elapsed_time,
+            evaluations
+        )
+
+    def evaluate(self, episodes: int = None) -> np.ndarray:
+        """ Run episodes without updating the agent and return their total rewards. """
+        if episodes is None:
+            episodes = self.eval_episodes
+        env = self.env if self.eval_env is None else self.eval_env
+        if hasattr(env, "num_envs"):
+            raise ValueError("Evaluation needs a non-vectorized environment, set eval_env.")
+        agent = self.agent
+        step = make_step_function(env)
+        max_episode_steps = np.inf if self.max_episode_steps is None else self.max_episode_steps
+
+        prev_epsilon = None
+        if self.eval_epsilon is not None and hasattr(agent, "epsilon"):
+            prev_epsilon = agent.epsilon
+            agent.epsilon = self.eval_epsilon
+
+        rewards = np.zeros(episodes)
+        try:
+            for episode in range(episodes):
+                state = reset_env(env)
+                t = 0
+                done = False
+                while not done and t < max_episode_steps:
+                    state, reward, _, done = step(agent.get_action(state))
+                    rewards[episode] += reward
+                    t += 1
+        finally:
+            if prev_epsilon is not None:
+                agent.epsilon = prev_epsilon
+
+        return rewards
+
+    def _train(self, max_steps, max_episodes):
+        env = self.env
+        agent = self.agent
+        step = make_step_function(env)
+        pipeline = self._pipeline
+        # the pipelined steps run in another thread, so only the wait for them is profiled
+        if pipeline is None and active_profiler() is not None:
+            step = profiled(step, "env.step")
+        step_callbacks = self._overridden_callbacks("on_step")
+        episode_callbacks = self._overridden_callbacks("on_episode_end")
+        max_episode_steps = np.inf if self.max_episode_steps is None else self.max_episode_steps
+        Transition = rl.Transition
+
+        episode_rewards = []
+        episode_lengths = []
+        evaluations = []
+        total_steps = 0
+
+        while total_steps < max_steps and self.total_episodes < max_episodes:
+            agent.start_episode()
+            state = reset_env(env)
+            total_reward = 0.0
+            t = 0
+            done = False
+
+            # start an episode
+            while not done and t < max_episode_steps and total_steps < max_steps:
+                action = agent.get_action(state)
+                # take action a; observe r, s'
+                if pipeline is None:
+                    next_state, reward, terminated, done = step(action)
+                    transition = Transition(state, action, next_state, reward, terminated)
+                    agent.update(transition)
+                else:
+                    # the pending updates run while the environment steps
+                    next_state, reward, terminated, done = pipeline.step(step, action)
+                    transition = Transition(state, action, next_state, reward, terminated)
+                    pipeline.add(agent.update, transition)
+                for callback in step_callbacks:
+                    callback.on_step(self, transition)
+
+                state = next_state
+                total_reward += reward
+                t += 1
+                total_steps += 1
+
+            self.total_steps = total_steps
+            if pipeline is not None:
+                pipeline.flush()
+            agent.end_episode()
+            # the budget ran out in the middle of the episode
+            if not done and t < max_episode_steps:
+                break
+            episode_rewards.append(total_reward)
+            episode_lengths.append(t)
+            self._end_episode(total_reward, t, episode_callbacks, evaluations)
+
+        return episode_rewards, episode_lengths, evaluations
+
+    def _train_vector(self, max_steps, max_episodes):
+        env = self.env
+        agent = self.agent
+        if not hasattr(agent, "update_batch"):
+            raise TypeError(f"{type(agent).__name__} doesn't have update_batch() for vectorized environments.")
+        get_actions = getattr(agent, "get_actions", None)
+        if get_actions is None:
+            get_actions = lambda states: np.array([agent.get_action(s) for s in states])
+        step_callbacks = self._overridden_callbacks("on_step")
+        episode_callbacks = self._overridden_callbacks("on_episode_end")
+
+        env_step = env.step
+        pipeline = self._pipeline
+        if pipeline is None and active_profiler() is not None:
+            env_step = profiled(env_step, "env.step")
+        num_envs = env.num_envs
+        episode_rewards = []
+        episode_lengths = []
+        evaluations = []
+        running_rewards = np.zeros(num_envs)
+        running_lengths = np.zeros(num_envs, dtype=np.int64)
+
+        agent.start_episode()
+        states = env.reset()
+        while self.total_steps < max_steps and self.total_episodes < max_episodes:
+            actions = get_actions(states)
+            if pipeline is None:
+                next_states, rewards, terminated, truncated, next_step_states = env_step(actions)
+                agent.update_batch(states, actions, rewards, next_states, terminated)
+            else:
+                next_states, rewards, terminated, truncated, next_step_states = pipeline.step(env_step, actions)
+                pipeline.add(agent.update_batch, states, actions, rewards, next_states, terminated)
+            if step_callbacks:
+                transition = rl.Transition(states, actions, next_states, rewards, terminated)
+                for callback in step_callbacks:
+                    callback.on_step(self, transition)
+
+            running_rewards += rewards
+            running_lengths += 1
+            self.total_steps += num_envs
+            # finished instances are already reset by the environment
+            states = next_step_states
+
+            for i in np.flatnonzero(terminated | truncated):
+                episode_rewards.append(running_rewards[i])
+                episode_lengths.append(running_lengths[i])
+                running_rewards[i] = 0.0
+                running_lengths[i] = 0
+                self._end_episode(episode_rewards[-1], episode_lengths[-1], episode_callbacks, evaluations)
+                if self.total_episodes >= max_episodes:
+                    break
+
+        if pipeline is not None:
+            pipeline.flush()
+        agent.end_episode()
+        return episode_rewards, episode_lengths, evaluations
+
+    def _end_episode(self, total_reward, length, episode_callbacks, evaluations):
+        episode = self.total_episodes
+        self.total_episodes += 1
+        for callback in episode_callbacks:
+            callback.on_episode_end(self, episode, total_reward, length)
+
+        if self.eval_interval > 0 and self.total_episodes % self.eval_interval == 0:
+            rewards = self.evaluate()
+            evaluations.append((self.total_episodes, rewards))
+            for callback in self.callbacks:
+                callback.on_evaluation(self, self.total_episodes, rewards)
+
+    def _overridden_callbacks(self, name: str) -> List[Callback]:
+        # skip the callbacks which don't override the method to keep the inner loop cheap
+        return [c for c in self.callbacks if getattr(type(c), name, None) is not getattr(Callback, name)]
+
+class _Pipeline:
+    """ Runs environment steps in a worker thread and the pending updates of the previous steps while a step is running. """
+
+    def __init__(self, max_staleness: int) -> None:
+        assert max_staleness > 0
+        self.max_staleness = max_staleness
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="env_step")
+        self._pending = deque() # (update, args) in order
+
+    def step(self, step: Callable, action):
+        """ Start the step, run the pending updates until it finishes and returns its result.
+        At most `max_staleness - 1` updates are left pending, so the next action misses at most `max_staleness` of them. """
+        future = self._executor.submit(step, action)
+        pending = self._pending
+        while pending and (len(pending) >= self.max_staleness or not future.done()):
+            update, args = pending.popleft()
+            update(*args)
+        with profile_phase("env.wait"):
+            return future.result()
+
+    def add(self, update: Callable, *args) -> None:
+        self._pending.append((update, args))
+
+    def flush(self) -> None:
+        """ Run all the pending updates. """
+        pending = self._pending
+        while pending:
+            update, args = pending.popleft()
+            update(*args)
+
+    def close(self) -> None:
+        self._executor.shutdown()
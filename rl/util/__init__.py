@@ -1,23 +1,37 @@
 from .decay import *
+from .profiler import *
+from .metrics import *
 
-import torch
 import random
-import torch.backends.cudnn as cudnn
+import sys
 import numpy as np
 import os
 import datetime
 
 def seed(value):
+    """ Seed numpy, random and torch. torch is only seeded when it's already imported, so seeding doesn't import it for tabular agents.
+    Call `seed_torch()` to seed torch before it's imported (e.g. before building networks). """
+    if "torch" in sys.modules:
+        seed_torch(value)
+    np.random.seed(value)
+    random.seed(value)
+
+def seed_torch(value) -> bool:
+    """ Import and seed torch and make cuDNN deterministic. Returns False if torch isn't installed. """
+    try:
+        import torch
+    except ImportError:
+        return False
     torch.manual_seed(value)
     torch.cuda.manual_seed(value)
     torch.cuda.manual_seed_all(value)
-    np.random.seed(value)
-    cudnn.benchmark = False
-    cudnn.deterministic = True
-    random.seed(value)
+    torch.backends.cudnn.benchmark = False
+    torch.backends.cudnn.deterministic = True
+    return True
 
 def average_last_data(data_list, data_count: int = -1) -> list:
-    """ Returns a list containing averaged values of last n data from the data list.
+    """ Returns a list containing averaged values of last n data from the data list. 
+    It's `rolling_mean()` as a list, use `RollingMean` to average while training without keeping the data.
 
     Args:
         data_list (ArrayLike): data list
@@ -27,17 +41,7 @@ def average_last_data(data_list, data_count: int = -1) -> list:
         list: a list containing averaged values
     """
     
-    data_list = np.array(data_list)
-    averages = []
-    if data_count < 0:
-        data_count = len(data_list)
-        
-    for i in range(len(data_list)):
-        s = max(i - data_count + 1, 0)
-        e = i + 1
-        averages.append(np.mean(data_list[s:e]))
-        
-    return averages
+    return list(rolling_mean(data_list, data_count))
 
 def add_datetime_suffix(basename: str, delimiter: str = '_') -> str:
     """ Add a datetime suffix wtih delimiter to the basename. (e.g. basename_220622_140322) """
@@ -0,0 +1,270 @@
+from __future__ import annotations
+import json
+import math
+import os
+from collections import deque
+from typing import Dict, List
+import numpy as np
+
+class RollingMean:
+    """ Mean of the last `window` values with a running sum over a ring buffer, O(1) per update. """
+
+    def __init__(self, window: int) -> None:
+        assert window > 0
+        self.window = window
+        self._buffer = np.zeros(window)
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, value: float) -> float:
+        """ Add a value and returns the mean. """
+        i = self._index
+        if self._count == self.window:
+            self._sum -= self._buffer[i]
+        else:
+            self._count += 1
+        self._buffer[i] = value
+        self._sum += value
+        self._index = (i + 1) % self.window
+        # recompute the sum once per window so that rounding errors don't accumulate, O(1) amortized
+        if self._index == 0:
+            self._sum = float(self._buffer.sum())
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self._sum / self._count if self._count > 0 else math.nan
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+class RunningStats:
+    """ Online count, mean, variance (Welford's algorithm), min and max of all the values, O(1) per update. """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value: float) -> float:
+        """ Add a value and returns the mean. """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        return self.mean
+
+    @property
+    def variance(self) -> float:
+        """ Sample variance. """
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+class EMA:
+    """ Exponential moving average `v = (1 - alpha) * v + alpha * x`, O(1) per update.
+    The value is bias-corrected like Adam, so the first values aren't pulled toward 0. """
+
+    def __init__(self, alpha: float = None, span: int = None) -> None:
+        """
+        Args:
+            alpha (float, optional): smoothing factor in (0, 1]. Defaults to None.
+            span (int, optional): if alpha is None, `alpha = 2 / (span + 1)`. Defaults to None.
+        """
+        assert (alpha is None) != (span is None), "You need to set either alpha or span."
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1)
+        self._value = 0.0
+        self._decay = 1.0
+
+    def update(self, value: float) -> float:
+        """ Add a value and returns the average. """
+        self._value += self.alpha * (value - self._value)
+        self._decay *= 1.0 - self.alpha
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self._value / (1.0 - self._decay) if self._decay < 1.0 else math.nan
+
+class RollingMinMax:
+    """ Min and max of the last `window` values with monotonic queues, O(1) amortized per update. """
+
+    def __init__(self, window: int) -> None:
+        assert window > 0
+        self.window = window
+        self._t = 0
+        self._min_queue = deque() # (t, value) with increasing values
+        self._max_queue = deque() # (t, value) with decreasing values
+
+    def update(self, value: float):
+        """ Add a value and returns (min, max). """
+        t = self._t
+        self._t += 1
+        while self._min_queue and self._min_queue[-1][1] >= value:
+            self._min_queue.pop()
+        self._min_queue.append((t, value))
+        while self._max_queue and self._max_queue[-1][1] <= value:
+            self._max_queue.pop()
+        self._max_queue.append((t, value))
+        # drop the values out of the window
+        if self._min_queue[0][0] <= t - self.window:
+            self._min_queue.popleft()
+        if self._max_queue[0][0] <= t - self.window:
+            self._max_queue.popleft()
+        return self.min, self.max
+
+    @property
+    def min(self) -> float:
+        return self._min_queue[0][1] if self._min_queue else math.nan
+
+    @property
+    def max(self) -> float:
+        return self._max_queue[0][1] if self._max_queue else math.nan
+
+def rolling_mean(data, window: int = -1) -> np.ndarray:
+    """ Returns the means of the last `window` values at every index with one cumulative sum, O(n).
+
+    Args:
+        data (ArrayLike): data
+        window (int, optional): window size. if it's a negative value, the cumulative mean. Defaults to -1.
+
+    Returns:
+        np.ndarray: rolling means
+    """
+
+    data = np.asarray(data, dtype=np.float64)
+    n = len(data)
+    if window < 0 or window > n:
+        window = max(n, 1)
+    cumsum = np.concatenate(([0.0], np.cumsum(data)))
+    ends = np.arange(1, n + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumsum[ends] - cumsum[starts]) / (ends - starts)
+
+class MetricLogger:
+    """
+    Bounded-memory logger which appends rows of metrics to a directory in columnar form.
+    The rows are buffered in chunks of `chunk_size` and every full chunk is appended to one raw file per column,
+    so the memory doesn't grow with the number of rows. `load_metrics()` reads the columns back as memory-mapped arrays.
+
+    Example:
+        with MetricLogger("logs/run") as logger:
+            logger.log(episode=i, reward=total_reward)
+        metrics = load_metrics("logs/run")
+        plt.plot(rolling_mean(metrics["reward"], 100))
+    """
+
+    def __init__(self, directory: str, columns: List[str] = None, chunk_size: int = 4096, dtype = np.float64) -> None:
+        """
+        Args:
+            directory (str): log directory. The existing log of the same columns is appended.
+            columns (List[str], optional): column names. if it's None, the names of the first `log()`. Defaults to None.
+            chunk_size (int, optional): rows buffered in memory before they're written. Defaults to 4096.
+            dtype (optional): dtype of all the columns. Defaults to np.float64.
+        """
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.dtype = np.dtype(dtype)
+        self.columns: List[str] = None
+        self._chunk: np.ndarray = None
+        self._chunk_rows = 0
+        self._rows = 0
+        os.makedirs(directory, exist_ok=True)
+
+        meta = _read_meta(directory)
+        if meta is not None:
+            if columns is not None and list(columns) != meta["columns"]:
+                raise ValueError(f"The columns {columns} are different from the columns {meta['columns']} of the existing log.")
+            if np.dtype(meta["dtype"]) != self.dtype:
+                raise ValueError(f"The dtype {self.dtype} is different from the dtype {meta['dtype']} of the existing log.")
+            self._set_columns(meta["columns"])
+            self._rows = meta["rows"]
+            # drop the rows written after the last meta update (e.g. a crash while flushing)
+            for name in self.columns:
+                path = os.path.join(directory, f"{name}.bin")
+                if os.path.getsize(path) > self._rows * self.dtype.itemsize:
+                    os.truncate(path, self._rows * self.dtype.itemsize)
+        elif columns is not None:
+            self._set_columns(list(columns))
+
+    @property
+    def rows(self) -> int:
+        """ Number of logged rows including the buffered ones. """
+        return self._rows + self._chunk_rows
+
+    def log(self, **values) -> None:
+        """ Append a row. The missing columns are NaN, unknown columns raise KeyError. """
+        if self.columns is None:
+            self._set_columns(list(values.keys()))
+        row = self._chunk[self._chunk_rows]
+        row.fill(np.nan)
+        for name, value in values.items():
+            row[self._column_indices[name]] = value
+        self._chunk_rows += 1
+        if self._chunk_rows == self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Append the buffered rows to the column files. """
+        if self._chunk_rows == 0:
+            return
+        # the first chunk overwrites the files left without meta
+        mode = "ab" if self._rows > 0 else "wb"
+        for i, name in enumerate(self.columns):
+            with open(os.path.join(self.directory, f"{name}.bin"), mode) as f:
+                f.write(np.ascontiguousarray(self._chunk[:self._chunk_rows, i]).tobytes())
+        self._rows += self._chunk_rows
+        self._chunk_rows = 0
+        _write_meta(self.directory, {"columns": self.columns, "dtype": self.dtype.str, "rows": self._rows})
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> MetricLogger:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _set_columns(self, columns: List[str]):
+        self.columns = columns
+        self._column_indices = {name: i for i, name in enumerate(columns)}
+        self._chunk = np.empty((self.chunk_size, len(columns)), dtype=self.dtype)
+
+def load_metrics(directory: str) -> Dict[str, np.ndarray]:
+    """ Returns the flushed columns of a `MetricLogger` directory as read-only memory-mapped arrays. """
+    meta = _read_meta(directory)
+    if meta is None:
+        raise FileNotFoundError(f"There's no metric log in {directory}.")
+    dtype = np.dtype(meta["dtype"])
+    rows = meta["rows"]
+    metrics = {}
+    for name in meta["columns"]:
+        path = os.path.join(directory, f"{name}.bin")
+        # np.memmap can't map an empty file
+        metrics[name] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,)) if rows > 0 else np.empty(0, dtype=dtype)
+    return metrics
+
+def _read_meta(directory: str):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _write_meta(directory: str, meta: dict):
+    path = os.path.join(directory, "meta.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+import time
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+# the active profiler, None when profiling is disabled
+_active_profiler: Profiler = None
+
+class PhaseStats:
+    """ Timings of a phase. Durations are in nanoseconds and the histogram bucket `i` counts the durations in [2^(i-1), 2^i). """
+
+    __slots__ = ("calls", "total_ns", "min_ns", "max_ns", "histogram")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.histogram = [0] * 64
+
+    def record(self, duration_ns: int):
+        self.calls += 1
+        self.total_ns += duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        self.histogram[min(duration_ns.bit_length(), 63)] += 1
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.calls if self.calls > 0 else 0.0
+
+    def percentile_ns(self, q: float) -> float:
+        """ Approximate percentile `q` in [0, 100], the upper bound of its histogram bucket. """
+        if self.calls == 0:
+            return 0.0
+        cumulative = np.cumsum(self.histogram)
+        bucket = int(np.searchsorted(cumulative, q / 100.0 * self.calls))
+        return float(min(2 ** bucket, self.max_ns))
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack.append(self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter_ns() - self.start
+        profiler = self.profiler
+        path = tuple(profiler._stack)
+        profiler._stack.pop()
+        stats = profiler.phases.get(path)
+        if stats is None:
+            stats = profiler.phases[path] = PhaseStats()
+        stats.record(duration)
+        return False
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+class Profiler:
+    """
+    Records the durations of nested phases and event counters while it's enabled.
+
+    Enable it with `with Profiler() as profiler:` or `enable()`/`disable()`, or `agent.profile()` which also times the agent methods.
+    The instrumented code calls `profile_phase(name)` and `profile_count(name)`, which are a global lookup and a no-op when no profiler is enabled.
+    A phase inside another phase is recorded under its call path, e.g. `("update", "backward")`.
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[Tuple[str, ...], PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.elapsed_ns = 0
+        self._stack: List[str] = []
+        self._start_ns = None
+        self._prev_profiler = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._start_ns is not None
+
+    @property
+    def elapsed_time(self) -> float:
+        """ Seconds while the profiler was enabled. """
+        running_ns = time.perf_counter_ns() - self._start_ns if self.enabled else 0
+        return (self.elapsed_ns + running_ns) / 1e9
+
+    def enable(self) -> Profiler:
+        global _active_profiler
+        if not self.enabled:
+            self._prev_profiler = _active_profiler
+            _active_profiler = self
+            self._start_ns = time.perf_counter_ns()
+        return self
+
+    def disable(self) -> None:
+        global _active_profiler
+        if self.enabled:
+            self.elapsed_ns += time.perf_counter_ns() - self._start_ns
+            self._start_ns = None
+            if _active_profiler is self:
+                _active_profiler = self._prev_profiler
+            else:
+                # disabled out of order, unlink it from the profilers enabled after it
+                profiler = _active_profiler
+                while profiler is not None and profiler._prev_profiler is not self:
+                    profiler = profiler._prev_profiler
+                if profiler is not None:
+                    profiler._prev_profiler = self._prev_profiler
+            self._prev_profiler = None
+
+    def __enter__(self) -> Profiler:
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+        return False
+
+    def reset(self) -> None:
+        self.phases.clear()
+        self.counters.clear()
+        self.elapsed_ns = 0
+        if self.enabled:
+            self._start_ns = time.perf_counter_ns()
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def phase_totals(self) -> Dict[str, PhaseStats]:
+        """ Stats of each phase name merged over its call paths. """
+        totals: Dict[str, PhaseStats] = {}
+        for path, stats in self.phases.items():
+            total = totals.setdefault(path[-1], PhaseStats())
+            total.calls += stats.calls
+            total.total_ns += stats.total_ns
+            total.min_ns = stats.min_ns if total.min_ns is None else min(total.min_ns, stats.min_ns)
+            total.max_ns = max(total.max_ns, stats.max_ns)
+            total.histogram = [a + b for a, b in zip(total.histogram, stats.histogram)]
+        return totals
+
+    def rates(self) -> Dict[str, float]:
+        """ Counters per second while the profiler was enabled, e.g. `transitions` and `updates`. """
+        elapsed_time = self.elapsed_time
+        return {name: value / elapsed_time if elapsed_time > 0 else 0.0 for name, value in self.counters.items()}
+
+    def folded_stacks(self) -> List[str]:
+        """ Returns `a;b;c <microseconds>` lines of the self time of every call path, which flame graph tools (e.g. flamegraph.pl, speedscope) read. """
+        lines = []
+        for path, stats in sorted(self.phases.items()):
+            children_ns = sum(s.total_ns for p, s in self.phases.items() if len(p) == len(path) + 1 and p[:-1] == path)
+            self_us = max(stats.total_ns - children_ns, 0) // 1000
+            lines.append(f"{';'.join(path)} {self_us}")
+        return lines
+
+    def export_folded(self, path: str) -> None:
+        """ Write `folded_stacks()` to the file. """
+        with open(path, "w") as f:
+            f.write("\n".join(self.folded_stacks()) + "\n")
+
+    def summary(self) -> str:
+        """ Returns a table of the phases and the counter rates. """
+        elapsed_ns = max(self.elapsed_time * 1e9, 1.0)
+        lines = [f"{'phase':<40} {'calls':>10} {'total ms':>10} {'%':>6} {'mean us':>10} {'p50 us':>10} {'p99 us':>10} {'max us':>10}"]
+        for path, stats in sorted(self.phases.items()):
+            name = "  " * (len(path) - 1) + path[-1]
+            lines.append(
+                f"{name:<40} {stats.calls:>10} {stats.total_ns / 1e6:>10.2f} {100 * stats.total_ns / elapsed_ns:>6.1f} "
+                f"{stats.mean_ns / 1e3:>10.2f} {stats.percentile_ns(50) / 1e3:>10.2f} {stats.percentile_ns(99) / 1e3:>10.2f} {stats.max_ns / 1e3:>10.2f}"
+            )
+        for name, rate in self.rates().items():
+            lines.append(f"{name}: {self.counters[name]} ({rate:.1f}/sec)")
+        return "\n".join(lines)
+
+def active_profiler() -> Profiler:
+    """ Returns the enabled profiler or None. """
+    return _active_profiler
+
+def profile_phase(name: str):
+    """ Context manager timing the phase with the enabled profiler. It does nothing when profiling is disabled. """
+    profiler = _active_profiler
+    if profiler is None:
+        return _NULL_PHASE
+    return _Phase(profiler, name)
+
+def profile_count(name: str, n: int = 1) -> None:
+    """ Add `n` to the counter of the enabled profiler. """
+    profiler = _active_profiler
+    if profiler is not None:
+        profiler.counters[name] = profiler.counters.get(name, 0) + n
+
+def profiled(func: Callable, name: str) -> Callable:
+    """ Returns a function which calls `func` in the phase. Wrap functions only while profiling to keep the disabled path free. """
+    def wrapper(*args, **kwargs):
+        with profile_phase(name):
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,79 @@
+import multiprocessing
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+class GymLineEnv:
+    """ Gym api walk on a line of 5 cells, truncated after 8 steps. """
+
+    def reset(self):
+        self.position = 0
+        self.t = 0
+        return np.array([0.0], dtype=np.float32), {}
+
+    def step(self, action):
+        self.position = min(max(self.position + (1 if action == 1 else -1), 0), 4)
+        self.t += 1
+        terminated = self.position == 4
+        return np.array([self.position], dtype=np.float32), -1.0, terminated, self.t == 8, {}
+
+def make_net():
+    return torch.nn.Linear(1, 2)
+
+def make_optimizer(parameters):
+    return torch.optim.SGD(parameters, lr=0.01)
+
+def test_actor_learner_runs_with_the_gym_api():
+    from rl.drl_agent.deep_sarsa_actor_learner import DeepSarsaActorLearner
+    actor_learner = DeepSarsaActorLearner(
+        GymLineEnv, make_net, make_optimizer, 2,
+        num_actors=1, segment_length=4, context=multiprocessing.get_context("fork")
+    )
+    stats = actor_learner.train(max_updates=5)
+    assert stats.updates == 5
+    assert stats.steps == 20
+    assert actor_learner.parameters.version == 6
+    # episodes end by termination or by the time limit
+    assert np.all(stats.episode_returns >= -8)
+    assert len(stats.policy_lags) == 5
+    assert np.all((0 <= stats.policy_lags) & (stats.policy_lags <= 5))
+
+def test_actors_use_recent_weights():
+    from rl.drl_agent.deep_sarsa_actor_learner import DeepSarsaActorLearner
+    actor_learner = DeepSarsaActorLearner(
+        GymLineEnv, make_net, make_optimizer, 2,
+        num_actors=1, segment_length=4, queue_size=2, context=multiprocessing.get_context("fork")
+    )
+    stats = actor_learner.train(max_updates=30)
+    # a segment is at most as old as the segments queued before it, an actor which never pulled the weights would lag by up to 29 versions
+    assert stats.max_policy_lag <= 3
+
+def pull_weights(parameters, result_queue):
+    net = make_net()
+    version = parameters.pull(net, -1)
+    # a list, torch would share the tensor with the exiting process
+    result_queue.put((version, torch.nn.utils.parameters_to_vector(net.parameters()).tolist()))
+
+def test_actor_process_pulls_the_published_weights():
+    from rl.drl_agent.deep_sarsa_actor_learner import SharedParameterBuffer
+    context = multiprocessing.get_context("fork")
+    net = make_net()
+    parameters = SharedParameterBuffer(net, context)
+    with torch.no_grad():
+        for p in net.parameters():
+            p.fill_(0.5)
+    assert parameters.publish(net) == 1
+
+    result_queue = context.Queue()
+    process = context.Process(target=pull_weights, args=(parameters, result_queue))
+    process.start()
+    version, vector = result_queue.get(timeout=30)
+    process.join()
+    assert version == 1
+    assert vector == [0.5] * len(vector)
+
+    # a network of the current version isn't copied again
+    other = make_net()
+    assert parameters.pull(other, 1) == 1
+    assert torch.nn.utils.parameters_to_vector(other.parameters()).tolist() != vector
@@ -0,0 +1,60 @@
+import numpy as np
+from rl import Transition, Replay, ArrayReplay, ArrayOnPolicyReplay
+
+def make_transition(i):
+    return Transition(np.array([i, i + 1]), i % 3, np.array([i + 1, i + 2]), float(i), i % 5 == 0)
+
+def test_ring_buffer_keeps_the_latest_transitions_in_order():
+    replay = ArrayReplay(4)
+    for i in range(10):
+        replay.add(make_transition(i))
+    assert replay.count == 4
+    assert replay.is_full
+    batch = replay.sample()
+    assert np.array_equal(batch.reward, [6.0, 7.0, 8.0, 9.0])
+    assert np.array_equal(batch.current_state, [[i, i + 1] for i in range(6, 10)])
+    assert batch.terminated.dtype == np.bool_
+
+def test_matches_list_replay():
+    list_replay = Replay(5)
+    array_replay = ArrayReplay(5)
+    # the list replay evicts once when it overflows
+    for i in range(6):
+        list_replay.add(make_transition(i))
+        array_replay.add(make_transition(i))
+    transitions = list_replay.sample()
+    batch = array_replay.sample()
+    assert len(transitions) == array_replay.count
+    for field in Transition._fields:
+        assert np.array_equal(np.array([getattr(t, field) for t in transitions]), getattr(batch, field))
+
+def test_random_batch_is_gathered_from_the_stored_transitions():
+    np.random.seed(0)
+    replay = ArrayReplay(8)
+    for i in range(3):
+        replay.add(make_transition(i))
+    batch = replay.sample(32)
+    assert batch.current_state.shape == (32, 2)
+    assert set(batch.reward.tolist()) <= {0.0, 1.0, 2.0}
+    assert np.array_equal(batch.next_state, batch.current_state + 1)
+
+def test_on_policy_replay_resets_after_sample():
+    replay = ArrayOnPolicyReplay(8)
+    for i in range(3):
+        replay.add(make_transition(i))
+    assert len(replay.sample().reward) == 3
+    assert replay.count == 0
+    replay.add(make_transition(7))
+    assert np.array_equal(replay.sample().reward, [7.0])
+
+def test_state_dict_round_trip():
+    replay = ArrayReplay(4)
+    for i in range(6):
+        replay.add(make_transition(i))
+    restored = ArrayReplay(4)
+    restored.load_state_dict(replay.state_dict())
+    # the restored columns don't share memory with the original ones
+    replay.add(make_transition(100))
+    assert np.array_equal(restored.sample().reward, [2.0, 3.0, 4.0, 5.0])
+    restored.add(make_transition(6))
+    assert np.array_equal(restored.sample().reward, [3.0, 4.0, 5.0, 6.0])
@@ -0,0 +1,54 @@
+import json
+import pytest
+
+pytest.importorskip("torch")
+from benchmarks import suite
+from benchmarks.__main__ import main
+
+def results(**values):
+    return {
+        "format_version": suite.RESULT_FORMAT_VERSION,
+        "results": {name: {"value": value, "unit": unit, "peak_memory_bytes": 0} for name, (value, unit) in values.items()}
+    }
+
+def test_compare_handles_both_directions():
+    baseline = results(a=(100.0, "ops/sec"), b=(10.0, "us/op"), c=(1.0, "ops/sec"))
+    current = results(a=(80.0, "ops/sec"), b=(8.0, "us/op"), d=(1.0, "ops/sec"))
+    comparisons = {c.name: c for c in suite.compare(current, baseline, threshold=0.1)}
+    # only the benchmarks in both results are compared
+    assert set(comparisons) == {"a", "b"}
+    assert comparisons["a"].change == pytest.approx(-0.2)
+    assert comparisons["a"].is_regression
+    # lower is better for us/op
+    assert comparisons["b"].change == pytest.approx(0.2)
+    assert not comparisons["b"].is_regression
+
+def test_compare_thresholds_by_pattern():
+    baseline = results(**{"deep/x": (100.0, "ops/sec"), "train/x": (100.0, "ops/sec")})
+    current = results(**{"deep/x": (85.0, "ops/sec"), "train/x": (85.0, "ops/sec")})
+    comparisons = {c.name: c for c in suite.compare(current, baseline, 0.1, {"deep/*": 0.2})}
+    assert not comparisons["deep/x"].is_regression
+    assert comparisons["train/x"].is_regression
+
+def test_load_rejects_newer_formats(tmp_path):
+    path = str(tmp_path / "results.json")
+    suite.save({**results(), "format_version": suite.RESULT_FORMAT_VERSION + 1}, path)
+    with pytest.raises(ValueError):
+        suite.load(path)
+
+def test_run_and_main_exit_code(tmp_path, monkeypatch):
+    benchmarks = [suite.Benchmark("fast/ops", lambda: 1000, "ops/sec"), suite.Benchmark("other/ops", lambda: 1000, "ops/sec")]
+    monkeypatch.setattr(suite, "default_benchmarks", lambda quick=False: benchmarks)
+    run_results = suite.run(benchmarks, repeats=1, pattern="fast/*", verbose=False)
+    assert list(run_results["results"]) == ["fast/ops"]
+    assert run_results["results"]["fast/ops"]["value"] > 0
+
+    output = str(tmp_path / "results.json")
+    assert main(["--output", output, "--repeats", "1", "--filter", "fast/*"]) == 0
+    with open(output) as f:
+        saved = json.load(f)
+    # a baseline which is far faster makes the current run a regression
+    saved["results"]["fast/ops"]["value"] *= 1e6
+    baseline = str(tmp_path / "baseline.json")
+    suite.save(saved, baseline)
+    assert main(["--baseline", baseline, "--repeats", "1", "--filter", "fast/*"]) == 1
@@ -0,0 +1,180 @@
+import json
+import os
+import numpy as np
+import pytest
+import rl
+from rl.environment import CliffWalking
+from rl.train import Trainer, Checkpointer, CheckpointCallback, load_checkpoint
+
+def trained_agent(agent_cls, episodes=5):
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = agent_cls(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    Trainer(env, agent, max_episode_steps=200).train(max_episodes=episodes)
+    return env, agent
+
+@pytest.mark.parametrize("agent_cls", [rl.QLearning, rl.DoubleQLearning, rl.SarsaLambda])
+def test_tabular_round_trip(tmp_path, agent_cls):
+    env, agent = trained_agent(agent_cls)
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(agent, 5, {"note": "test"}, block=True)
+    restored = agent_cls(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    manifest = checkpointer.load(restored)
+    checkpointer.close()
+    assert manifest["step"] == 5
+    assert manifest["metadata"] == {"note": "test"}
+    for key, value in agent.state_dict().items():
+        if isinstance(value, np.ndarray):
+            assert np.array_equal(restored.state_dict()[key], value)
+
+def test_copy_on_write_doesnt_modify_the_files(tmp_path):
+    env, agent = trained_agent(rl.QLearning)
+    checkpointer = Checkpointer(str(tmp_path))
+    path = checkpointer.save(agent, 1, block=True).result()
+    saved = agent.q_vals
+    restored = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    load_checkpoint(restored, path)
+    Trainer(env, restored, max_episode_steps=200).train(max_episodes=3)
+    load_checkpoint(restored, path)
+    assert np.array_equal(restored.q_vals, saved)
+    checkpointer.close()
+
+def test_random_state_is_restored(tmp_path):
+    env, agent = trained_agent(rl.QLearning)
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(agent, 1, block=True)
+    expected = np.random.rand(3)
+    checkpointer.load(agent)
+    assert np.array_equal(np.random.rand(3), expected)
+    checkpointer.close()
+
+def test_resumed_training_matches_uninterrupted_training(tmp_path):
+    env, agent = trained_agent(rl.QLearning)
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(agent, 5, block=True)
+    Trainer(env, agent, max_episode_steps=200).train(max_episodes=5)
+
+    restored = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    checkpointer.load(restored)
+    Trainer(env, restored, max_episode_steps=200).train(max_episodes=5)
+    assert np.array_equal(restored.q_vals, agent.q_vals)
+    checkpointer.close()
+
+def test_population_round_trip(tmp_path):
+    env = CliffWalking()
+    population = rl.QLearningPopulation(3, env.obs_shape, env.action_count, seed=0)
+    population.get_actions(np.zeros((3, 2), dtype=np.int64))
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(population, 1, block=True)
+    expected = population.get_actions(np.zeros((3, 2), dtype=np.int64))
+    restored = rl.QLearningPopulation(3, env.obs_shape, env.action_count, seed=1)
+    checkpointer.load(restored)
+    assert np.array_equal(restored.get_actions(np.zeros((3, 2), dtype=np.int64)), expected)
+    checkpointer.close()
+
+def test_deep_sarsa_round_trip(tmp_path):
+    torch = pytest.importorskip("torch")
+
+    def make_agent():
+        torch.manual_seed(0)
+        net = torch.nn.Linear(2, 4)
+        return rl.DeepSarsa(net, torch.optim.Adam(net.parameters()), 4, onpolicy_replay=rl.OnPolicyReplay(4), epsilon_decay=rl.util.LinearDecay(0.5, 0.1, 10))
+
+    np.random.seed(0)
+    agent = make_agent()
+    for i in range(10):
+        state = np.random.rand(2).astype(np.float32)
+        agent.update(rl.Transition(state, int(agent.get_action(state[np.newaxis])[0]), state, -1.0, False))
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(agent, 1, block=True)
+    restored = make_agent()
+    checkpointer.load(restored)
+    checkpointer.close()
+    assert restored.epsilon == agent.epsilon
+    assert restored.step == agent.step
+    for p, q in zip(agent.q_value_net.parameters(), restored.q_value_net.parameters()):
+        assert torch.equal(p, q)
+
+def test_keep_last_and_latest(tmp_path):
+    _, agent = trained_agent(rl.QLearning, episodes=1)
+    checkpointer = Checkpointer(str(tmp_path), keep_last=2)
+    for step in range(4):
+        checkpointer.save(agent, step)
+    checkpointer.wait()
+    assert [os.path.basename(p) for p in checkpointer.checkpoints()] == ["checkpoint_0000000002", "checkpoint_0000000003"]
+    assert os.path.basename(checkpointer.latest) == "checkpoint_0000000003"
+    checkpointer.close()
+
+def test_newer_format_version_is_rejected(tmp_path):
+    _, agent = trained_agent(rl.QLearning, episodes=1)
+    checkpointer = Checkpointer(str(tmp_path))
+    path = checkpointer.save(agent, 1, block=True).result()
+    checkpointer.close()
+    manifest_path = os.path.join(path, "manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["format_version"] += 1
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError):
+        load_checkpoint(agent, path)
+
+def test_checkpoint_callback(tmp_path):
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    checkpointer = Checkpointer(str(tmp_path), keep_last=0)
+    Trainer(env, agent, max_episode_steps=200, callbacks=[CheckpointCallback(checkpointer, 2)]).train(max_episodes=6)
+    checkpointer.close()
+    assert len(checkpointer.checkpoints()) == 3
+
+def test_saving_the_latest_step_again_keeps_a_complete_latest(tmp_path, monkeypatch):
+    from rl.train import checkpoint
+    env, agent = trained_agent(rl.QLearning, episodes=1)
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(agent, 5, block=True)
+    first_q_vals = agent.q_vals
+    Trainer(env, agent, max_episode_steps=200).train(max_episodes=2)
+
+    # the latest checkpoint is complete at every rename of the second save
+    replace = os.replace
+
+    def checking_replace(src, dst):
+        assert os.path.isfile(os.path.join(checkpointer.latest, "manifest.json"))
+        replace(src, dst)
+
+    monkeypatch.setattr(checkpoint.os, "replace", checking_replace)
+    path = checkpointer.save(agent, 5, block=True).result()
+    monkeypatch.undo()
+    assert checkpointer.latest == path
+    assert len(checkpointer.checkpoints()) == 1
+    restored = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    checkpointer.load(restored)
+    assert np.array_equal(restored.q_vals, agent.q_vals)
+    assert not np.array_equal(restored.q_vals, first_q_vals)
+    checkpointer.close()
+
+def test_crash_before_switching_latest_keeps_the_old_checkpoint(tmp_path, monkeypatch):
+    from rl.train import checkpoint
+    env, agent = trained_agent(rl.QLearning, episodes=1)
+    checkpointer = Checkpointer(str(tmp_path))
+    old_path = checkpointer.save(agent, 5, block=True).result()
+    expected = agent.q_vals
+    Trainer(env, agent, max_episode_steps=200).train(max_episodes=2)
+
+    write_json = checkpoint._write_json
+
+    def crash(path, value):
+        # the new checkpoint is complete, but the process dies before latest.json points to it
+        if os.path.basename(path) == "latest.json":
+            raise OSError("crash")
+        write_json(path, value)
+
+    monkeypatch.setattr(checkpoint, "_write_json", crash)
+    with pytest.raises(OSError):
+        checkpointer.save(agent, 5, block=True).result()
+    monkeypatch.undo()
+    assert checkpointer.latest == old_path
+    restored = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    load_checkpoint(restored, checkpointer.latest)
+    assert np.array_equal(restored.q_vals, expected)
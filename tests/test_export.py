@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import rl
+from rl.environment import CliffWalking
+from rl.train import Trainer, export_policy
+from rl.runtime import TabularPolicy, load_policy
+
+def trained_agent(agent_cls, **kwargs):
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = agent_cls(env.obs_shape, env.action_count, [tuple(env.goal_state)], **kwargs)
+    Trainer(env, agent, max_episode_steps=200).train(max_episodes=10)
+    return agent
+
+def all_states(obs_shape):
+    return np.stack(np.unravel_index(np.arange(int(np.prod(obs_shape))), obs_shape), axis=1)
+
+@pytest.mark.parametrize("agent_cls", [rl.QLearning, rl.DoubleQLearning])
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_tabular_policy_is_the_greedy_policy(tmp_path, agent_cls, mmap_mode):
+    agent = trained_agent(agent_cls)
+    policy = load_policy(export_policy(agent, str(tmp_path / "policy")), mmap_mode=mmap_mode)
+    assert isinstance(policy, TabularPolicy)
+    if agent_cls is rl.DoubleQLearning:
+        state_dict = agent.state_dict()
+        expected = (state_dict["Q1"] + state_dict["Q2"]).argmax(axis=-1)
+    else:
+        expected = agent.q_vals.argmax(axis=-1)
+    assert policy.actions.dtype == np.uint8
+    assert np.array_equal(policy.actions, expected)
+
+    states = all_states(agent.obs_shape)
+    assert np.array_equal(policy.act_batch(states), expected.reshape(-1))
+    assert np.array_equal(policy.act_ids(agent.to_state_id(states)), expected.reshape(-1))
+    assert all(policy.act(state) == expected[tuple(state)] for state in states)
+
+def test_sparse_tabular_export(tmp_path):
+    agent = trained_agent(rl.QLearning, storage=rl.SparseQStorage())
+    policy = load_policy(export_policy(agent, str(tmp_path / "policy")))
+    assert np.array_equal(policy.actions, agent.q_vals.argmax(axis=-1))
+
+def test_export_replaces_the_directory(tmp_path):
+    path = str(tmp_path / "policy")
+    export_policy(trained_agent(rl.QLearning), path)
+    agent = trained_agent(rl.Sarsa)
+    export_policy(agent, path)
+    assert not os.path.exists(path + ".tmp")
+    assert np.array_equal(load_policy(path).actions, agent.q_vals.argmax(axis=-1))
+
+def test_unsupported_agent_and_newer_format_are_rejected(tmp_path):
+    with pytest.raises(TypeError):
+        export_policy(rl.Agent(), str(tmp_path / "agent"))
+    assert not os.path.exists(str(tmp_path / "agent.tmp"))
+
+    path = export_policy(trained_agent(rl.QLearning), str(tmp_path / "policy"))
+    manifest_path = os.path.join(path, "manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["format_version"] += 1
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError):
+        load_policy(path)
+
+def test_tabular_runtime_doesnt_import_torch(tmp_path):
+    path = export_policy(trained_agent(rl.QLearning), str(tmp_path / "policy"))
+    code = f"import sys; from rl.runtime import load_policy; load_policy({path!r}).act((3, 0)); assert 'torch' not in sys.modules"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=root)
+
+def test_torchscript_policy(tmp_path):
+    torch = pytest.importorskip("torch")
+    torch.manual_seed(0)
+    net = torch.nn.Sequential(torch.nn.Linear(2, 8), torch.nn.ReLU(), torch.nn.Linear(8, 4))
+    agent = rl.DeepSarsa(net, torch.optim.Adam(net.parameters()), 4, onpolicy_replay=rl.OnPolicyReplay(4))
+    states = np.random.default_rng(0).random((16, 2), dtype=np.float32)
+    with torch.no_grad():
+        expected = net(torch.from_numpy(states)).argmax(dim=-1).numpy()
+
+    policy = load_policy(export_policy(agent, str(tmp_path / "script")))
+    assert np.array_equal(policy.act_batch(states), expected)
+    assert policy.act(states[3]) == expected[3]
+    # tracing gives the same policy
+    policy = load_policy(export_policy(agent, str(tmp_path / "trace"), example_input=states))
+    assert np.array_equal(policy.act_batch(states), expected)
+    # the agent's network keeps training mode
+    assert net.training
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import rl
+
+@pytest.mark.parametrize("agent_cls", [rl.QLearning, rl.Sarsa, rl.ExpectedSarsa, rl.DoubleQLearning, rl.QLambda, rl.SarsaLambda])
+def test_tabular_get_actions_match_get_action(agent_cls):
+    agent = agent_cls((4, 5), 3, epsilon=0.0)
+    # distinct q-values, so the greedy actions aren't tied
+    agent.load_state_dict({name: np.random.default_rng(0).normal(size=(4, 5, 3)) for name in agent.state_dict()})
+    states = np.array([(r, c) for r in range(4) for c in range(5)])
+    expected = [agent.get_action(state) for state in states]
+    assert np.array_equal(agent.get_actions(states), expected)
+
+def test_tabular_get_actions_explore():
+    np.random.seed(0)
+    agent = rl.QLearning((1, 1), 4, epsilon=1.0)
+    agent.load_state_dict({"Q": np.array([[[0.0, 1.0, 0.0, 0.0]]])})
+    actions = agent.get_actions(np.zeros((4000, 2), dtype=np.int64))
+    assert np.allclose(np.bincount(actions, minlength=4) / 4000, 0.25, atol=0.03)
+
+def test_deep_sarsa_get_actions_are_greedy_without_exploration():
+    torch = pytest.importorskip("torch")
+    torch.manual_seed(0)
+    net = torch.nn.Linear(3, 4)
+    agent = rl.DeepSarsa(net, torch.optim.SGD(net.parameters(), lr=0.1), 4, epsilon_decay=rl.util.NoDecay(0.0))
+    states = np.random.default_rng(0).normal(size=(16, 3)).astype(np.float32)
+    with torch.no_grad():
+        expected = net(torch.from_numpy(states)).argmax(dim=1).numpy()
+    assert np.array_equal(agent.get_actions(states), expected)
+
+def test_reinforce_get_actions_and_update_batch():
+    torch = pytest.importorskip("torch")
+    torch.manual_seed(0)
+    net = torch.nn.Linear(2, 3)
+    agent = rl.Reinforce(net, torch.optim.SGD(net.parameters(), lr=0.1), lambda logits: torch.distributions.Categorical(logits=logits))
+    agent.start_episode()
+    states = np.zeros((5, 2), dtype=np.float32)
+    for t in range(3):
+        actions = agent.get_actions(states)
+        assert actions.shape == (5,)
+        assert np.all((0 <= actions) & (actions < 3))
+        # the agent 0 terminates at the first step, so its episode has one step
+        terminated = np.array([t == 0, False, False, False, t == 2])
+        agent.update_batch(states, actions, np.ones(5), states, terminated)
+    before = [p.detach().clone() for p in net.parameters()]
+    agent.end_episode()
+    assert any(not torch.equal(b, p) for b, p in zip(before, net.parameters()))
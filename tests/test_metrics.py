@@ -0,0 +1,87 @@
+import math
+import numpy as np
+import pytest
+import rl
+from rl.environment import CliffWalking
+from rl.train import Trainer, MetricsCallback
+from rl.util import RollingMean, RunningStats, EMA, RollingMinMax, rolling_mean, average_last_data, MetricLogger, load_metrics
+
+DATA = np.random.default_rng(0).normal(size=300)
+
+def test_rolling_mean_matches_numpy():
+    mean = RollingMean(7)
+    values = [mean.update(x) for x in DATA]
+    expected = [DATA[max(0, i - 6):i + 1].mean() for i in range(len(DATA))]
+    assert np.allclose(values, expected)
+    assert np.allclose(rolling_mean(DATA, 7), expected)
+    assert np.allclose(rolling_mean(DATA), np.cumsum(DATA) / np.arange(1, len(DATA) + 1))
+    assert np.allclose(average_last_data(DATA, 7), expected)
+    assert math.isnan(RollingMean(3).value)
+
+def test_running_stats_matches_numpy():
+    stats = RunningStats()
+    for x in DATA:
+        stats.update(x)
+    assert stats.count == len(DATA)
+    assert stats.mean == pytest.approx(DATA.mean())
+    assert stats.variance == pytest.approx(DATA.var(ddof=1))
+    assert (stats.min, stats.max) == (DATA.min(), DATA.max())
+
+def test_ema_is_bias_corrected():
+    ema = EMA(alpha=0.1)
+    assert math.isnan(ema.value)
+    assert ema.update(5.0) == pytest.approx(5.0)
+    value = 0.0
+    weight = 0.0
+    ema = EMA(span=19)
+    for x in DATA:
+        value = 0.9 * value + 0.1 * x
+        weight = 0.9 * weight + 0.1
+        assert ema.update(x) == pytest.approx(value / weight)
+
+def test_rolling_min_max_matches_numpy():
+    window = RollingMinMax(5)
+    for i, x in enumerate(DATA):
+        assert window.update(x) == (DATA[max(0, i - 4):i + 1].min(), DATA[max(0, i - 4):i + 1].max())
+
+def test_metric_logger_round_trip_and_append(tmp_path):
+    directory = str(tmp_path / "log")
+    with MetricLogger(directory, chunk_size=4) as logger:
+        for i in range(10):
+            logger.log(episode=i, reward=-i)
+        logger.log(episode=10)
+    metrics = load_metrics(directory)
+    assert np.array_equal(metrics["episode"], np.arange(11))
+    assert np.array_equal(metrics["reward"][:10], -np.arange(10))
+    assert np.isnan(metrics["reward"][10])
+
+    with MetricLogger(directory) as logger:
+        assert logger.rows == 11
+        logger.log(episode=11, reward=-11)
+    assert len(load_metrics(directory)["episode"]) == 12
+    with pytest.raises(ValueError):
+        MetricLogger(directory, columns=["other"])
+
+def test_metric_logger_drops_rows_written_after_the_meta(tmp_path):
+    directory = str(tmp_path / "log")
+    with MetricLogger(directory) as logger:
+        logger.log(x=1.0)
+    # a crash after the column file was appended but before the meta was updated
+    with open(tmp_path / "log" / "x.bin", "ab") as f:
+        f.write(np.array([2.0]).tobytes())
+    with MetricLogger(directory) as logger:
+        logger.log(x=3.0)
+    assert np.array_equal(load_metrics(directory)["x"], [1.0, 3.0])
+
+def test_metrics_callback(tmp_path):
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    directory = str(tmp_path / "log")
+    with MetricLogger(directory) as logger:
+        callback = MetricsCallback(window=3, logger=logger)
+        result = Trainer(env, agent, max_episode_steps=200, callbacks=[callback]).train(max_episodes=6)
+    metrics = load_metrics(directory)
+    assert np.array_equal(metrics["reward"], result.episode_rewards)
+    assert np.array_equal(metrics["length"], result.episode_lengths)
+    assert callback.reward_mean.value == pytest.approx(result.episode_rewards[-3:].mean())
@@ -0,0 +1,123 @@
+import time
+from concurrent.futures import Future
+import numpy as np
+import pytest
+import rl
+from rl.environment import CliffWalking, VectorCliffWalking, LatencyEnv
+from rl.train import Trainer
+from rl.train.trainer import _Pipeline
+from rl.util import Profiler
+
+class CountdownEnv:
+    """ Terminates after `length` steps, the state is the step count. """
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+
+    def reset(self):
+        self.t = 0
+        return np.array([0])
+
+    def step(self, action):
+        self.t += 1
+        return np.array([self.t]), 1.0, self.t == self.length
+
+class StalenessAgent(rl.Agent):
+    """ Records how many of the taken steps weren't applied when an action is chosen. """
+
+    def __init__(self, update_time: float = 0.0) -> None:
+        self.update_time = update_time
+        self.steps = 0
+        self.updates = []
+        self.missing = []
+        self.missing_at_episode_end = []
+
+    def get_action(self, state):
+        self.missing.append(self.steps - len(self.updates))
+        self.steps += 1
+        return 0
+
+    def update(self, transition):
+        time.sleep(self.update_time)
+        self.updates.append(transition)
+
+    def end_episode(self):
+        self.missing_at_episode_end.append(self.steps - len(self.updates))
+
+@pytest.mark.parametrize("staleness", [1, 3])
+def test_staleness_is_bounded_and_episodes_are_flushed(staleness):
+    agent = StalenessAgent(update_time=0.002)
+    env = LatencyEnv(CountdownEnv(10), step_latency=0.0005)
+    result = Trainer(env, agent, pipeline_staleness=staleness).train(max_episodes=3)
+    assert result.episode_lengths.tolist() == [10, 10, 10]
+    # an action is chosen before the update of the last step
+    assert 1 <= max(agent.missing) <= staleness
+    assert agent.missing_at_episode_end == [0, 0, 0]
+    # the updates are applied in order
+    assert [int(t.next_state[0]) for t in agent.updates] == list(range(1, 11)) * 3
+
+class ImmediateExecutor:
+    """ Finishes a step before the pipeline checks it, so the pending updates only run when they reach the bound. """
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self):
+        pass
+
+@pytest.mark.parametrize("staleness", [1, 3])
+def test_pipeline_runs_updates_at_the_bound(staleness):
+    pipeline = _Pipeline(staleness)
+    pipeline._executor.shutdown()
+    pipeline._executor = ImmediateExecutor()
+    applied = []
+    for t in range(10):
+        assert pipeline.step(lambda action: action, t) == t
+        # `staleness - 1` updates are left pending, the update of this step makes it `staleness`
+        assert len(pipeline._pending) == min(t, staleness - 1)
+        pipeline.add(applied.append, t)
+    pipeline.flush()
+    assert applied == list(range(10))
+    pipeline.close()
+
+@pytest.mark.parametrize("env_fn", [CliffWalking, lambda: VectorCliffWalking(4)])
+def test_pipelined_training_matches_sequential_training(env_fn):
+    def train(staleness):
+        np.random.seed(0)
+        env = env_fn()
+        # random actions don't depend on the q-values, so the same transitions are applied in the same order
+        agent = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)], epsilon=1.0)
+        result = Trainer(LatencyEnv(env, step_latency=0.0001), agent, max_episode_steps=100, pipeline_staleness=staleness).train(max_steps=800)
+        return result, agent.q_vals
+
+    sequential_result, sequential_q_vals = train(0)
+    for staleness in (1, 4):
+        result, q_vals = train(staleness)
+        assert np.array_equal(q_vals, sequential_q_vals)
+        assert np.array_equal(result.episode_lengths, sequential_result.episode_lengths)
+        assert np.array_equal(result.episode_rewards, sequential_result.episode_rewards)
+        assert result.total_steps == sequential_result.total_steps
+
+def test_pipelined_steps_are_profiled_as_waits():
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    with agent.profile() as profiler:
+        result = Trainer(env, agent, max_episode_steps=50, pipeline_staleness=1).train(max_episodes=2)
+    totals = profiler.phase_totals()
+    assert totals["env.wait"].calls == result.total_steps
+    assert "env.step" not in totals
+    assert totals["update"].calls == result.total_steps
+
+def test_latency_env():
+    env = LatencyEnv(CliffWalking(), step_latency=0.002, jitter=0.001, seed=0)
+    assert env.obs_shape == (4, 12)
+    assert np.array_equal(env.reset(), env.start_state)
+    start = time.perf_counter()
+    next_state, reward, terminated = env.step(0)
+    assert time.perf_counter() - start >= 0.002
+    assert np.array_equal(next_state, [2, 0]) and reward == -1.0 and not terminated
+    with pytest.raises(AttributeError):
+        env.missing_attribute
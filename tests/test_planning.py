@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from rl.environment import CliffWalking, WindyGridworld
+from rl.planning import value_iteration, policy_evaluation, policy_iteration, policy_from_q, greedy_return
+
+ENVS = [CliffWalking, WindyGridworld]
+
+def bellman_optimality_residual(env, q_vals, gamma=1.0):
+    # a plain loop over the flat table as the reference of the vectorized sweep
+    table = env.transition_table
+    goal = np.ravel_multi_index(tuple(env.goal_state), tuple(env.obs_shape))
+    Q = q_vals.reshape(-1, q_vals.shape[-1])
+    residual = 0.0
+    for s in range(Q.shape[0]):
+        if s == goal:
+            continue
+        for a in range(Q.shape[1]):
+            target = table.reward[s, a]
+            if not table.terminated[s, a]:
+                target += gamma * Q[table.next_state[s, a]].max()
+            residual = max(residual, abs(target - Q[s, a]))
+    return residual
+
+def greedy_rollout(env, policy, max_steps=1000):
+    state = env.reset()
+    total = 0.0
+    for _ in range(max_steps):
+        state, reward, terminated = env.step(int(policy[tuple(state)]))
+        total += reward
+        if terminated:
+            return total
+    raise AssertionError("the greedy policy didn't reach the goal")
+
+@pytest.mark.parametrize("env_cls, start_value", [(CliffWalking, -12.0), (WindyGridworld, -14.0)])
+def test_value_iteration(env_cls, start_value):
+    env = env_cls()
+    result = value_iteration(env)
+    assert result.converged
+    assert result.values[tuple(env.start_state)] == start_value
+    assert bellman_optimality_residual(env, result.q_vals) < 1e-8
+    assert np.all(result.q_vals[tuple(env.goal_state)] == 0)
+    # the table agrees with stepping the environment
+    assert greedy_rollout(env, result.policy) == start_value
+
+@pytest.mark.parametrize("env_cls", ENVS)
+def test_policy_iteration_matches_value_iteration(env_cls):
+    env = env_cls()
+    expected = value_iteration(env)
+    result = policy_iteration(env)
+    assert result.converged
+    assert np.allclose(result.values, expected.values)
+    assert greedy_rollout(env, result.policy) == expected.values[tuple(env.start_state)]
+
+@pytest.mark.parametrize("env_cls", ENVS)
+def test_policy_evaluation_of_the_optimal_policy(env_cls):
+    env = env_cls()
+    optimal = value_iteration(env)
+    result = policy_evaluation(env, optimal.policy)
+    assert result.converged
+    assert np.allclose(result.values, optimal.values)
+    # probabilities and deterministic actions are the same policy
+    assert np.allclose(policy_evaluation(env, policy_from_q(optimal.q_vals)).values, result.values)
+
+def test_policy_evaluation_of_an_epsilon_greedy_policy():
+    env = CliffWalking()
+    optimal = value_iteration(env, gamma=0.9)
+    result = policy_evaluation(env, policy_from_q(optimal.q_vals, 0.1), gamma=0.9)
+    assert result.converged
+    assert np.all(result.values <= optimal.values + 1e-8)
+    assert result.values[tuple(env.start_state)] < optimal.values[tuple(env.start_state)]
+
+def test_policy_from_q():
+    q_vals = np.array([[1.0, 3.0, 3.0, 0.0], [0.0, 0.0, 0.0, 0.0]])
+    probs = policy_from_q(q_vals, 0.2)
+    assert np.allclose(probs.sum(axis=-1), 1.0)
+    # ties go to the first action
+    assert np.allclose(probs[0], [0.05, 0.85, 0.05, 0.05])
+    assert np.allclose(probs[1], [0.85, 0.05, 0.05, 0.05])
+    assert np.array_equal(policy_from_q(q_vals), [[0, 1, 0, 0], [1, 0, 0, 0]])
+
+@pytest.mark.parametrize("env_cls", ENVS)
+def test_greedy_return(env_cls):
+    env = env_cls()
+    optimal = value_iteration(env)
+    assert greedy_return(env, optimal.q_vals) == optimal.values[tuple(env.start_state)]
+    # the greedy policy of zero q-values walks into a wall forever
+    assert greedy_return(env, np.zeros_like(optimal.q_vals), max_iterations=100) <= -100
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from rl import DynaQ, PrioritizedSweeping, Transition
+from rl.environment import CliffWalking, VectorCliffWalking
+from rl.rl_agent.tabular_model import TabularModel
+from rl.train import Trainer
+from rl.planning import greedy_return
+
+def test_model_predecessors_match_a_reference():
+    rng = np.random.default_rng(0)
+    model = TabularModel(6, 2)
+    reference = {}
+    for _ in range(200):
+        pair = int(rng.integers(12))
+        next_state = int(rng.integers(6))
+        model.add(pair, next_state, 1.0, False)
+        reference[pair] = next_state
+        for state_id in range(6):
+            expected = sorted(p for p, s in reference.items() if s == state_id)
+            assert sorted(model.predecessors(state_id).tolist()) == expected
+    assert model.count == len(reference)
+    assert sorted(model.observed[:model.count].tolist()) == sorted(reference)
+
+def test_dyna_q_plans_in_one_batch_by_default():
+    env = CliffWalking()
+    agent = DynaQ(env.obs_shape, env.action_count, [tuple(env.goal_state)], alpha=0.5)
+    assert agent.planning_batch_size is None
+    for _ in range(3):
+        agent.update(Transition((3, 0), 0, (2, 0), -1.0, False))
+    # one pair sampled 3 * 5 times in one batch moves like 15 sequential updates toward the same target
+    assert agent.q_vals[3, 0, 0] == pytest.approx(-(1 - 0.5 ** 18))
+
+def test_dyna_q_sequential_planning():
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = DynaQ(env.obs_shape, env.action_count, [tuple(env.goal_state)], alpha=0.5, planning_batch_size=1)
+    Trainer(env, agent, max_episode_steps=100).train(max_episodes=3)
+
+    # the planning loop of Sutton and Barto
+    Q = agent.q_vals.reshape(-1, env.action_count).copy()
+    model = agent.model
+    state = np.random.get_state()
+    for _ in range(50):
+        pair = model.observed[np.random.randint(model.count, size=1)][0]
+        s, a = divmod(pair, env.action_count)
+        target = model.reward[pair] + agent.gamma * (1.0 - model.terminated[pair]) * Q[model.next_state[pair]].max()
+        Q[s, a] += agent.alpha * (target - Q[s, a])
+    np.random.set_state(state)
+    agent.plan(50)
+    assert np.allclose(agent.q_vals.reshape(-1, env.action_count), Q)
+
+def batch_of(transitions):
+    states, actions, next_states, rewards, terminated = zip(*transitions)
+    return np.array(states), np.array(actions), np.array(rewards), np.array(next_states), np.array(terminated)
+
+def test_prioritized_sweeping_sequential_batch_matches_update():
+    rng = np.random.default_rng(0)
+    transitions = [((int(rng.integers(4)), int(rng.integers(12))), int(rng.integers(4)), (int(rng.integers(4)), int(rng.integers(12))), -1.0, False) for _ in range(50)]
+    agent = PrioritizedSweeping((4, 12), 4, [(3, 11)], alpha=0.5)
+    batch_agent = PrioritizedSweeping((4, 12), 4, [(3, 11)], alpha=0.5)
+    for transition in transitions:
+        agent.update(Transition(*transition))
+    batch_agent.update_batch(*batch_of(transitions), sequential=True)
+    assert np.array_equal(batch_agent.q_vals, agent.q_vals)
+
+def test_prioritized_sweeping_batch_of_one_matches_update():
+    agent = PrioritizedSweeping((4, 12), 4, [(3, 11)], alpha=0.5)
+    batch_agent = PrioritizedSweeping((4, 12), 4, [(3, 11)], alpha=0.5)
+    for transition in [((3, 10), 3, (3, 11), 0.0, True), ((2, 10), 1, (3, 10), -1.0, False), ((2, 10), 1, (3, 10), -1.0, False)]:
+        agent.update(Transition(*transition))
+        batch_agent.update_batch(*batch_of([transition]))
+        assert np.array_equal(batch_agent.q_vals, agent.q_vals)
+
+def test_prioritized_sweeping_batch_queues_the_whole_batch():
+    agent = PrioritizedSweeping((4, 12), 4, [(3, 11)], alpha=1.0, gamma=1.0, planning_steps=0)
+    # the goal transition is last but has the highest priority, so it's updated before its predecessor
+    transitions = [((2, 10), 1, (3, 10), -1.0, False), ((3, 10), 3, (3, 11), 5.0, True)]
+    agent.update_batch(*batch_of(transitions))
+    assert agent.q_vals[3, 10, 3] == 5.0
+    assert agent.q_vals[2, 10, 1] == 4.0
+    # one by one, the predecessor is updated before the goal transition is seen
+    sequential_agent = PrioritizedSweeping((4, 12), 4, [(3, 11)], alpha=1.0, gamma=1.0, planning_steps=0)
+    sequential_agent.update_batch(*batch_of(transitions), sequential=True)
+    assert sequential_agent.q_vals[2, 10, 1] == -1.0
+
+@pytest.mark.parametrize("agent_cls", [DynaQ, PrioritizedSweeping])
+def test_batch_planning_learns_the_cliff(agent_cls):
+    np.random.seed(0)
+    env = VectorCliffWalking(4)
+    agent = agent_cls(env.obs_shape, env.action_count, [tuple(env.goal_state)], alpha=0.5, gamma=1.0, planning_steps=10)
+    Trainer(env, agent).train(max_steps=4000)
+    assert greedy_return(CliffWalking(), agent.q_vals) > -100
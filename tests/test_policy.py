@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import rl
+from rl import RandomPool, greedy_actions, epsilon_greedy_actions, epsilon_greedy_batch, epsilon_greedy_distribution, epsilon_greedy_expected_value
+
+def test_random_pool_values_survive_a_refill():
+    pool = RandomPool(np.random.default_rng(0), size=8)
+    first = pool.random(6)
+    kept = first.copy()
+    # refills the pool in place
+    pool.random(6)
+    assert np.array_equal(first, kept)
+
+def test_random_pool_matches_the_generator_stream():
+    pool = RandomPool(np.random.default_rng(0), size=8)
+    values = np.concatenate([pool.random(4), pool.random(4), pool.random(3)])
+    rng = np.random.default_rng(0)
+    assert np.array_equal(values, np.concatenate([rng.random(8), rng.random(8)[:3]]))
+
+def test_greedy_ties_are_broken_uniformly():
+    pool = RandomPool(np.random.default_rng(0))
+    q_values = np.tile([1.0, 3.0, 3.0, 0.0, 3.0], (30000, 1))
+    counts = np.bincount(greedy_actions(q_values, pool), minlength=5)
+    assert counts[0] == counts[3] == 0
+    assert np.allclose(counts[[1, 2, 4]] / len(q_values), 1 / 3, atol=0.02)
+
+def test_epsilon_greedy_actions_explore_with_epsilon():
+    pool = RandomPool(np.random.default_rng(0))
+    q_values = np.tile([0.0, 1.0, 0.0, 0.0], (40000, 1))
+    actions = epsilon_greedy_actions(q_values, 0.2, pool)
+    frequencies = np.bincount(actions, minlength=4) / len(actions)
+    assert np.allclose(frequencies, [0.05, 0.85, 0.05, 0.05], atol=0.01)
+
+def test_epsilon_greedy_batch_indexes_the_states():
+    pool = RandomPool(np.random.default_rng(0))
+    q_values = np.zeros((3, 4, 2))
+    q_values[..., 1] = 1.0
+    states = np.array([[0, 1], [2, 3]])
+    assert np.array_equal(epsilon_greedy_batch(q_values, states, 0.0, pool), [1, 1])
+    assert np.array_equal(epsilon_greedy_batch(q_values.reshape(12, 2), np.array([0, 11]), 0.0, pool), [1, 1])
+
+def test_expected_value_matches_the_distribution():
+    rng = np.random.default_rng(0)
+    q_values = rng.normal(size=(10, 4))
+    expected = [epsilon_greedy_distribution(q_values, i, 4, 0.3) @ q_values[i] for i in range(10)]
+    assert np.allclose(epsilon_greedy_expected_value(q_values, 0.3), expected)
+
+@pytest.mark.parametrize("agent_cls", [rl.QLearning, rl.DoubleQLearning])
+def test_agent_batched_actions_are_reproducible(agent_cls):
+    def actions():
+        rl.util.seed(3)
+        agent = agent_cls((4, 12), 4)
+        return agent.get_actions(np.zeros((100, 2), dtype=np.int64))
+    first = actions()
+    assert np.array_equal(first, actions())
+    # all the q-values are tied, so the actions are uniform
+    assert len(np.unique(first)) == 4
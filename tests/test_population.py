@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+import rl
+from rl.environment import CliffWalking
+
+POPULATIONS = [
+    (rl.QLearningPopulation, rl.QLearning),
+    (rl.SarsaPopulation, rl.Sarsa),
+    (rl.ExpectedSarsaPopulation, rl.ExpectedSarsa),
+    (rl.DoubleQLearningPopulation, rl.DoubleQLearning)
+]
+
+def run_population(population, steps: int):
+    """ Step the learner `k` in its own scalar environment `k`, returns the actions `(steps, K)`. """
+    envs = [CliffWalking() for _ in range(population.population_size)]
+    states = np.array([env.reset() for env in envs])
+    population.start_episode()
+    actions_log = []
+    for _ in range(steps):
+        actions = population.get_actions(states)
+        next_states, rewards, terminated = map(np.array, zip(*(env.step(a) for env, a in zip(envs, actions))))
+        population.update_batch(states, actions, rewards, next_states, terminated)
+        states = np.array([env.reset() if t else s for env, s, t in zip(envs, next_states, terminated)])
+        actions_log.append(actions)
+    return np.array(actions_log)
+
+def make_population(population_cls, size, seed=0, epsilon=0.2):
+    env = CliffWalking()
+    return population_cls(size, env.obs_shape, env.action_count, [tuple(env.goal_state)], epsilon=epsilon, seed=seed)
+
+@pytest.mark.parametrize("population_cls", [p for p, _ in POPULATIONS])
+def test_learner_streams_dont_depend_on_the_population_size(population_cls):
+    small = make_population(population_cls, 2)
+    large = make_population(population_cls, 5)
+    small_actions = run_population(small, 300)
+    large_actions = run_population(large, 300)
+    assert np.array_equal(small_actions, large_actions[:, :2])
+    assert np.array_equal(small.q_vals, large.q_vals[:2])
+    # the learners explore differently
+    assert not np.array_equal(large_actions[:, 0], large_actions[:, 1])
+
+def record_population(population, steps: int):
+    """ Like `run_population()`, returns the transitions `(states, actions, rewards, next_states, terminated)` of every step
+    and the coin flips of `DoubleQLearningPopulation` `(steps, K)`, which are the only `_random(1)` draws. """
+    envs = [CliffWalking() for _ in range(population.population_size)]
+    states = np.array([env.reset() for env in envs])
+    population.start_episode()
+    coins = []
+    random = population._random
+
+    def recording_random(count):
+        values = random(count)
+        if count == 1:
+            coins.append(values[0])
+        return values
+
+    population._random = recording_random
+    transitions = []
+    for _ in range(steps):
+        actions = population.get_actions(states)
+        next_states, rewards, terminated = map(np.array, zip(*(env.step(a) for env, a in zip(envs, actions))))
+        population.update_batch(states, actions, rewards, next_states, terminated)
+        transitions.append((states, actions, rewards, next_states, terminated))
+        states = np.array([env.reset() if t else s for env, s, t in zip(envs, next_states, terminated)])
+    return transitions, np.array(coins)
+
+@pytest.mark.parametrize("population_cls, agent_cls", POPULATIONS)
+@pytest.mark.parametrize("epsilon", [0.0, 0.2])
+def test_learners_match_scalar_agents(monkeypatch, population_cls, agent_cls, epsilon):
+    population = make_population(population_cls, 3, epsilon=epsilon)
+    transitions, coins = record_population(population, 200)
+    for k in range(3):
+        # the scalar agent replays the transitions of the learner k, its exploration uses another random stream
+        env = CliffWalking()
+        agent = agent_cls(env.obs_shape, env.action_count, [tuple(env.goal_state)], epsilon=epsilon)
+        agent.start_episode()
+        for t, (states, actions, rewards, next_states, terminated) in enumerate(transitions):
+            if epsilon == 0.0:
+                # without exploration, the learner acts like the scalar agent
+                assert agent.get_action(states[k]) == actions[k]
+            transition = rl.Transition(states[k], int(actions[k]), next_states[k], rewards[k], bool(terminated[k]))
+            with monkeypatch.context() as m:
+                if agent_cls is rl.DoubleQLearning:
+                    # the scalar agent flips the same coin as the learner
+                    m.setattr(np.random, "rand", lambda: coins[t, k])
+                agent.update(transition)
+            if terminated[k]:
+                agent.end_episode()
+                agent.start_episode()
+        if agent_cls is rl.DoubleQLearning:
+            assert np.allclose(population.state_dict()["Q1"][k], agent.state_dict()["Q1"])
+            assert np.allclose(population.state_dict()["Q2"][k], agent.state_dict()["Q2"])
+        else:
+            assert np.allclose(population.q_vals[k], agent.q_vals)
+
+def test_state_dict_restores_the_streams():
+    population = make_population(rl.QLearningPopulation, 3)
+    run_population(population, 10)
+    state_dict = population.state_dict()
+    state_dict = {**state_dict, "Q": state_dict["Q"].copy()}
+    expected = run_population(population, 50)
+    restored = make_population(rl.QLearningPopulation, 3, seed=1)
+    restored.load_state_dict(state_dict)
+    assert np.array_equal(run_population(restored, 50), expected)
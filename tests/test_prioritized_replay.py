@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from rl import Transition, PrioritizedReplay
+from rl.rl_util.segment_tree import SumTree, MinTree
+
+@pytest.mark.parametrize("capacity", [1, 5, 8, 100])
+def test_trees_match_numpy(capacity):
+    rng = np.random.default_rng(capacity)
+    sum_tree = SumTree(capacity)
+    min_tree = MinTree(capacity)
+    leaves = np.zeros(capacity)
+    # the leaves which were never written are neutral
+    min_leaves = np.full(capacity, np.inf)
+    for _ in range(10):
+        indices = rng.integers(0, capacity, 3)
+        values = rng.random(3)
+        sum_tree.update(indices, values)
+        min_tree.update(indices, values)
+        # the last write of a duplicate index wins like numpy assignment
+        leaves[indices] = values
+        min_leaves[indices] = values
+        assert sum_tree.total == pytest.approx(leaves.sum())
+        assert min_tree.min == min_leaves.min()
+    assert np.allclose(sum_tree[np.arange(capacity)], leaves)
+
+def test_find_prefix_sum_index_matches_searchsorted():
+    rng = np.random.default_rng(0)
+    capacity = 37
+    leaves = rng.random(capacity)
+    tree = SumTree(capacity)
+    tree.update(np.arange(capacity), leaves)
+    prefix_sums = rng.random(1000) * leaves.sum()
+    expected = np.searchsorted(np.cumsum(leaves), prefix_sums)
+    assert np.array_equal(tree.find_prefix_sum_index(prefix_sums), expected)
+
+def test_min_tree_tracks_the_minimum():
+    tree = MinTree(6)
+    tree.update(np.arange(6), [5.0, 3.0, 4.0, 2.0, 6.0, 7.0])
+    assert tree.min == 2.0
+    tree.update([3], [8.0])
+    assert tree.min == 3.0
+
+def make_replay(priorities, alpha=1.0):
+    replay = PrioritizedReplay(len(priorities), alpha=alpha, epsilon=0.0)
+    for i in range(len(priorities)):
+        replay.add(Transition(np.array([i]), 0, np.array([i + 1]), float(i), False))
+    replay.update_priorities(np.arange(len(priorities)), priorities)
+    return replay
+
+def test_sampling_is_proportional_to_the_priorities():
+    np.random.seed(0)
+    priorities = np.array([1.0, 2.0, 3.0, 4.0])
+    replay = make_replay(priorities)
+    counts = np.zeros(len(priorities))
+    for _ in range(500):
+        batch, _, indices = replay.sample(20)
+        # the returned indices are the storage indices of the transitions
+        assert np.array_equal(batch.reward, indices.astype(np.float32))
+        counts += np.bincount(indices, minlength=len(priorities))
+    assert np.allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.01)
+
+def test_importance_sampling_weights():
+    np.random.seed(0)
+    priorities = np.array([1.0, 2.0, 4.0])
+    replay = make_replay(priorities)
+    _, weights, indices = replay.sample(64, beta=1.0)
+    # (p_i / p_min) ** -beta, so the least likely transition has the weight 1
+    assert np.allclose(weights, priorities.min() / priorities[indices])
+    assert weights.max() <= 1.0
+
+def test_new_transitions_get_the_max_priority():
+    replay = make_replay(np.array([1.0, 5.0, 2.0]))
+    replay.add(Transition(np.array([9]), 0, np.array([10]), 9.0, True))
+    assert replay._sum_tree[0] == pytest.approx(5.0)
+    assert replay._sum_tree.total == pytest.approx(5.0 + 5.0 + 2.0)
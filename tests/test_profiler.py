@@ -0,0 +1,92 @@
+import numpy as np
+import rl
+from rl.environment import CliffWalking, VectorCliffWalking
+from rl.train import Trainer
+from rl.util import Profiler, PhaseStats, active_profiler, profile_phase, profile_count
+
+def test_disabled_profiling_is_a_no_op():
+    assert active_profiler() is None
+    with profile_phase("phase"):
+        profile_count("events")
+    assert active_profiler() is None
+
+def test_nested_phases_and_counters():
+    with Profiler() as profiler:
+        assert active_profiler() is profiler
+        for _ in range(3):
+            with profile_phase("update"):
+                with profile_phase("backward"):
+                    pass
+        profile_count("updates", 3)
+    assert active_profiler() is None
+    assert profiler.phases[("update",)].calls == 3
+    assert profiler.phases[("update", "backward")].calls == 3
+    assert profiler.counters == {"updates": 3}
+    assert profiler.phase_totals()["backward"].calls == 3
+    assert [line.split(" ")[0] for line in profiler.folded_stacks()] == ["update", "update;backward"]
+    assert "updates: 3" in profiler.summary()
+
+def test_profilers_nest():
+    with Profiler() as outer:
+        with Profiler() as inner:
+            profile_count("inner")
+        assert active_profiler() is outer
+        profile_count("outer")
+    assert inner.counters == {"inner": 1}
+    assert outer.counters == {"outer": 1}
+
+def test_phase_stats():
+    stats = PhaseStats()
+    for duration in (1000, 2000, 3000, 100000):
+        stats.record(duration)
+    assert stats.calls == 4
+    assert stats.mean_ns == 26500
+    assert stats.min_ns == 1000 and stats.max_ns == 100000
+    assert 2000 <= stats.percentile_ns(50) <= 4096
+    assert stats.percentile_ns(100) == 100000
+
+def test_agent_profile_times_the_agent_and_restores_the_methods():
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    with agent.profile() as profiler:
+        result = Trainer(env, agent, max_episode_steps=100).train(max_episodes=3)
+    totals = profiler.phase_totals()
+    assert totals["update"].calls == result.total_steps
+    assert totals["env.step"].calls == result.total_steps
+    assert profiler.counters["transitions"] == result.total_steps
+    # the conversion is a phase of the update
+    assert profiler.phases[("update", "to_tabular")].calls == result.total_steps
+    assert "update" not in agent.__dict__
+
+def test_overlapping_agent_profiles_only_wrap_their_agents():
+    env = CliffWalking()
+    first = rl.QLearning(env.obs_shape, env.action_count)
+    second = rl.QLearning(env.obs_shape, env.action_count)
+    transition = rl.Transition((0, 0), 1, (0, 1), -1.0, False)
+    first_context = first.profile()
+    first_profiler = first_context.__enter__()
+    first.update(transition)
+    second_context = second.profile()
+    second_profiler = second_context.__enter__()
+    # the contexts exit out of order
+    first_context.__exit__(None, None, None)
+    assert "update" not in first.__dict__
+    assert active_profiler() is second_profiler
+    first.update(transition)
+    second.update(transition)
+    second_context.__exit__(None, None, None)
+    assert "update" not in second.__dict__
+    assert first_profiler.counters == {"transitions": 1}
+    # the update of the first agent is only a phase of the second profile
+    assert second_profiler.counters == {"transitions": 1}
+    assert second_profiler.phase_totals()["to_tabular"].calls == 2
+    assert active_profiler() is None
+
+def test_vector_transitions_are_counted():
+    np.random.seed(0)
+    env = VectorCliffWalking(4)
+    agent = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    with agent.profile() as profiler:
+        result = Trainer(env, agent).train(max_steps=400)
+    assert profiler.counters["transitions"] == result.total_steps
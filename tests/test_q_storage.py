@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import rl
+from rl import SparseQStorage, MemmapQStorage, SparseQTable
+from rl.environment import CliffWalking
+from rl.train import Trainer
+
+def test_reads_dont_materialize():
+    Q = SparseQTable((3, 4), 2)
+    assert np.array_equal(Q[1, 2], [0.0, 0.0])
+    assert Q[1, 2, 1] == 0.0
+    assert np.array_equal(Q[np.array([0, 1]), np.array([1, 3])], np.zeros((2, 2)))
+    assert Q.materialized_count == 0
+
+def test_writes_materialize():
+    Q = SparseQTable((3, 4), 2)
+    Q[1, 2, 1] += 1.5
+    Q[(0, 0)] = 2.0
+    np.add.at(Q, (np.array([2, 2]), np.array([3, 3]), np.array([0, 0])), 1.0)
+    assert Q.materialized_count == 3
+    dense = np.zeros((3, 4, 2))
+    dense[1, 2, 1] = 1.5
+    dense[0, 0] = 2.0
+    dense[2, 3, 0] = 2.0
+    assert np.array_equal(Q.to_dense(), dense)
+
+def test_row_reads_are_copies():
+    Q = SparseQTable((3,), 2)
+    Q[0, 1] = 1.0
+    row = Q[0]
+    row[1] = 5.0
+    assert Q[0, 1] == 1.0
+
+def test_reads_dont_evict_learned_states():
+    Q = SparseQTable((10,), 2, max_states=2)
+    Q[0, 0] = 1.0
+    Q[1, 0] = 2.0
+    # greedy reads of unseen states
+    for s in range(2, 10):
+        Q[s].argmax()
+    assert Q.evictions == 0
+    assert Q[0, 0] == 1.0 and Q[1, 0] == 2.0
+
+def test_eviction_of_the_least_recently_written_state():
+    Q = SparseQTable((10,), 2, max_states=2)
+    Q[0, 0] = 1.0
+    Q[1, 0] = 2.0
+    Q[0, 1] = 3.0
+    row = Q[1]
+    Q[2, 0] = 4.0
+    assert Q.evictions == 1
+    assert np.array_equal(Q[1], [0.0, 0.0])
+    assert np.array_equal(Q[0], [1.0, 3.0])
+    # the row read before the eviction doesn't alias the state which took its slot
+    assert np.array_equal(row, [2.0, 0.0])
+    assert np.array_equal(Q[2], [4.0, 0.0])
+
+@pytest.mark.parametrize("agent_cls", [rl.QLearning, rl.Sarsa, rl.ExpectedSarsa, rl.DoubleQLearning, rl.QLambda, rl.SarsaLambda, rl.DynaQ])
+@pytest.mark.parametrize("storage_fn", [lambda tmp_path: SparseQStorage(), lambda tmp_path: MemmapQStorage(str(tmp_path))])
+def test_storages_match_dense(tmp_path, agent_cls, storage_fn):
+    def train(storage):
+        np.random.seed(0)
+        env = CliffWalking()
+        agent = agent_cls(env.obs_shape, env.action_count, [tuple(env.goal_state)], storage=storage)
+        Trainer(env, agent, max_episode_steps=200).train(max_episodes=5)
+        return agent.q_vals
+
+    assert np.array_equal(train(storage_fn(tmp_path)), train(None))
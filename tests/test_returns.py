@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+import rl
+from rl import discounted_returns
+
+def reference_returns(rewards, gamma):
+    returns = np.zeros(len(rewards))
+    G = 0.0
+    for t in reversed(range(len(rewards))):
+        G = rewards[t] + gamma * G
+        returns[t] = G
+    return returns
+
+@pytest.mark.parametrize("gamma", [0.0, 0.5, 0.9, 0.99, 1.0])
+def test_matches_the_reverse_loop(gamma):
+    rewards = np.random.default_rng(0).normal(size=50)
+    assert np.allclose(discounted_returns(rewards, gamma), reference_returns(rewards, gamma))
+
+def test_long_episodes_stay_finite():
+    # gamma^-t overflows without the chunks
+    rewards = np.random.default_rng(1).normal(size=5000)
+    returns = discounted_returns(rewards, 0.5)
+    assert np.all(np.isfinite(returns))
+    assert np.allclose(returns, reference_returns(rewards, 0.5))
+
+def test_padded_episodes():
+    rng = np.random.default_rng(2)
+    lengths = [3, 7, 1]
+    rewards = np.zeros((3, 7))
+    for i, length in enumerate(lengths):
+        rewards[i, :length] = rng.normal(size=length)
+    returns = discounted_returns(rewards, 0.9)
+    assert returns.shape == (3, 7)
+    for i, length in enumerate(lengths):
+        assert np.allclose(returns[i, :length], reference_returns(rewards[i, :length], 0.9))
+
+def make_reinforce(torch, batch_episodes=1):
+    torch.manual_seed(0)
+    net = torch.nn.Linear(2, 3)
+    optimizer = torch.optim.SGD(net.parameters(), lr=0.1)
+    return rl.Reinforce(net, optimizer, lambda logits: torch.distributions.Categorical(logits=logits), gamma=0.9, batch_episodes=batch_episodes)
+
+def play_episode(agent, length, seed):
+    """ Returns the states, actions and rewards of the episode. """
+    rng = np.random.default_rng(seed)
+    states, actions, rewards = [], [], []
+    agent.start_episode()
+    for _ in range(length):
+        state = rng.normal(size=2).astype(np.float32)
+        action = agent.get_action(state)
+        reward = float(rng.normal())
+        agent.update(rl.Transition(state, action, state, reward, False))
+        states.append(state)
+        actions.append(action)
+        rewards.append(reward)
+    agent.end_episode()
+    return np.array(states), np.array(actions), rewards
+
+def reference_loss(torch, net, episodes, gamma):
+    """ The per-episode loss of the baseline Reinforce for one episode, and the masked batch loss with the cross-batch baseline for more. """
+    returns = [torch.tensor(reference_returns(rewards, gamma), dtype=torch.float32) for _, _, rewards in episodes]
+    baseline = torch.cat(returns).mean()
+    loss = 0.0
+    for (states, actions, _), G in zip(episodes, returns):
+        log_probs = torch.distributions.Categorical(logits=net(torch.from_numpy(states))).log_prob(torch.from_numpy(actions))
+        loss = loss - torch.sum((G - baseline) * log_probs)
+    return loss / len(episodes)
+
+@pytest.mark.parametrize("batch_episodes, lengths", [(1, [5]), (1, [3]), (2, [4, 6]), (3, [2, 7, 1])])
+def test_reinforce_matches_the_reference_loss(batch_episodes, lengths):
+    torch = pytest.importorskip("torch")
+    agent = make_reinforce(torch, batch_episodes)
+    reference = make_reinforce(torch)
+    for update in range(2):
+        episodes = [play_episode(agent, length, seed=update * 10 + i) for i, length in enumerate(lengths)]
+        loss = reference_loss(torch, reference.policy_net, episodes, 0.9)
+        reference.optimizer.zero_grad()
+        loss.backward()
+        reference.optimizer.step()
+        assert agent.loss == pytest.approx(loss.item(), rel=1e-5)
+        for p, q in zip(agent.policy_net.parameters(), reference.policy_net.parameters()):
+            assert torch.allclose(p, q, atol=1e-6)
+
+def test_reinforce_device_is_the_fifth_positional_argument():
+    torch = pytest.importorskip("torch")
+    net = torch.nn.Linear(2, 3)
+    agent = rl.Reinforce(net, torch.optim.SGD(net.parameters(), lr=0.1), lambda logits: torch.distributions.Categorical(logits=logits), 0.99, torch.device("cpu"))
+    assert agent.device == torch.device("cpu")
+    assert agent.batch_episodes == 1
+
+def test_batched_reinforce_learns_once_per_batch():
+    torch = pytest.importorskip("torch")
+    agent = make_reinforce(torch, batch_episodes=2)
+    initial = agent.policy_net.weight.detach().clone()
+    play_episode(agent, 4, 0)
+    # the first episode waits for the second one
+    assert agent.policy_net.weight.grad is None
+    assert torch.equal(agent.policy_net.weight, initial)
+    play_episode(agent, 6, 1)
+    assert not torch.equal(agent.policy_net.weight, initial)
+    assert np.isfinite(agent.loss)
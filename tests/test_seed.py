@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import rl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(code):
+    # a fresh interpreter, torch may already be imported by the other tests
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT)
+
+def test_seed_seeds_numpy_and_random():
+    import random
+    rl.util.seed(3)
+    expected = (np.random.rand(), random.random())
+    rl.util.seed(3)
+    assert (np.random.rand(), random.random()) == expected
+
+def test_import_doesnt_import_torch():
+    run_python("import sys, rl; import rl.train, rl.planning, rl.runtime; assert 'torch' not in sys.modules")
+
+def test_seed_doesnt_import_torch():
+    pytest.importorskip("torch")
+    run_python("import sys, rl; rl.util.seed(7); assert 'torch' not in sys.modules")
+
+def test_seed_seeds_imported_torch():
+    pytest.importorskip("torch")
+    run_python(
+        "import rl, torch\n"
+        "rl.util.seed(7)\n"
+        "value = torch.rand(3)\n"
+        "torch.manual_seed(7)\n"
+        "assert torch.equal(value, torch.rand(3))\n"
+        "assert torch.backends.cudnn.deterministic and not torch.backends.cudnn.benchmark\n"
+    )
+
+def test_seed_torch_imports_and_seeds_torch():
+    pytest.importorskip("torch")
+    run_python(
+        "import rl\n"
+        "assert rl.util.seed_torch(7)\n"
+        "import torch\n"
+        "value = torch.rand(3)\n"
+        "torch.manual_seed(7)\n"
+        "assert torch.equal(value, torch.rand(3))\n"
+    )
+
+def test_seed_without_torch():
+    run_python(
+        "import sys, rl, numpy as np\n"
+        "sys.modules['torch'] = None\n"
+        "assert not rl.util.seed_torch(0)\n"
+        "rl.util.seed(5)\n"
+        "value = np.random.rand()\n"
+        "np.random.seed(5)\n"
+        "assert value == np.random.rand()\n"
+    )
+
+def test_star_import_exports_the_lazy_agents():
+    pytest.importorskip("torch")
+    run_python("from rl import *; DeepSarsa, Reinforce, QLearning, util, environment")
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import rl
+from rl import Transition, TabularQAgent
+from rl.environment import CliffWalking
+
+AGENT_CLASSES = [
+    rl.QLearning, rl.Sarsa, rl.ExpectedSarsa, rl.DoubleQLearning,
+    rl.QLambda, rl.SarsaLambda, rl.DynaQ, rl.PrioritizedSweeping
+]
+
+def run_episodes(agent, use_ids: bool, episode_count: int = 20, max_steps: int = 200):
+    np.random.seed(0)
+    env = CliffWalking()
+    for _ in range(episode_count):
+        agent.start_episode()
+        state = env.reset()
+        for _ in range(max_steps):
+            if use_ids:
+                state_id = int(agent.to_state_id(state))
+                action = agent.get_action_id(state_id)
+                next_state, reward, terminated = env.step(action)
+                agent.update_ids(state_id, action, reward, int(agent.to_state_id(next_state)), terminated)
+            else:
+                action = agent.get_action(state)
+                next_state, reward, terminated = env.step(action)
+                agent.update(Transition(state, action, next_state, reward, terminated))
+            state = next_state
+            if terminated:
+                break
+        agent.end_episode()
+
+@pytest.mark.parametrize("agent_cls", AGENT_CLASSES)
+def test_id_path_matches_the_state_path(agent_cls):
+    env = CliffWalking()
+    terminal_states = [tuple(env.goal_state)]
+    state_agent = agent_cls(env.obs_shape, env.action_count, terminal_states)
+    id_agent = agent_cls(env.obs_shape, env.action_count, terminal_states)
+    run_episodes(state_agent, use_ids=False)
+    run_episodes(id_agent, use_ids=True)
+    assert np.allclose(state_agent.q_vals, id_agent.q_vals)
+
+def test_id_methods_fall_back_to_the_state_methods():
+    class StateOnlyAgent(TabularQAgent):
+        def __init__(self, obs_shape, action_count):
+            super().__init__(obs_shape, action_count)
+            self.states = []
+            self.transitions = []
+
+        def get_action(self, state):
+            self.states.append(state)
+            return 1
+
+        def update(self, transition):
+            self.transitions.append(transition)
+
+    agent = StateOnlyAgent((3, 4), 2)
+    assert agent.get_action_id(7) == 1
+    assert agent.states == [(1, 3)]
+    agent.update_ids(7, 1, -1.0, 11, True)
+    assert agent.transitions == [Transition((1, 3), 1, (2, 3), -1.0, True)]
+    assert agent.to_state_id(agent.to_state(7)) == 7
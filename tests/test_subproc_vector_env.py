@@ -0,0 +1,109 @@
+import functools
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+import rl
+from rl.environment import CliffWalking, SubprocVectorEnv
+from rl.train import Trainer
+
+class GymTimeLimitEnv:
+    """ Gym api whose episodes are truncated after `length` steps and never terminate, the state is the step count. """
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+
+    def reset(self):
+        self.t = 0
+        return np.array([0]), {}
+
+    def step(self, action):
+        self.t += 1
+        return np.array([self.t]), 1.0, False, self.t == self.length, {}
+
+class WorkerFailingEnv(CliffWalking):
+    """ Can be created in the main process, but not in the workers. """
+
+    def __init__(self, pid: int) -> None:
+        if os.getpid() != pid:
+            raise ValueError("failed in the worker")
+        super().__init__()
+
+@pytest.fixture
+def created_shms(monkeypatch):
+    shms = []
+
+    class RecordingSharedMemory(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            shms.append(self.name)
+
+    monkeypatch.setattr(shared_memory, "SharedMemory", RecordingSharedMemory)
+    return shms
+
+def is_unlinked(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        return True
+    return False
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_matches_the_scalar_environments(start_method):
+    if start_method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{start_method} isn't supported")
+    rng = np.random.default_rng(0)
+    envs = [CliffWalking() for _ in range(5)]
+    with SubprocVectorEnv(CliffWalking, 5, num_workers=2, context=multiprocessing.get_context(start_method)) as vector_env:
+        assert vector_env.obs_shape == envs[0].obs_shape
+        states = vector_env.reset()
+        assert np.array_equal(states, [env.reset() for env in envs])
+        for _ in range(50):
+            actions = rng.integers(4, size=5)
+            result = vector_env.step(actions)
+            for i, env in enumerate(envs):
+                next_state, reward, terminated = env.step(int(actions[i]))
+                assert np.array_equal(result.next_states[i], next_state)
+                assert result.rewards[i] == reward
+                assert result.terminated[i] == terminated
+                assert np.array_equal(result.states[i], env.reset() if terminated else next_state)
+            assert not result.truncated.any()
+
+def test_truncation_is_reported_and_reset():
+    env_fn = functools.partial(GymTimeLimitEnv, 3)
+    with SubprocVectorEnv(env_fn, 2, context=multiprocessing.get_context("fork")) as vector_env:
+        for t in range(1, 7):
+            result = vector_env.step(np.zeros(2, dtype=np.int64))
+            assert np.all(result.next_states[:, 0] == (t - 1) % 3 + 1)
+            assert not result.terminated.any()
+            assert np.all(result.truncated == (t % 3 == 0))
+            assert np.all(result.states[:, 0] == t % 3)
+
+def test_trainer_ends_truncated_episodes():
+    env_fn = functools.partial(GymTimeLimitEnv, 3)
+    with SubprocVectorEnv(env_fn, 2, context=multiprocessing.get_context("fork")) as vector_env:
+        agent = rl.QLearning((4,), 2)
+        result = Trainer(vector_env, agent).train(max_steps=12)
+    assert result.episode_lengths.tolist() == [3] * 4
+    # the truncated transitions bootstrap, so no q-value reaches the terminal target 1.0 with a single step
+    assert agent.q_vals[2].max() < 1.0
+
+def test_close_unlinks_the_shared_memory(created_shms):
+    vector_env = SubprocVectorEnv(CliffWalking, 2, context=multiprocessing.get_context("fork"))
+    vector_env.close()
+    vector_env.close()
+    assert is_unlinked(created_shms[0])
+
+def test_failed_init_unlinks_the_shared_memory(created_shms):
+    with pytest.raises(RuntimeError):
+        SubprocVectorEnv(functools.partial(WorkerFailingEnv, os.getpid()), 2, context=multiprocessing.get_context("fork"))
+    assert is_unlinked(created_shms[0])
+
+def test_failed_worker_start_unlinks_the_shared_memory(created_shms):
+    if "spawn" not in multiprocessing.get_all_start_methods():
+        pytest.skip("spawn isn't supported")
+    # a lambda can't be sent to spawned workers
+    with pytest.raises(Exception):
+        SubprocVectorEnv(lambda: CliffWalking(), 2, context=multiprocessing.get_context("spawn"))
+    assert is_unlinked(created_shms[0])
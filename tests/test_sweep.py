@@ -0,0 +1,58 @@
+import os
+import random
+import subprocess
+import sys
+import numpy as np
+import rl
+from rl.environment import CliffWalking
+from rl.train import SweepRunner
+from rl.train.sweep import _get_random_states, _set_random_states
+
+CONFIGS = [(rl.QLearning, {"epsilon": 0.1}), (rl.QLearning, {"epsilon": 0.1}), (rl.Sarsa, {"epsilon": 0.2})]
+
+def make_runner(**kwargs):
+    return SweepRunner(CliffWalking, CONFIGS, num_seeds=2, root_seed=7, max_workers=1, max_episode_steps=200, **kwargs)
+
+def test_every_trial_has_its_own_stream():
+    runner = make_runner()
+    states = {tuple(runner.seed_sequence(c, s).generate_state(4)) for c in range(len(CONFIGS)) for s in range(2)}
+    assert len(states) == len(CONFIGS) * 2
+
+def test_runs_are_reproducible_and_identical_configs_differ():
+    first = make_runner().run(5)
+    second = make_runner().run(5)
+    assert np.array_equal(first.curves, second.curves)
+    # the configurations 0 and 1 are the same, only their streams differ
+    assert not np.array_equal(first.curves[0:2], first.curves[2:4])
+
+def test_resumed_survivors_match_uninterrupted_trials():
+    halving = make_runner().successive_halving(min_episodes=4, max_episodes=12, eta=3)
+    full = make_runner().run(12)
+    survivors = np.flatnonzero(halving.episodes == 12)
+    assert len(survivors) == 2
+    assert np.array_equal(halving.curves[survivors], full.curves[survivors])
+
+def test_random_states_round_trip():
+    np.random.seed(0)
+    random.seed(0)
+    states = _get_random_states()
+    expected = np.random.rand(), random.random()
+    np.random.rand(), random.random()
+    _set_random_states(states)
+    assert (np.random.rand(), random.random()) == expected
+
+def test_tabular_trials_dont_import_torch():
+    # a fresh interpreter, the forked workers would inherit torch imported by the other tests
+    code = (
+        "import sys, rl\n"
+        "from rl.environment import CliffWalking\n"
+        "from rl.train import SweepRunner\n"
+        "from rl.train.sweep import tabular_agent_fn\n"
+        "def agent_fn(env, agent_cls, params):\n"
+        "    assert 'torch' not in sys.modules\n"
+        "    return tabular_agent_fn(env, agent_cls, params)\n"
+        "SweepRunner(CliffWalking, [(rl.QLearning, {})], max_workers=1, agent_fn=agent_fn, max_episode_steps=50).run(1)\n"
+        "assert 'torch' not in sys.modules\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=root)
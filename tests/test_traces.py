@@ -0,0 +1,115 @@
+import math
+import numpy as np
+import pytest
+from rl import QLambda, SarsaLambda, SparseQStorage, Transition
+from rl.environment import CliffWalking
+from rl.rl_agent.eligibility_traces import EligibilityTraces
+
+class DenseSarsaLambda:
+    """ Sarsa(lambda) with full-table traces as the reference. """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.Q = np.zeros((agent.state_count, agent.action_count))
+        self.E = np.zeros_like(self.Q)
+        self.cur = None
+
+    def start_episode(self):
+        self.E[:] = 0
+        self.cur = None
+
+    def update(self, s, a, r, s2, terminated):
+        if self.cur is not None:
+            cs, ca, cr, cs2 = self.cur
+            self.backup(cs, ca, cr + self.agent.gamma * self.Q[cs2, a] - self.Q[cs, ca])
+        if terminated:
+            self.backup(s, a, r - self.Q[s, a])
+            self.start_episode()
+        else:
+            self.cur = (s, a, r, s2)
+
+    def backup(self, s, a, td_error):
+        self.E[s, a] = 1.0 if self.agent.traces.replacing else self.E[s, a] + 1.0
+        self.Q += self.agent.alpha * td_error * self.E
+        self.E *= self.agent.gamma * self.agent.lambda_
+
+class DenseQLambda(DenseSarsaLambda):
+    """ Watkins's Q(lambda) with full-table traces as the reference. """
+
+    def update(self, s, a, r, s2, terminated):
+        if self.Q[s, a] < self.Q[s].max():
+            self.E[:] = 0
+        td_error = r + self.agent.gamma * (1 - terminated) * self.Q[s2].max() - self.Q[s, a]
+        self.E[s, a] = 1.0 if self.agent.traces.replacing else self.E[s, a] + 1.0
+        self.Q += self.agent.alpha * td_error * self.E
+        self.E *= 0.0 if terminated else self.agent.gamma * self.agent.lambda_
+
+def run(agent, reference, episodes=10, max_episode_steps=300):
+    env = CliffWalking()
+    for _ in range(episodes):
+        state = env.reset()
+        agent.start_episode()
+        reference.start_episode()
+        for _ in range(max_episode_steps):
+            action = agent.get_action(state)
+            next_state, reward, terminated = env.step(action)
+            agent.update(Transition(state, action, next_state, reward, terminated))
+            reference.update(int(agent.to_state_id(state)), action, reward, int(agent.to_state_id(next_state)), terminated)
+            state = next_state
+            if terminated:
+                break
+
+@pytest.mark.parametrize("agent_cls, reference_cls", [(SarsaLambda, DenseSarsaLambda), (QLambda, DenseQLambda)])
+@pytest.mark.parametrize("replacing", [False, True])
+@pytest.mark.parametrize("storage_fn", [lambda: None, SparseQStorage])
+def test_matches_dense_traces_without_cutoff(agent_cls, reference_cls, replacing, storage_fn):
+    np.random.seed(0)
+    env = CliffWalking()
+    agent = agent_cls(env.obs_shape, env.action_count, epsilon=0.3, alpha=0.5, lambda_=0.8, trace_cutoff=0.0, replacing_traces=replacing, storage=storage_fn())
+    reference = reference_cls(agent)
+    run(agent, reference)
+    assert np.allclose(agent.q_vals.reshape(reference.Q.shape), reference.Q)
+
+@pytest.mark.parametrize("agent_cls, reference_cls", [(SarsaLambda, DenseSarsaLambda), (QLambda, DenseQLambda)])
+def test_cutoff_bounds_the_active_set(agent_cls, reference_cls):
+    np.random.seed(0)
+    env = CliffWalking()
+    cutoff = 1e-3
+    agent = agent_cls(env.obs_shape, env.action_count, epsilon=0.3, alpha=0.5, lambda_=0.8, trace_cutoff=cutoff, replacing_traces=True)
+    reference = reference_cls(agent)
+    sizes = []
+    original_decay = agent.traces.decay
+
+    def decay(factor):
+        original_decay(factor)
+        sizes.append(len(agent.traces))
+
+    agent.traces.decay = decay
+    run(agent, reference)
+    # a replaced trace is (gamma * lambda)^k k steps after the last visit
+    assert max(sizes) <= math.floor(math.log(cutoff) / math.log(agent.gamma * agent.lambda_)) + 1
+    # the dropped traces are small, so the q-values stay close to the dense ones
+    assert np.abs(agent.q_vals.reshape(reference.Q.shape) - reference.Q).max() < 1.0
+
+def test_eligibility_traces():
+    traces = EligibilityTraces(2, cutoff=0.3, capacity=2)
+    for state_id in range(3):
+        traces.visit(state_id, 1)
+    traces.visit(0, 1)
+    assert traces.pairs.tolist() == [1, 3, 5]
+    assert traces.traces.tolist() == [2.0, 1.0, 1.0]
+
+    Q = np.zeros((3, 2))
+    traces.apply(Q, 0.5)
+    assert Q[:, 1].tolist() == [1.0, 0.5, 0.5]
+
+    traces.decay(0.25)
+    assert traces.pairs.tolist() == [1]
+    assert traces.traces.tolist() == [0.5]
+    traces.clear()
+    assert len(traces) == 0
+
+    replacing = EligibilityTraces(2, replacing=True)
+    replacing.visit(0, 0)
+    replacing.visit(0, 0)
+    assert replacing.traces.tolist() == [1.0]
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+import rl
+from rl.environment import VectorStep, reset_env, make_step_function
+from rl.train import Trainer, Callback
+
+class CountdownEnv:
+    """ Terminates after `length` steps, the state is the step count. """
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+
+    def reset(self):
+        self.t = 0
+        return np.array([0])
+
+    def step(self, action):
+        self.t += 1
+        return np.array([self.t]), 1.0, self.t == self.length
+
+class GymTimeLimitEnv(CountdownEnv):
+    """ Gym api whose episodes are truncated after `length` steps and never terminate. """
+
+    def reset(self):
+        return super().reset(), {}
+
+    def step(self, action):
+        next_state, reward, truncated = super().step(action)
+        return next_state, reward, False, truncated, {}
+
+class VectorTimeLimitEnv:
+    """ Vectorized environment without a `states` attribute, the instance `i` is truncated every `i + 2` steps. """
+
+    def __init__(self, num_envs: int) -> None:
+        self.num_envs = num_envs
+
+    def reset(self):
+        self._t = np.zeros(self.num_envs, dtype=np.int64)
+        return self._t[:, None].copy()
+
+    def step(self, actions):
+        self._t += 1
+        next_states = self._t[:, None].copy()
+        truncated = self._t == np.arange(self.num_envs) + 2
+        self._t[truncated] = 0
+        terminated = np.zeros(self.num_envs, dtype=np.bool_)
+        return VectorStep(next_states, np.ones(self.num_envs), terminated, truncated, self._t[:, None].copy())
+
+class RecordingAgent(rl.Agent):
+    def __init__(self) -> None:
+        self.transitions = []
+        self.batches = []
+        self.episode_ends = 0
+
+    def get_action(self, state):
+        return 0
+
+    def update(self, transition):
+        self.transitions.append(transition)
+
+    def update_batch(self, states, actions, rewards, next_states, terminated):
+        self.batches.append((states, next_states, terminated))
+
+    def end_episode(self):
+        self.episode_ends += 1
+
+class EpisodeCounter(Callback):
+    def __init__(self) -> None:
+        self.lengths = []
+
+    def on_episode_end(self, trainer, episode, total_reward, length):
+        self.lengths.append(length)
+
+def test_episode_cut_by_the_step_budget_isnt_recorded():
+    agent = RecordingAgent()
+    counter = EpisodeCounter()
+    result = Trainer(CountdownEnv(10), agent, callbacks=[counter], eval_interval=1, eval_episodes=1).train(max_steps=25)
+    assert result.total_steps == 25
+    assert result.total_episodes == 2
+    assert np.array_equal(result.episode_lengths, [10, 10])
+    assert counter.lengths == [10, 10]
+    assert len(result.evaluations) == 2
+    # the partial episode is still updated and ended
+    assert len(agent.transitions) == 25
+    assert agent.episode_ends == 3
+
+def test_episode_cut_by_max_episode_steps_is_recorded():
+    result = Trainer(CountdownEnv(10), RecordingAgent(), max_episode_steps=4).train(max_steps=12)
+    assert np.array_equal(result.episode_lengths, [4, 4, 4])
+
+def test_gym_truncation_ends_the_episode_without_terminating_it():
+    agent = RecordingAgent()
+    result = Trainer(GymTimeLimitEnv(3), agent).train(max_episodes=2)
+    assert np.array_equal(result.episode_lengths, [3, 3])
+    assert not any(t.terminated for t in agent.transitions)
+
+def test_vector_episodes_end_on_truncation():
+    agent = RecordingAgent()
+    counter = EpisodeCounter()
+    result = Trainer(VectorTimeLimitEnv(2), agent, callbacks=[counter]).train(max_steps=12)
+    # the instance 0 is truncated every 2 steps and the instance 1 every 3 steps
+    assert sorted(result.episode_lengths.tolist()) == [2, 2, 2, 3, 3]
+    assert counter.lengths == result.episode_lengths.tolist()
+    # the states of the next step are the ones after the auto-reset
+    for (_, next_states, terminated), (states, _, _) in zip(agent.batches, agent.batches[1:]):
+        assert not terminated.any()
+        assert np.array_equal(states[:, 0], np.where(next_states[:, 0] == [2, 3], 0, next_states[:, 0]))
+
+def test_vector_training_matches_the_scalar_environments():
+    np.random.seed(0)
+    env = rl.environment.VectorCliffWalking(4)
+    agent = rl.QLearning(env.obs_shape, env.action_count, [tuple(env.goal_state)])
+    result = Trainer(env, agent).train(max_episodes=20)
+    assert result.total_episodes == 20
+    assert np.all(result.episode_lengths > 0)
+
+def test_env_helpers_support_both_apis():
+    env = GymTimeLimitEnv(1)
+    assert np.array_equal(reset_env(env), [0])
+    assert make_step_function(env)(0)[2:] == (False, True)
+    env = CountdownEnv(1)
+    assert np.array_equal(reset_env(env), [0])
+    assert make_step_function(env)(0)[2:] == (True, True)
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from rl.environment import CliffWalking, WindyGridworld
+
+@pytest.mark.parametrize("env_cls", [CliffWalking, WindyGridworld])
+def test_step_id_matches_step(env_cls):
+    env = env_cls()
+    table = env.transition_table
+    assert table.next_state.shape == (env.state_count, env.action_count)
+    for s in range(env.state_count):
+        for a in range(env.action_count):
+            env.state = env.to_state(s)
+            next_state, reward, terminated = env.step(a)
+            assert env.step_id(s, a) == (env.to_state_id(next_state), reward, terminated)
+
+@pytest.mark.parametrize("env_cls", [CliffWalking, WindyGridworld])
+def test_step_id_is_vectorized_and_keeps_the_state(env_cls):
+    env = env_cls()
+    state = env.reset()
+    state_ids = np.arange(env.state_count)
+    actions = state_ids % env.action_count
+    next_state, reward, terminated = env.step_id(state_ids, actions)
+    table = env.transition_table
+    assert np.array_equal(next_state, table.next_state[state_ids, actions])
+    assert np.array_equal(reward, table.reward[state_ids, actions])
+    assert np.array_equal(env.state, state)
+
+def test_state_id_round_trip():
+    env = WindyGridworld()
+    state_ids = np.arange(env.state_count)
+    assert np.array_equal(env.to_state_id(env.to_state(state_ids)), state_ids)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from rl import QLearning, ExpectedSarsa, DoubleQLearning, SparseQStorage, Transition
+
+OBS_SHAPE = (4, 3)
+ACTION_COUNT = 2
+
+def random_batch(rng, size):
+    states = np.stack([rng.integers(0, n, size) for n in OBS_SHAPE], axis=1)
+    next_states = np.stack([rng.integers(0, n, size) for n in OBS_SHAPE], axis=1)
+    actions = rng.integers(0, ACTION_COUNT, size)
+    rewards = rng.normal(size=size)
+    terminated = rng.random(size) < 0.2
+    return states, actions, rewards, next_states, terminated
+
+@pytest.mark.parametrize("agent_cls", [QLearning, ExpectedSarsa])
+def test_duplicates_move_once_toward_the_mean_target(agent_cls):
+    batch_agent = agent_cls(OBS_SHAPE, ACTION_COUNT, alpha=0.5)
+    single_agent = agent_cls(OBS_SHAPE, ACTION_COUNT, alpha=0.5)
+    n = 20
+    batch_agent.update_batch(np.tile([1, 2], (n, 1)), np.zeros(n, dtype=np.int64), np.ones(n), np.tile([3, 0], (n, 1)), np.ones(n, dtype=bool))
+    single_agent.update(Transition((1, 2), 0, (3, 0), 1.0, True))
+    assert np.allclose(batch_agent.q_vals, single_agent.q_vals)
+    # summing the 20 updates would overshoot the target 1.0
+    assert batch_agent.q_vals[1, 2, 0] == pytest.approx(0.5)
+
+def test_double_q_learning_duplicates_dont_overshoot():
+    np.random.seed(0)
+    agent = DoubleQLearning(OBS_SHAPE, ACTION_COUNT, alpha=0.5)
+    n = 20
+    agent.update_batch(np.tile([1, 2], (n, 1)), np.zeros(n, dtype=np.int64), np.ones(n), np.tile([3, 0], (n, 1)), np.ones(n, dtype=bool))
+    state_dict = agent.state_dict()
+    for Q in (state_dict["Q1"], state_dict["Q2"]):
+        assert Q[1, 2, 0] == pytest.approx(0.5)
+
+@pytest.mark.parametrize("agent_cls", [QLearning, ExpectedSarsa])
+def test_unique_pairs_are_updated_from_the_q_values_before_the_batch(agent_cls):
+    rng = np.random.default_rng(0)
+    states, actions, rewards, next_states, terminated = random_batch(rng, 64)
+    # keep the first transition of every (s, a) pair
+    first = {}
+    for i, pair in enumerate(zip(map(tuple, states), actions)):
+        first.setdefault(pair, i)
+    keep = sorted(first.values())
+    states, actions, rewards, next_states, terminated = states[keep], actions[keep], rewards[keep], next_states[keep], terminated[keep]
+
+    initial_agent = agent_cls(OBS_SHAPE, ACTION_COUNT)
+    initial_agent.update_batch(*random_batch(rng, 64))
+    batch_agent = agent_cls(OBS_SHAPE, ACTION_COUNT)
+    batch_agent.load_state_dict({"Q": initial_agent.q_vals})
+    batch_agent.update_batch(states, actions, rewards, next_states, terminated)
+    for s, a, r, s_next, t in zip(map(tuple, states), actions, rewards, map(tuple, next_states), terminated):
+        agent = agent_cls(OBS_SHAPE, ACTION_COUNT)
+        agent.load_state_dict({"Q": initial_agent.q_vals})
+        agent.update(Transition(s, a, s_next, r, t))
+        assert batch_agent.q_vals[s + (a,)] == pytest.approx(agent.q_vals[s + (a,)])
+
+@pytest.mark.parametrize("agent_cls", [QLearning, ExpectedSarsa])
+def test_sparse_storage_matches_dense(agent_cls):
+    rng = np.random.default_rng(1)
+    dense_agent = agent_cls(OBS_SHAPE, ACTION_COUNT)
+    sparse_agent = agent_cls(OBS_SHAPE, ACTION_COUNT, storage=SparseQStorage())
+    for _ in range(10):
+        batch = random_batch(rng, 32)
+        dense_agent.update_batch(*batch)
+        sparse_agent.update_batch(*batch)
+    assert np.allclose(dense_agent.q_vals, sparse_agent.q_vals)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from rl.environment import CliffWalking, WindyGridworld, VectorCliffWalking, VectorWindyGridworld
+
+@pytest.mark.parametrize("env_cls, vector_env_cls", [(CliffWalking, VectorCliffWalking), (WindyGridworld, VectorWindyGridworld)])
+def test_vector_env_matches_scalar_envs(env_cls, vector_env_cls):
+    num_envs = 8
+    rng = np.random.default_rng(0)
+    envs = [env_cls() for _ in range(num_envs)]
+    vector_env = vector_env_cls(num_envs)
+    states = vector_env.reset()
+    assert np.array_equal(states, np.array([env.reset() for env in envs]))
+
+    episodes = 0
+    for _ in range(3000):
+        actions = rng.integers(vector_env.action_count, size=num_envs)
+        next_states, rewards, terminated = vector_env.step(actions)[:3]
+        for i, env in enumerate(envs):
+            next_state, reward, t = env.step(actions[i])
+            assert np.array_equal(next_states[i], next_state)
+            assert rewards[i] == reward
+            assert terminated[i] == t
+            if t:
+                env.reset()
+        episodes += terminated.sum()
+    # the auto-reset is exercised
+    assert episodes > 0